@@ -0,0 +1,440 @@
+"""Agentes do chat (reescritor, analista SQL e Bia), separados da interface.
+
+A interface (app.py) só importa este módulo numa thread de carregamento, para
+que vanna, chromadb, pandas e ollama não atrasem a primeira tela. Também é o
+passo de build do snapshot de partida rápida:
+
+    python agentes.py --construir-snapshot [--db ../db.sqlite3]
+"""
+import argparse
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import ollama
+from chromadb.utils import embedding_functions
+from vanna.chromadb import ChromaDB_VectorStore
+from vanna.ollama import Ollama
+
+import rastreio
+import snapshot
+import treino
+from cache_respostas import CacheRespostas
+from cache_resultados import CacheResultados
+from cache_sql import CacheSQL
+from conexoes import PoolLeitura
+from embeddings import CacheEmbeddings
+from gate_reescrita import GateReescrita
+from guardrail_sql import GuardaSQL
+from parser_consulta import CONFIANCA_MINIMA, ParserConsulta, sql_legivel
+from pipeline import TIMEOUTS_ETAPAS, executar_turno
+from streaming import RespostaStream, pedacos_ollama
+
+logger = logging.getLogger("bia.consulta")
+
+# O treino é sincronizado pelo manifesto (treino.py); não é mais preciso trocar o path a cada mudança
+CONFIG_SQL = {"model": "qwen2.5-coder:7b", "path": "./vanna_chroma_final_v7", "temperature": 0.0,
+              "ollama_timeout": TIMEOUTS_ETAPAS["sql"]}
+MODELO_BIA = 'deepseek-r1:8b'
+# Tempo que o ollama mantém os modelos na memória depois do aquecimento
+MANTER_CARREGADO = "30m"
+
+# ==========================================
+# MÓDULO DE MEMÓRIA: REESCRITOR CONTEXTUAL
+# ==========================================
+def reescrever_pergunta_com_contexto(nova_pergunta, historico, model='deepseek-r1:8b'):
+    """Usa o histórico para reescrever a pergunta de forma independente (standalone)."""
+    if not historico or len(historico) == 0:
+        return nova_pergunta
+    
+    # Pega apenas as últimas 4 mensagens para dar contexto sem gastar muito token
+    contexto_str = ""
+    for msg in historico[-4:]:
+        if msg["role"] == "user":
+            contexto_str += f"Cliente: {msg['content']}\n"
+        elif msg["role"] == "assistant":
+            # Ignora os dados técnicos no histórico para não confundir o modelo
+            contexto_str += f"Bia: {msg['content']}\n"
+            
+    system_prompt = """Você é um assistente interno de reescrita de texto em uma imobiliária.
+    Sua ÚNICA função é ler o contexto da conversa e reescrever a 'Nova pergunta' do cliente para que ela faça sentido sozinha.
+    Você deve incorporar o assunto implícito (ex: tipo de imóvel, quantidade de quartos, pets, etc.) que estava sendo discutido.
+    
+    REGRAS CRÍTICAS:
+    - NÃO responda à pergunta do cliente.
+    - NÃO adicione saudações, explicações ou confirmações.
+    - Se a 'Nova pergunta' já for completa e não depender do contexto, apenas repita-a.
+    - Retorne APENAS a frase reescrita, nada mais.
+    
+    Exemplo de Contexto:
+    Cliente: Queria casas no Centro.
+    Bia: Não temos casas lá.
+    Nova pergunta: E no São Mateus?
+    
+    Sua Resposta Esperada:
+    Tem casas no São Mateus?
+    """
+    
+    prompt = f"Contexto recente:\n{contexto_str}\nNova pergunta: {nova_pergunta}\nSua Resposta Esperada:"
+    
+    try:
+        # Stream filtrado: o raciocínio do DeepSeek (<think>/<thought>) nunca entra na reescrita
+        pedacos = pedacos_ollama(model, system_prompt, prompt, {'temperature': 0.0}, timeout=TIMEOUTS_ETAPAS['reescrita'])
+        reescrita = "".join(RespostaStream(pedacos, limite=TIMEOUTS_ETAPAS['reescrita']))
+        return reescrita.strip() or nova_pergunta
+    except Exception as e:
+        print(f"Erro no reescritor contextual: {e}")
+        # Se falhar, retorna a pergunta original como fallback de segurança
+        return nova_pergunta
+
+# ==========================================
+# AGENTE 1: ANALISTA SQL (Versão Final 5.0)
+# ==========================================
+class RodadaCancelada(Exception):
+    pass
+
+
+def _falhou(futuro):
+    return futuro.done() and (futuro.cancelled() or futuro.exception() is not None)
+
+
+class SQLAnalyst(ChromaDB_VectorStore, Ollama):
+    def __init__(self, config=None):
+        ChromaDB_VectorStore.__init__(self, config=config)
+        Ollama.__init__(self, config=config)
+        # Buscas no Chroma feitas em paralelo dentro do generate_sql (ver _contexto)
+        self._executor_chroma = ThreadPoolExecutor(max_workers=6, thread_name_prefix="chroma")
+        self._contextos = OrderedDict()
+        self._contextos_lock = threading.Lock()
+
+    def _contexto(self, pergunta):
+        """O generate_sql do Vanna busca exemplos, DDL e documentação no Chroma uma
+        após a outra; aqui as três são disparadas juntas na primeira chamada."""
+        # Embeda a pergunta antes: as três buscas acham o vetor no cache em vez de
+        # calcularem o mesmo embedding em paralelo
+        with rastreio.span("embedding"):
+            self.generate_embedding(pergunta)
+        with self._contextos_lock:
+            futuros = self._contextos.get(pergunta)
+            if futuros is not None and any(_falhou(f) for f in futuros.values()):
+                # Uma busca que falhou (Chroma ocupado, timeout) não fica memorizada: tenta de novo
+                futuros = None
+            if futuros is None:
+                buscas = {
+                    "sql": ChromaDB_VectorStore.get_similar_question_sql,
+                    "ddl": ChromaDB_VectorStore.get_related_ddl,
+                    "doc": ChromaDB_VectorStore.get_related_documentation,
+                }
+                futuros = {
+                    # Cópia do contexto: os spans das buscas ficam dentro do turno que as disparou
+                    nome: self._executor_chroma.submit(contextvars.copy_context().run, self._buscar, nome, busca, pergunta)
+                    for nome, busca in buscas.items()
+                }
+                self._contextos[pergunta] = futuros
+                # Só as perguntas mais recentes; o resultado só é útil dentro do mesmo turno
+                while len(self._contextos) > 32:
+                    self._contextos.popitem(last=False)
+        return futuros
+
+    def _buscar(self, nome, busca, pergunta):
+        with rastreio.span(f"chroma.{nome}") as span:
+            resultado = busca(self, pergunta)
+            span["itens"] = len(resultado or [])
+            return resultado
+
+    def get_similar_question_sql(self, question, **kwargs):
+        return self._contexto(question)["sql"].result()
+
+    def get_related_ddl(self, question, **kwargs):
+        return self._contexto(question)["ddl"].result()
+
+    def get_related_documentation(self, question, **kwargs):
+        return self._contexto(question)["doc"].result()
+
+    def submit_prompt(self, prompt, **kwargs):
+        """Mesma chamada do Vanna (ollama.chat sem stream), guardando modelo e tokens no rastreio."""
+        resposta = self.ollama_client.chat(
+            model=self.model, messages=prompt, stream=False, options=getattr(self, 'ollama_options', {}),
+            keep_alive=getattr(self, 'keep_alive', None),
+        )
+        rastreio.anotar(modelo=self.model)
+        rastreio.contar(chamadas_llm=1, prompt_tokens=resposta.get('prompt_eval_count'),
+                        completion_tokens=resposta.get('eval_count'))
+        return resposta['message']['content']
+
+    def conectar_pool(self, db_path, tamanho=4):
+        """Substitui o connect_to_sqlite do Vanna (uma conexão só, compartilhada entre
+        as threads do Streamlit) por um pool de conexões somente leitura."""
+        # Mesmo SQL (de frases diferentes) não re-executa até o banco mudar
+        self.pool = PoolLeitura(db_path, tamanho=tamanho, cache=CacheResultados(db_path))
+        # SQL vindo do LLM só roda depois de validado (ver executar_consulta)
+        self.guarda = GuardaSQL()
+        self.dialect = "SQLite"
+        self.run_sql = self.pool.run_sql
+        self.run_sql_is_set = True
+
+    def carregar_entidades(self):
+        df_meta = self.run_sql("SELECT DISTINCT bairro, rua, especificacao FROM core_imovel")
+        self.bairros = [str(x) for x in df_meta['bairro'].dropna().unique().tolist()]
+        self.ruas = [str(x) for x in df_meta['rua'].dropna().unique().tolist()]
+        self.tipos = [str(x) for x in df_meta['especificacao'].dropna().unique().tolist()]
+
+    def preparar_agente(self, db_path, usar_snapshot=True):
+        self.conectar_pool(db_path)
+        pasta = self.config.get("path", ".")
+
+        # Partida rápida: entidades e impressão digital vêm do snapshot do build, sem
+        # DISTINCT nem leitura do treino inteiro no Chroma
+        conteudo = snapshot.carregar(pasta, db_path) if usar_snapshot else None
+        if conteudo and conteudo.get("treino") != treino.hash_manifesto(treino.manifesto(conteudo["bairros"])):
+            # O manifesto de treino mudou desde o build: sincroniza pelo caminho normal
+            conteudo = None
+        if conteudo:
+            self.bairros, self.ruas, self.tipos = conteudo["bairros"], conteudo["ruas"], conteudo["tipos"]
+            impressao = conteudo["impressao_digital"]
+        else:
+            self.carregar_entidades()
+            # Só embeda o que mudou no manifesto desde a última sincronização
+            itens = treino.manifesto(self.bairros)
+            treino.sincronizar(self, itens)
+            impressao = self.impressao_digital()
+            snapshot.gravar(pasta, db_path, bairros=self.bairros, ruas=self.ruas, tipos=self.tipos,
+                            impressao_digital=impressao, treino=treino.hash_manifesto(itens))
+
+        self.preparar_cache_sql(impressao)
+        self.parser = ParserConsulta(self.bairros, self.tipos)
+        self.caminhos = {"rapido": 0, "llm": 0}
+        # Decide se a pergunta precisa da reescrita contextual (evita uma chamada ao deepseek)
+        self.gate = GateReescrita(self.parser, embedder=self.generate_embedding)
+
+    def impressao_digital(self):
+        """Hash do material de treino + schema: se qualquer um mudar, o cache de SQL é descartado."""
+        dados_treino = self.get_training_data().sort_values("id")[["id", "question", "content"]]
+        schema = self.run_sql("SELECT name, sql FROM sqlite_master WHERE name LIKE 'core_imovel%' ORDER BY name")
+        conteudo = dados_treino.to_csv(index=False) + schema.to_csv(index=False)
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+    def preparar_cache_sql(self, versao=None):
+        caminho = os.path.join(self.config.get("path", "."), "cache_sql.sqlite3")
+        self.cache_sql = CacheSQL(
+            caminho,
+            versao=versao or self.impressao_digital(),
+            embedder=self.generate_embedding,
+            termos_protegidos=self.bairros + self.ruas + self.tipos,
+        )
+
+    def registrar_caminho(self, caminho, especulativo=None):
+        rastreio.anotar(caminho=caminho)
+        if especulativo is not None:
+            # A rodada especulativa duplica a da pergunta reescrita; contar as duas distorce a
+            # taxa. Só conta se o pipeline usar o resultado (confirmar_especulativo)
+            especulativo.caminho = caminho
+            return
+        self.caminhos[caminho] += 1
+        total = sum(self.caminhos.values())
+        logger.info("Caminho %s; parser de regras resolveu %d de %d (%.0f%%)",
+                    caminho, self.caminhos["rapido"], total, 100 * self.caminhos["rapido"] / total)
+
+    def confirmar_especulativo(self, rodada):
+        """Grava o que a rodada especulativa deixou pendente, agora que o resultado dela foi usado."""
+        if rodada.para_cache:
+            self.cache_sql.guardar(*rodada.para_cache)
+        if rodada.caminho:
+            self.registrar_caminho(rodada.caminho)
+
+    def _guardar_sql(self, pergunta_limpa, sql, especulativo):
+        if especulativo is not None:
+            especulativo.para_cache = (pergunta_limpa, sql)
+        else:
+            self.cache_sql.guardar(pergunta_limpa, sql)
+
+    @staticmethod
+    def _checar_cancelamento(especulativo):
+        # Rodada especulativa descartada pelo pipeline: não gasta o banco com um SQL que ninguém vai usar
+        if especulativo is not None and especulativo.cancelada.is_set():
+            raise RodadaCancelada()
+
+    def fuzzy_cleanup(self, pergunta):
+        pergunta_limpa = str(pergunta).lower().strip()
+        if any(x in pergunta_limpa for x in ["gato", "cachorro", "animal", "pet"]):
+            pergunta_limpa += " que aceita pets"
+        return pergunta_limpa
+
+    def executar_consulta(self, pergunta, especulativo=None):
+        """`especulativo` (pipeline.RodadaEspeculativa) marca a rodada sobre a pergunta ainda
+        não reescrita: o SQL pode depender de um contexto que falta na pergunta, então o
+        cache de SQL e a contagem de caminhos só são gravados se o pipeline confirmar."""
+        pergunta_limpa = self.fuzzy_cleanup(pergunta)
+
+        # Caminho rápido: pergunta simples (bairro/tipo/quartos/valor/pets) vira SQL sem LLM
+        with rastreio.span("parser") as span:
+            campos, confianca = self.parser.interpretar(pergunta_limpa)
+            span["confianca"] = round(confianca, 2)
+        if confianca >= CONFIANCA_MINIMA:
+            sql, params = self.parser.montar_sql(campos)
+            try:
+                df = self.run_sql(sql, params)
+                self.registrar_caminho("rapido", especulativo)
+                return df, sql_legivel(sql, params)
+            except Exception:
+                logger.exception("Caminho rápido falhou para %r", pergunta_limpa)
+        self.registrar_caminho("llm", especulativo)
+
+        # Pergunta repetida (ou quase idêntica): reaproveita o SQL já validado, sem LLM
+        with rastreio.span("cache_sql") as span:
+            sql = self.cache_sql.buscar(pergunta_limpa)
+            span["hit"] = bool(sql)
+        if sql:
+            try:
+                return self.guarda.executar(self.pool, sql)
+            except Exception:
+                self.cache_sql.invalidar(sql)
+                rastreio.contar(cache_sql_invalidado=1)
+        
+        try:
+            # A guarda recusa o que não for um SELECT de leitura, ajusta o LIMIT e roda com orçamento
+            with rastreio.span("generate_sql", tentativa=1):
+                sql = self.generate_sql(pergunta_limpa)
+            self._checar_cancelamento(especulativo)
+            df, sql = self.guarda.executar(self.pool, sql)
+            self._guardar_sql(pergunta_limpa, sql, especulativo)
+            return df, sql
+        except RodadaCancelada:
+            return None, "Rodada especulativa cancelada."
+        except Exception as e:
+            rastreio.contar(tentativas_correcao=1)
+            try:
+                prompt_correcao = f"A pergunta era '{pergunta_limpa}'. O SQL gerado falhou com o erro: {str(e)}. Gere apenas o SQL corrigido, sem explicações."
+                with rastreio.span("generate_sql", tentativa=2, erro_anterior=str(e)[:200]):
+                    sql_corrigido = self.generate_sql(prompt_correcao)
+                self._checar_cancelamento(especulativo)
+                df, sql_corrigido = self.guarda.executar(self.pool, sql_corrigido)
+                self._guardar_sql(pergunta_limpa, sql_corrigido, especulativo)
+                return df, sql_corrigido
+            except RodadaCancelada:
+                return None, "Rodada especulativa cancelada."
+            except Exception as e2:
+                return None, f"Falha na consulta e na tentativa de correção. Erro: {str(e2)}"
+
+# ==========================================
+# AGENTE 2: BIA (Persona Geofenced)
+# ==========================================
+class BiaPersona:
+    def __init__(self, bairros_validos, model_name='deepseek-r1:8b', cache=None):
+        self.model = model_name
+        self.bairros_validos = bairros_validos
+        self.cache = cache
+        self.system_prompt = f"""
+        Você é a Bia, secretária virtual de uma imobiliária em Juiz de Fora.
+        REGRAS:
+        1. Se o banco de dados retornar 'Vazio' ou 'Nenhum imóvel', não invente dados. Diga que não encontrou e sugira bairros como: {", ".join(self.bairros_validos[:5])}.
+        2. Nunca use termos técnicos de programação ou mencione SQL/Banco de dados.
+        3. Para cálculos, use os valores de aluguel, IPTU e condomínio fornecidos.
+        4. Seja simpática, concisa e vá direto ao ponto.
+        """
+
+    def responder_stream(self, pergunta_original, df, inicio=None):
+        """Resposta como RespostaStream: trechos visíveis conforme o modelo gera, com TTFT."""
+        # PROTEÇÃO MÁXIMA: Se não tem dado, nem chama a LLM. Retorna texto fixo.
+        if df is None or isinstance(df, str) or df.empty:
+            bairros_sugestao = ", ".join(self.bairros_validos[:3])
+            texto = f"Poxa, infelizmente não encontrei nenhum imóvel com essas características no banco de dados. Que tal tentarmos em outros bairros como {bairros_sugestao}?"
+            return RespostaStream([texto], pensa=False, inicio=inicio)
+            
+        # Se tem dado, aí sim passa para a LLM formatar
+        contexto = df.head(5).to_dict(orient='records') 
+
+        # Pergunta popular com as mesmas linhas de resultado: devolve a resposta já gerada
+        ao_terminar = None
+        if self.cache is not None:
+            chave = self.cache.chave(pergunta_original, contexto, self.model, self.system_prompt)
+            resposta = self.cache.buscar(chave)
+            rastreio.anotar(cache="hit" if resposta is not None else "miss")
+            if resposta is not None:
+                return RespostaStream([resposta], pensa=False, inicio=inicio)
+            ao_terminar = lambda texto: self.cache.guardar(chave, texto)
+
+        prompt = f"Pergunta do Cliente: {pergunta_original}\nDados Reais do Banco: {contexto}\nBia, responda:"
+        return RespostaStream(
+            pedacos_ollama(self.model, self.system_prompt, prompt, {'temperature': 0.1}, timeout=TIMEOUTS_ETAPAS['resposta']),
+            inicio=inicio,
+            limite=TIMEOUTS_ETAPAS['resposta'],
+            ao_terminar=ao_terminar,
+            mensagem_erro="Tive uma falha técnica rápida, mas posso pesquisar outro bairro para você em JF!",
+        )
+
+    def responder(self, pergunta_original, df):
+        return "".join(self.responder_stream(pergunta_original, df)).strip()
+
+
+# ==========================================
+# PARTIDA: CARREGAMENTO, AQUECIMENTO E BUILD
+# ==========================================
+def localizar_banco():
+    return "db.sqlite3" if os.path.exists("db.sqlite3") else "../db.sqlite3"
+
+
+def inicializar_agentes(db_path=None, usar_snapshot=True, pasta=None, embedding=None):
+    """`pasta` troca o diretório do Chroma e dos caches; `embedding` é um par
+    (função, nome do modelo) no lugar do embedder padrão do Chroma. Os dois servem
+    para rodar isolado, como no benchmark_chat.py."""
+    config = dict(CONFIG_SQL, path=pasta or CONFIG_SQL["path"])
+    # O Vanna não lê o OLLAMA_HOST (o cliente do ollama lê): assim tudo vai para o mesmo servidor
+    config.setdefault("ollama_host", os.environ.get("OLLAMA_HOST", "http://localhost:11434"))
+    funcao, modelo = embedding or (embedding_functions.DefaultEmbeddingFunction(), "all-MiniLM-L6-v2")
+    # Vetores por hash do conteúdo: a pergunta é embedada uma vez para as três coleções,
+    # e a sincronização do treino reaproveita o que já foi calculado
+    config["embedding_function"] = CacheEmbeddings(
+        funcao,
+        os.path.join(config["path"], "embeddings.sqlite3"),
+        modelo=modelo,
+    )
+    analista = SQLAnalyst(config=config)
+    analista.preparar_agente(db_path or localizar_banco(), usar_snapshot=usar_snapshot)
+
+    cache_respostas = CacheRespostas(os.path.join(config["path"], "cache_respostas.sqlite3"))
+    bia = BiaPersona(bairros_validos=analista.bairros, model_name=MODELO_BIA, cache=cache_respostas)
+    return analista, bia
+
+
+def aquecer_modelos(analista, bia):
+    """Carrega os modelos no ollama (prompt vazio não gera nada) e o modelo de
+    embedding do Chroma, para que a primeira pergunta não pague esse tempo."""
+    modelos = dict.fromkeys([analista.config["model"], bia.model, MODELO_BIA])
+    for modelo in modelos:
+        try:
+            ollama.generate(model=modelo, prompt="", keep_alive=MANTER_CARREGADO)
+        except Exception:
+            logger.warning("Não foi possível aquecer o modelo %s", modelo, exc_info=True)
+    try:
+        analista.generate_embedding("aquecimento")
+    except Exception:
+        logger.warning("Não foi possível aquecer o embedding", exc_info=True)
+    logger.info("Aquecimento concluído: %s", ", ".join(modelos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--construir-snapshot', action='store_true', help='Sincroniza o treino com o manifesto e grava o snapshot')
+    parser.add_argument('--db', help='Caminho do db.sqlite3 (padrão: ./db.sqlite3 ou ../db.sqlite3)')
+    args = parser.parse_args()
+    if not args.construir_snapshot:
+        parser.print_help()
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    analista, bia = inicializar_agentes(args.db, usar_snapshot=False)
+    # Baixa/carrega o modelo de embedding agora, e não na primeira pergunta em produção
+    analista.generate_embedding("aquecimento")
+    conteudo = snapshot.carregar(CONFIG_SQL["path"], args.db or localizar_banco())
+    print(f"Snapshot v{conteudo['versao']} gravado em {CONFIG_SQL['path']}: "
+          f"{len(analista.bairros)} bairros, {len(analista.ruas)} ruas, {len(analista.tipos)} tipos, "
+          f"treino {conteudo['impressao_digital'][:12]}")
+
+
+if __name__ == "__main__":
+    main()
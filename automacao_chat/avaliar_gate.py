@@ -0,0 +1,102 @@
+"""Mede o GateReescrita num conjunto de conversas rotuladas: quantas reescritas
+ele evita e quantas perguntas dependentes do contexto ele deixaria passar sem
+reescrita (essas sim pioram a resposta). Uso:
+
+    python avaliar_gate.py
+    python avaliar_gate.py --db ../db.sqlite3     # bairros/tipos reais
+    python avaliar_gate.py --embeddings           # usa o embedder padrão do Chroma nos casos indecisos
+"""
+import argparse
+
+from benchmark_entidades import BAIRROS, TIPOS, entidades_do_banco
+from gate_reescrita import GateReescrita
+from parser_consulta import ParserConsulta
+
+# (pergunta anterior já completa, nova pergunta, precisa de reescrita?)
+CASOS = [
+    # Perguntas que já chegam completas
+    ("Casas no Centro até 2000 reais", "Apartamentos no São Mateus até 1500 reais", False),
+    ("Apartamento com 2 quartos no Centro", "Kitnet no Granbery com 1 quarto", False),
+    ("Casas no Benfica", "Tem apartamento no Cascatinha que aceita pets?", False),
+    ("Qual o apartamento mais barato no Centro?", "Qual a casa mais barata no Bom Pastor?", False),
+    ("Kitnet em São Mateus até 1500", "Qual o custo total do imóvel 131?", False),
+    ("Casas no Centro", "Apartamentos no Centro com 3 quartos", False),
+    ("Apartamentos no Granbery", "Casas no Paineiras entre 1500 e 3000 reais", False),
+    ("Quero uma casa no Alto dos Passos", "Tem kitnet no Centro?", False),
+    ("Apartamento até 2000 no Centro", "Casa até 3000 no São Pedro", False),
+    ("Imóveis que aceitam pets no Benfica", "Apartamentos no Santa Helena que aceitam gatos", False),
+    ("Casas com 3 quartos no Grama", "Apartamento com 2 quartos no Grama até 1800", False),
+    ("Qual o imóvel mais caro?", "Quais apartamentos no Centro?", False),
+    ("Kitnets no Centro", "Lojas no Centro", False),
+    ("Casa no Bairu", "Quero um apartamento no Jardim Glória até 2500", False),
+    ("Apartamentos no Centro", "Quais os detalhes do imóvel 42?", False),
+    ("Casas no Benfica", "Quais bairros vocês atendem?", False),
+    ("Casas no Centro até 2000 reais", "Apartamentos no Centro acima de 3000", False),
+    ("Kitnets no Benfica", "Casas no São Mateus acima de R$ 2.500", False),
+    # Dependentes do contexto
+    ("Queria casas no Centro", "E no São Mateus?", True),
+    ("Apartamentos no Granbery até 2000", "E com 3 quartos?", True),
+    ("Casas no Benfica", "Tem mais barato?", True),
+    ("Kitnet no Centro", "Quanto custa o primeiro?", True),
+    ("Apartamento no Cascatinha", "Esse aceita pets?", True),
+    ("Casas no São Pedro", "E apartamentos?", True),
+    ("Apartamentos no Centro com 2 quartos", "Tem algum até 1500?", True),
+    ("Casas no Bom Pastor", "Mostra outras opções", True),
+    ("Apartamento no Granbery", "Qual o endereço dele?", True),
+    ("Casas no Centro até 3000", "Mas que aceite cachorro", True),
+    ("Kitnets em São Mateus", "E no mesmo bairro, casas?", True),
+    ("Apartamentos no Centro", "Tem lá com garagem?", True),
+    ("Casas com 2 quartos no Benfica", "E com 3?", True),
+    ("Apartamento no Centro até 2000", "Qual o mais barato?", True),
+    ("Casas no Paineiras", "Com 4 quartos", True),
+    ("Apartamentos no Santa Helena", "Aceitam pets?", True),
+    ("Casas no Centro", "O imóvel acima aceita pets?", True),
+    ("Apartamentos no Granbery", "E acima de 2000?", True),
+]
+
+
+def historico_de(anterior):
+    return [
+        {"role": "user", "content": anterior},
+        {"role": "assistant", "content": "(resposta da Bia)", "pergunta_traduzida": anterior},
+    ]
+
+
+def embedder_padrao():
+    from chromadb.utils import embedding_functions
+    funcao = embedding_functions.DefaultEmbeddingFunction()
+    return lambda texto: funcao([texto])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='Usa bairros/tipos reais de um db.sqlite3')
+    parser.add_argument('--embeddings', action='store_true')
+    args = parser.parse_args()
+
+    bairros, _, tipos = entidades_do_banco(args.db) if args.db else (BAIRROS, None, TIPOS)
+    gate = GateReescrita(ParserConsulta(bairros, tipos), embedder=embedder_padrao() if args.embeddings else None)
+
+    falsos_pulos, reescritas_inuteis = [], []
+    for anterior, nova, esperado in CASOS:
+        precisa, motivo = gate.decidir(nova, historico_de(anterior))
+        gate.motivos[motivo] += 1
+        if esperado and not precisa:
+            falsos_pulos.append((anterior, nova, motivo))
+        elif precisa and not esperado:
+            reescritas_inuteis.append((anterior, nova, motivo))
+
+    completas = sum(1 for *_, esperado in CASOS if not esperado)
+    print(f"{len(CASOS)} turnos com histórico ({completas} já completos, {len(CASOS) - completas} dependentes)")
+    print(f"Reescritas evitadas: {gate.evitadas} de {gate.avaliadas} ({100 * gate.evitadas / gate.avaliadas:.0f}% das chamadas ao deepseek)")
+    print(f"Motivos: {dict(gate.motivos)}")
+    print(f"\nDependentes que ficariam sem reescrita (perda de qualidade): {len(falsos_pulos)}")
+    for anterior, nova, motivo in falsos_pulos:
+        print(f"    {anterior!r} -> {nova!r} [{motivo}]")
+    print(f"Completas reescritas mesmo assim (só custo): {len(reescritas_inuteis)}")
+    for anterior, nova, motivo in reescritas_inuteis:
+        print(f"    {anterior!r} -> {nova!r} [{motivo}]")
+
+
+if __name__ == "__main__":
+    main()
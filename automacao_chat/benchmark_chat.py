@@ -0,0 +1,321 @@
+"""Benchmark do chat inteiro (gate, reescrita, SQL e resposta da Bia) num conjunto
+de perguntas rotuladas (perguntas_benchmark.json: SQL esperado ou ids esperados).
+Sobe um ollama falso local (ollama_falso.py) e aponta o OLLAMA_HOST para ele: sem
+--upstream tudo vem das gravações (sem rede); com --upstream as chamadas vão ao
+ollama real, e com --gravar ficam gravadas para os próximos replays. As gravações
+não vêm no repositório: grave uma vez antes do primeiro replay. Sem o arquivo, ou
+se alguma resposta não estiver gravada, o benchmark falha (os números não valeriam);
+--permitir-sem-gravacao aceita as respostas determinísticas no lugar. Uso:
+
+    python benchmark_chat.py --db ../db.sqlite3 --upstream http://localhost:11434 --gravar
+    python benchmark_chat.py --db ../db.sqlite3
+    python benchmark_chat.py --db ../db.sqlite3 --repeticoes 2 --ms-por-token 20 --json resultado.json
+    python benchmark_chat.py --db ../db.sqlite3 --tags parser,fuzzy --expandir 200
+
+Mede, por etapa e por span do rastreio (generate_sql, chroma, run_sql...),
+p50/p90/p99 (ms); chamadas ao LLM, tokens de prompt e de geração; e a acurácia do SQL: a consulta acerta se os ids devolvidos estão
+contidos no resultado esperado (sem LIMIT) e vazio só quando o esperado é vazio.
+"""
+import argparse
+import contextvars
+import itertools
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import rastreio
+from benchmark_entidades import entidades_do_banco
+from ollama_falso import GRAVACOES_PADRAO, OllamaFalso
+
+PERGUNTAS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perguntas_benchmark.json")
+ETAPAS = ["reescrita", "sql", "preparacao", "ttft", "turno"]
+RESPOSTA_ANTERIOR = "Encontrei algumas opções para você! Quer que eu detalhe alguma?"
+
+# O turno roda fora da thread principal, como no Streamlit: na principal, o asyncio.run
+# instala um handler de SIGINT e, ao restaurá-lo (Python 3.11), monta o repr da tarefa
+# já concluída, com o DataFrame dentro (~50ms por turno que a interface não paga)
+_thread_turno = ThreadPoolExecutor(max_workers=1, thread_name_prefix="turno")
+
+
+# ==========================================
+# CONJUNTO DE PERGUNTAS
+# ==========================================
+def carregar_casos(caminho, tags=None):
+    with open(caminho, encoding="utf-8") as arquivo:
+        casos = json.load(arquivo)
+    if tags:
+        casos = [c for c in casos if set(tags) & set(c.get("tags", []))]
+    return casos
+
+
+def expandir_casos(db_path, quantidade, semente=42):
+    """Perguntas sintéticas (tipo x bairro x quartos/valor/pets) com o SQL esperado
+    montado junto, para medir o caminho rápido em volume."""
+    bairros, _, tipos = entidades_do_banco(db_path)
+    tipos = [t for t in tipos if t.strip()]
+    plurais = {'apartamento': 'Apartamentos', 'casa': 'Casas', 'kitnet': 'Kitnets', 'comercio': 'Lojas'}
+    variacoes = [
+        ("", "", []),
+        (" com {n} quartos", " AND quartos >= {n}", ["quartos"]),
+        (" até {v} reais", " AND custo_total <= {v}", ["valor"]),
+        (" que aceita pets", " AND aceita_pets = 1", ["pets"]),
+    ]
+    combinacoes = list(itertools.product(tipos, bairros, variacoes))
+    aleatorio = random.Random(semente)
+    aleatorio.shuffle(combinacoes)
+    casos = []
+    for tipo, bairro, (frase, filtro, tags) in combinacoes[:quantidade]:
+        n, v = aleatorio.randint(1, 4), aleatorio.choice([1000, 1500, 2000, 2500, 3000])
+        nome = plurais.get(tipo.lower(), tipo.capitalize())
+        bairro_sql = bairro.replace("'", "''")
+        casos.append({
+            "pergunta": f"{nome} no {bairro}" + frase.format(n=n, v=v),
+            "sql_esperado": (f"SELECT * FROM core_imovel WHERE LOWER(especificacao) = '{tipo.lower()}' "
+                             f"AND bairro = '{bairro_sql}'" + filtro.format(n=n, v=v)),
+            "tags": ["sintetica", *tags],
+        })
+    return casos
+
+
+def montar_historico(anteriores):
+    historico = []
+    for pergunta in anteriores:
+        historico += [{"role": "user", "content": pergunta}, {"role": "assistant", "content": RESPOSTA_ANTERIOR}]
+    return historico
+
+
+# ==========================================
+# ACURÁCIA DO SQL
+# ==========================================
+def ids_esperados(conn, caso):
+    if "ids_esperados" in caso:
+        return set(caso["ids_esperados"])
+    return {linha[0] for linha in conn.execute(f"SELECT id FROM ({caso['sql_esperado']})")}
+
+
+def conferir(df, esperados):
+    """(acertou, motivo)."""
+    if df is None or isinstance(df, str):
+        return False, "erro"
+    if "id" not in df.columns:
+        return False, "sem_id"
+    obtidos = {int(i) for i in df["id"].dropna()}
+    if not obtidos <= esperados:
+        return False, "linhas_erradas"
+    if bool(obtidos) != bool(esperados):
+        return False, "vazio"
+    return True, "ok"
+
+
+# ==========================================
+# EXECUÇÃO
+# ==========================================
+def cronometrar(amostras, etapa, funcao):
+    def medida(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            amostras[etapa].append(time.perf_counter() - inicio)
+    return medida
+
+
+def rodar_caso(agentes, analista, bia, ollama, conn, caso, amostras, com_resposta=True, gate=True):
+    amostras.clear()
+    antes_ollama = ollama.estatisticas()
+    antes_caminhos = dict(analista.caminhos)
+    reescrever = cronometrar(amostras, "reescrita", agentes.reescrever_pergunta_com_contexto)
+    historico = montar_historico(caso.get("anterior", []))
+
+    with rastreio.rastrear_turno(pergunta=caso["pergunta"]) as rastro:
+        inicio = time.perf_counter()
+        pergunta_usada, df, sql = _thread_turno.submit(
+            contextvars.copy_context().run, agentes.executar_turno, analista, reescrever, caso["pergunta"],
+            historico, gate=analista.gate if gate else None,
+        ).result()
+        preparacao = time.perf_counter() - inicio
+        ttft = turno = None
+        if com_resposta:
+            with rastreio.span("resposta"):
+                stream = bia.responder_stream(caso["pergunta"], df, inicio=inicio)
+                for _ in stream:
+                    pass
+            ttft, turno = stream.ttft, stream.duracao
+    spans = defaultdict(list)
+    for s in rastro.para_dict()["spans"]:
+        spans[s["nome"]].append(s["duracao_ms"] / 1000)
+
+    depois = ollama.estatisticas()
+    acerto, motivo = conferir(df, ids_esperados(conn, caso))
+    return {
+        "pergunta": caso["pergunta"],
+        "tags": caso.get("tags", []),
+        "pergunta_usada": pergunta_usada,
+        "sql": sql,
+        "caminho": next((c for c in analista.caminhos if analista.caminhos[c] > antes_caminhos.get(c, 0)), None),
+        "acerto": acerto,
+        "motivo": motivo,
+        "etapas": {
+            "reescrita": list(amostras["reescrita"]),
+            "sql": list(amostras["sql"]),
+            "preparacao": [preparacao],
+            "ttft": [ttft] if ttft is not None else [],
+            "turno": [turno if turno is not None else preparacao],
+        },
+        "spans": dict(spans),
+        "chamadas": dict(Counter(depois["chamadas"]) - Counter(antes_ollama["chamadas"])),
+        **{k: depois[k] - antes_ollama[k] for k in ("prompt_tokens", "completion_tokens", "sem_gravacao")},
+    }
+
+
+def percentil(valores, p):
+    """Percentil pelo posto mais próximo (sem interpolação)."""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def _percentis(valores):
+    return {"n": len(valores), **{f"p{p}": percentil(valores, p) * 1000 for p in (50, 90, 99)},
+            "max": max(valores) * 1000}
+
+
+def resumir(resultados):
+    etapas = {}
+    for etapa in ETAPAS:
+        valores = [v for r in resultados for v in r["etapas"][etapa]]
+        if valores:
+            etapas[etapa] = _percentis(valores)
+    nomes = sorted({nome for r in resultados for nome in r["spans"]})
+    spans = {nome: _percentis([v for r in resultados for v in r["spans"].get(nome, [])]) for nome in nomes}
+    chamadas = sum((Counter(r["chamadas"]) for r in resultados), Counter())
+    por_tag = defaultdict(lambda: [0, 0])
+    for r in resultados:
+        for tag in r["tags"] or ["(sem tag)"]:
+            por_tag[tag][0] += r["acerto"]
+            por_tag[tag][1] += 1
+    total = len(resultados)
+    return {
+        "perguntas": total,
+        "etapas_ms": etapas,
+        "spans_ms": spans,
+        "chamadas_llm": {k: v for k, v in chamadas.items() if not k.startswith("/api/embed")},
+        "chamadas_embedding": {k: v for k, v in chamadas.items() if k.startswith("/api/embed")},
+        "prompt_tokens": sum(r["prompt_tokens"] for r in resultados),
+        "completion_tokens": sum(r["completion_tokens"] for r in resultados),
+        "sem_gravacao": sum(r["sem_gravacao"] for r in resultados),
+        "caminhos": dict(Counter(r["caminho"] for r in resultados)),
+        "reescritas": sum(bool(r["etapas"]["reescrita"]) for r in resultados),
+        "acertos": sum(r["acerto"] for r in resultados),
+        "motivos": dict(Counter(r["motivo"] for r in resultados)),
+        "acuracia_por_tag": {tag: {"acertos": a, "total": n} for tag, (a, n) in sorted(por_tag.items())},
+    }
+
+
+def imprimir(titulo, resumo):
+    total = resumo["perguntas"] or 1
+    print(f"\n=== {titulo}: {resumo['perguntas']} perguntas ===")
+    for cabecalho, tabela in (("etapa", resumo["etapas_ms"]), ("span", resumo["spans_ms"])):
+        print(f"{cabecalho:<16}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'máx':>10}   (ms)")
+        for nome, m in tabela.items():
+            print(f"{nome:<16}{m['n']:>6}{m['p50']:>10.1f}{m['p90']:>10.1f}{m['p99']:>10.1f}{m['max']:>10.1f}")
+
+    llm = sum(resumo["chamadas_llm"].values())
+    print(f"\nChamadas ao LLM: {llm} ({llm / total:.2f} por pergunta)")
+    for chave, n in sorted(resumo["chamadas_llm"].items()):
+        print(f"  {chave:<40}{n:>6}")
+    print(f"Embeddings: {sum(resumo['chamadas_embedding'].values())} requisições")
+    print(f"Tokens: prompt {resumo['prompt_tokens']} ({resumo['prompt_tokens'] / total:.0f}/pergunta), "
+          f"geração {resumo['completion_tokens']} ({resumo['completion_tokens'] / total:.0f}/pergunta)")
+    print(f"Caminhos: {resumo['caminhos']}; reescritas feitas: {resumo['reescritas']}")
+
+    print(f"\nAcurácia do SQL: {resumo['acertos']}/{resumo['perguntas']} "
+          f"({100 * resumo['acertos'] / total:.1f}%)  motivos: {resumo['motivos']}")
+    for tag, a in resumo["acuracia_por_tag"].items():
+        print(f"  {tag:<14}{a['acertos']:>4}/{a['total']:<4}")
+    if resumo["sem_gravacao"]:
+        print(f"\nAtenção: {resumo['sem_gravacao']} respostas do ollama não estavam gravadas e vieram do "
+              "padrão determinístico (latência e acurácia do caminho LLM não valem). Grave com --upstream --gravar.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='Caminho do db.sqlite3 (padrão: ./db.sqlite3 ou ../db.sqlite3)')
+    parser.add_argument('--perguntas', default=PERGUNTAS_PADRAO, help='JSON com as perguntas rotuladas')
+    parser.add_argument('--tags', help='Só os casos com alguma destas tags (separadas por vírgula)')
+    parser.add_argument('--expandir', type=int, default=0, help='Soma N perguntas sintéticas tiradas do banco')
+    parser.add_argument('--repeticoes', type=int, default=1, help='Passadas pelo conjunto (a 2ª mede os caches)')
+    parser.add_argument('--gravacoes', default=GRAVACOES_PADRAO, help='Respostas gravadas do ollama (JSONL)')
+    parser.add_argument('--upstream', help='URL do ollama real; sem ela, só replay (sem rede)')
+    parser.add_argument('--gravar', action='store_true', help='Grava as respostas do upstream em --gravacoes')
+    parser.add_argument('--permitir-sem-gravacao', action='store_true',
+                        help='Não falha quando faltam gravações: usa respostas determinísticas (só para testar o harness)')
+    parser.add_argument('--ms-por-token', type=float, default=0.0, help='Ritmo simulado da geração no replay')
+    parser.add_argument('--ms-primeiro-token', type=float, default=0.0, help='Espera simulada antes do 1º pedaço')
+    parser.add_argument('--embedding', choices=['ollama', 'chroma'], default='ollama',
+                        help='ollama: nomic-embed-text pelo servidor (gravado); chroma: modelo ONNX local')
+    parser.add_argument('--pasta', help='Pasta do Chroma e dos caches (padrão: temporária, caches frios)')
+    parser.add_argument('--sem-resposta', action='store_true', help='Não gera a resposta da Bia')
+    parser.add_argument('--sem-gate', action='store_true', help='Reescreve sempre que houver histórico')
+    parser.add_argument('--json', help='Grava os resultados por pergunta e o resumo neste arquivo')
+    args = parser.parse_args()
+    if not args.upstream and not os.path.exists(args.gravacoes) and not args.permitir_sem_gravacao:
+        parser.error(f"{args.gravacoes} não existe: grave com --upstream URL --gravar "
+                     "(ou use --permitir-sem-gravacao para rodar só com respostas determinísticas)")
+
+    ollama = OllamaFalso(args.gravacoes, upstream=args.upstream, gravar=args.gravar, porta=0,
+                         ms_por_token=args.ms_por_token, ms_primeiro_token=args.ms_primeiro_token)
+    # Antes de importar os agentes: o cliente padrão do ollama lê o OLLAMA_HOST na importação
+    os.environ["OLLAMA_HOST"] = ollama.iniciar()
+    import agentes
+    from embeddings import embedder_ollama
+
+    db_path = args.db or agentes.localizar_banco()
+    pasta = args.pasta or tempfile.mkdtemp(prefix="benchmark_chat_")
+    embedding = (embedder_ollama("nomic-embed-text", host=ollama.url), "nomic-embed-text") \
+        if args.embedding == 'ollama' else None
+
+    inicio = time.perf_counter()
+    analista, bia = agentes.inicializar_agentes(db_path, usar_snapshot=False, pasta=pasta, embedding=embedding)
+    partida = time.perf_counter() - inicio
+    print(f"Agentes prontos em {partida:.2f}s (pasta {pasta}, ollama {ollama.url}); {ollama.estatisticas()['chamadas']}")
+
+    casos = carregar_casos(args.perguntas, args.tags.split(",") if args.tags else None)
+    if args.expandir:
+        casos += expandir_casos(db_path, args.expandir)
+
+    amostras = defaultdict(list)
+    analista.executar_consulta = cronometrar(amostras, "sql", analista.executar_consulta)
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    passadas = []
+    for passada in range(1, args.repeticoes + 1):
+        resultados = []
+        for caso in casos:
+            resultados.append(rodar_caso(agentes, analista, bia, ollama, conn, caso, amostras,
+                                         com_resposta=not args.sem_resposta, gate=not args.sem_gate))
+        resumo = resumir(resultados)
+        imprimir(f"Passada {passada}" + (" (caches frios)" if passada == 1 and not args.pasta else ""), resumo)
+        passadas.append({"resumo": resumo, "resultados": resultados})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump({"partida_s": partida, "argumentos": vars(args), "passadas": passadas},
+                      arquivo, ensure_ascii=False, indent=1, default=str)
+        print(f"\nResultados em {args.json}")
+    # Conta também a partida (embeddings do treino), que fica fora das passadas
+    sem_gravacao = ollama.estatisticas()["sem_gravacao"]
+    ollama.parar()
+
+    if sem_gravacao and not args.permitir_sem_gravacao:
+        print(f"\nFalhou: {sem_gravacao} respostas não estavam gravadas em {args.gravacoes}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
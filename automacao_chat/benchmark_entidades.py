@@ -0,0 +1,116 @@
+"""Compara o fuzzy_cleanup antigo (extractOne na lista inteira, por palavra) com o
+IndiceEntidades. Uso:
+
+    python benchmark_entidades.py                 # entidades sintéticas (5.000 ruas)
+    python benchmark_entidades.py --ruas 20000
+    python benchmark_entidades.py --db ../db.sqlite3
+"""
+import argparse
+import itertools
+import random
+import sqlite3
+import statistics
+import time
+
+from rapidfuzz import process
+
+from indice_entidades import IndiceEntidades, normalizar
+
+BAIRROS = [
+    'Centro', 'São Mateus', 'Alto dos Passos', 'Bom Pastor', 'Cascatinha', 'Granbery',
+    'Santa Helena', 'Jardim Glória', 'Morro da Glória', 'Paineiras', 'São Pedro',
+    'Cruzeiro do Sul', 'Benfica', 'Manoel Honório', 'Mariano Procópio', 'Santa Luzia',
+    'Vitorino Braga', 'Grama', 'Bairu', 'Costa Carvalho',
+]
+TIPOS = ['apartamento', 'casa', 'kitnet', 'comercio']
+PERGUNTAS = [
+    "Qual o apartamento mais barato no Centro?",
+    "Quais casas tem no bairo Benfika?",
+    "Tem cobertura no Benfica que aceita gatos?",
+    "Quero uma casa no alto dos passos com 3 quartos",
+    "kitnet em sao mateus ate 1500 reais",
+    "Imóveis na Rua Padre Cafe perto da UFJF",
+    "apartamento na cascatinha ou no granbery",
+    "Qual o custo total do imóvel 131?",
+]
+
+
+def ruas_sinteticas(quantidade, semente=42):
+    prefixos = ['Rua', 'Avenida', 'Travessa', 'Praça', 'Alameda']
+    nomes = ['José', 'Maria', 'Antônio', 'Francisco', 'Paulo', 'Pedro', 'Lucas', 'Luiz', 'Carlos',
+             'Ana', 'Helena', 'Marcos', 'Rafael', 'Joaquim', 'Teresa', 'Benedito', 'Sebastião']
+    sobrenomes = ['Silva', 'Souza', 'Oliveira', 'Pereira', 'Lima', 'Carvalho', 'Ferreira', 'Ribeiro',
+                  'Almeida', 'Costa', 'Gomes', 'Martins', 'Araújo', 'Barbosa', 'Rocha', 'Dias',
+                  'Moreira', 'Cardoso', 'Teixeira', 'Mendes', 'Nogueira', 'Freitas', 'Monteiro']
+    combinacoes = [f'{p} {n} {s}' for p, n, s in itertools.product(prefixos, nomes, sobrenomes)]
+    combinacoes += [f'{p} {n} {s} {t}' for p, n, s, t in itertools.product(prefixos, nomes, sobrenomes, sobrenomes[:8])]
+    random.Random(semente).shuffle(combinacoes)
+    return ['Rua Padre Café', 'Av. Rio Branco'] + combinacoes[:quantidade]
+
+
+def entidades_do_banco(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    linhas = conn.execute("SELECT DISTINCT bairro, rua, especificacao FROM core_imovel").fetchall()
+    colunas = list(zip(*linhas)) or [(), (), ()]
+    return [list(dict.fromkeys(str(v) for v in coluna if v)) for coluna in colunas]
+
+
+def fuzzy_cleanup_antigo(pergunta, entidades):
+    """Cópia do SQLAnalyst.fuzzy_cleanup anterior ao índice (sem a injeção de pets)."""
+    resultado = []
+    for t in pergunta.split():
+        t_norm = normalizar(t)
+        if t_norm.isdigit() or len(t_norm) <= 3:
+            resultado.append(t)
+            continue
+        match = process.extractOne(t_norm, [normalizar(e) for e in entidades], score_cutoff=90)
+        if match:
+            idx = [normalizar(e) for e in entidades].index(match[0])
+            resultado.append(entidades[idx])
+        else:
+            resultado.append(t)
+    return " ".join(resultado)
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        saida = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return saida, statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ruas', type=int, default=5000)
+    parser.add_argument('--db', help='Usa bairros/ruas/tipos reais de um db.sqlite3')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.db:
+        bairros, ruas, tipos = entidades_do_banco(args.db)
+    else:
+        bairros, ruas, tipos = BAIRROS, ruas_sinteticas(args.ruas), TIPOS
+    entidades = bairros + ruas + tipos
+
+    inicio = time.perf_counter()
+    indice = IndiceEntidades(entidades)
+    construcao = (time.perf_counter() - inicio) * 1000
+    print(f"{len(entidades)} entidades; índice montado em {construcao:.1f} ms\n")
+    print(f"{'pergunta':50} {'antigo (ms)':>12} {'índice (ms)':>12}")
+
+    totais = [0.0, 0.0]
+    for pergunta in PERGUNTAS:
+        antigo, t_antigo = medir(lambda: fuzzy_cleanup_antigo(pergunta, entidades), max(1, args.repeticoes // 5))
+        novo, t_novo = medir(lambda: indice.substituir(pergunta), args.repeticoes)
+        totais[0] += t_antigo
+        totais[1] += t_novo
+        print(f"{pergunta[:50]:50} {t_antigo:12.2f} {t_novo:12.3f}")
+        if antigo != novo:
+            print(f"    antigo: {antigo}\n    índice: {novo}")
+    print(f"\n{'total':50} {totais[0]:12.2f} {totais[1]:12.3f}  ({totais[0] / max(totais[1], 1e-9):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from cache_sql import normalizar_pergunta
+
+# ==========================================
+# CACHE DE RESPOSTAS DA BIA
+# ==========================================
+# Mesma pergunta + mesmas linhas do banco = mesma resposta; não precisa chamar o
+# modelo de novo. O arquivo é limitado em bytes e descarta as menos usadas (LRU).
+MAX_BYTES = 20 * 1024 * 1024
+
+
+def impressao_resultado(linhas):
+    """Hash estável das linhas enviadas ao modelo (ordem das chaves não importa)."""
+    conteudo = json.dumps(linhas, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+class CacheRespostas:
+    def __init__(self, caminho, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                resposta TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                usado_em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS respostas_usado_em ON respostas (usado_em);
+        """)
+
+    def chave(self, pergunta, linhas, *contexto):
+        """`contexto` entra na chave também (ex.: modelo e system prompt)."""
+        partes = [normalizar_pergunta(pergunta), impressao_resultado(linhas), *map(str, contexto)]
+        return hashlib.sha256('\x1f'.join(partes).encode('utf-8')).hexdigest()
+
+    def buscar(self, chave):
+        with self._lock, self._conn:
+            linha = self._conn.execute("SELECT resposta FROM respostas WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE respostas SET usado_em = ? WHERE chave = ?", (time.time(), chave))
+            self.stats['hits'] += 1
+            return linha[0]
+
+    def guardar(self, chave, resposta):
+        tamanho = len(resposta.encode('utf-8'))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?)", (chave, resposta, tamanho, time.time())
+            )
+            # Apaga as menos usadas até o total caber em max_bytes
+            self._conn.execute("""
+                DELETE FROM respostas WHERE chave IN (
+                    SELECT chave FROM (
+                        SELECT chave, SUM(tamanho) OVER (ORDER BY usado_em DESC, chave) AS acumulado
+                        FROM respostas
+                    ) WHERE acumulado > ?
+                )
+            """, (self.max_bytes,))
+
+    @property
+    def taxa_acerto(self):
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
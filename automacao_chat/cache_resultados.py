@@ -0,0 +1,95 @@
+import functools
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import sqlparse
+
+import rastreio
+
+# ==========================================
+# CACHE DE RESULTADOS DO run_sql
+# ==========================================
+# Frases diferentes costumam virar o mesmo SQL ("casas no centro" / "tem casa no
+# Centro?"). O DataFrame de cada SQL canônico + parâmetros fica em memória até o
+# banco mudar: o PRAGMA data_version de uma conexão sentinela muda sempre que
+# outra conexão (o admin, o importador, os triggers do FTS) faz commit, e aí o
+# cache inteiro é descartado. O total guardado é limitado em bytes (LRU).
+#
+# Os DataFrames devolvidos são compartilhados entre as conversas: quem usa não
+# deve alterá-los no lugar.
+MAX_BYTES = 64 * 1024 * 1024
+
+logger = logging.getLogger("bia.resultados")
+
+
+@functools.lru_cache(maxsize=1024)
+def sql_canonico(sql):
+    """Mesma consulta escrita de jeitos diferentes (espaços, caixa das palavras-chave,
+    comentários, ';' no fim) vira a mesma chave."""
+    texto = sqlparse.format(sql, keyword_case='upper', strip_comments=True, strip_whitespace=True)
+    return texto.strip().rstrip(';').strip()
+
+
+class CacheResultados:
+    def __init__(self, db_path, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'invalidacoes': 0}
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        # data_version só é comparável dentro da mesma conexão: uma fica reservada para isso
+        self._sentinela = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._versao = self._data_version()
+
+    def _data_version(self):
+        return self._sentinela.execute("PRAGMA data_version").fetchone()[0]
+
+    def _chave(self, sql, params):
+        return sql_canonico(sql), json.dumps(list(params) if params else [], default=str)
+
+    def _conferir_versao(self):
+        versao = self._data_version()
+        if versao != self._versao:
+            self._entradas.clear()
+            self.bytes = 0
+            self._versao = versao
+            self.stats['invalidacoes'] += 1
+            logger.info("Banco alterado (data_version %s): cache de resultados esvaziado", versao)
+
+    def obter(self, sql, params, calcular):
+        """DataFrame do cache, ou `calcular()` (que executa a consulta) guardado para a próxima."""
+        chave = self._chave(sql, params)
+        with self._lock:
+            self._conferir_versao()
+            versao = self._versao
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.stats['hits'] += 1
+                rastreio.anotar(cache="hit")
+                return self._entradas[chave][0]
+            self.stats['misses'] += 1
+        rastreio.anotar(cache="miss")
+
+        df = calcular()
+        tamanho = int(df.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            # Resultado lido antes de uma escrita que acabou de acontecer não entra
+            self._conferir_versao()
+            if self._versao != versao or tamanho > self.max_bytes // 4:
+                return df
+            if chave in self._entradas:
+                self.bytes -= self._entradas[chave][1]
+            self._entradas[chave] = (df, tamanho)
+            self.bytes += tamanho
+            while self.bytes > self.max_bytes:
+                _, (_, liberado) = self._entradas.popitem(last=False)
+                self.bytes -= liberado
+        return df
+
+    @property
+    def taxa_acerto(self):
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
@@ -0,0 +1,157 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+# ==========================================
+# CACHE SEMÂNTICO PERGUNTA -> SQL
+# ==========================================
+# Guarda o SQL que já rodou com sucesso para cada pergunta (normalizada). A busca
+# é exata primeiro e, se não achar, por similaridade de embedding -- mas só entre
+# perguntas com a mesma "assinatura" (números, bairros/tipos citados e palavras de
+# negação/atributo/comparação, na ordem), para que "até 1500 no Centro" nunca
+# reaproveite o SQL de "até 2000 no Centro" nem "não aceita pets" o de "aceita pets".
+SIMILARIDADE_MINIMA = 0.95
+MAX_ENTRADAS = 2000
+TTL_SEGUNDOS = 7 * 24 * 3600
+
+_NUMERO_RE = re.compile(r'\d+(?:[.,]\d+)?')
+_PALAVRA_RE = re.compile(r'\w+')
+
+# Palavras que mudam o sentido sem mudar números nem bairros -> forma canônica
+_MARCADORES = {
+    **dict.fromkeys(['nao', 'sem', 'nem', 'nenhum', 'nenhuma', 'exceto', 'proibido'], 'nao'),
+    **dict.fromkeys(['pet', 'pets', 'animal', 'animais', 'cachorro', 'cachorros', 'gato', 'gatos'], 'pets'),
+    **dict.fromkeys(['garagem', 'vaga', 'vagas', 'carro', 'carros'], 'garagem'),
+    **{p: p for p in ['ate', 'abaixo', 'acima', 'mais', 'menos', 'minimo', 'maximo']},
+}
+
+
+def normalizar_pergunta(texto):
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r'[^\w\s.,]', ' ', texto)
+    return re.sub(r'\s+', ' ', texto).strip(' .,')
+
+
+class CacheSQL:
+    """Cache persistente (SQLite) de pergunta normalizada -> SQL validado.
+
+    `versao` identifica treino + schema; se mudar, o cache é esvaziado ao abrir.
+    `embedder` recebe um texto e devolve o vetor (ex.: generate_embedding do Vanna).
+    """
+
+    def __init__(self, caminho, versao, embedder=None, termos_protegidos=(),
+                 similaridade_minima=SIMILARIDADE_MINIMA, max_entradas=MAX_ENTRADAS, ttl=TTL_SEGUNDOS):
+        self.embedder = embedder
+        self.similaridade_minima = similaridade_minima
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        # Termos mais longos primeiro, para "sao mateus" ganhar de "sao"
+        self.termos_protegidos = sorted(
+            {normalizar_pergunta(t) for t in termos_protegidos if t}, key=len, reverse=True
+        )
+        self.hits = {'exato': 0, 'similar': 0, 'miss': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT);
+            CREATE TABLE IF NOT EXISTS perguntas (
+                pergunta TEXT PRIMARY KEY,
+                assinatura TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                embedding BLOB,
+                criado_em REAL NOT NULL,
+                usado_em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS perguntas_assinatura ON perguntas (assinatura);
+            CREATE INDEX IF NOT EXISTS perguntas_usado_em ON perguntas (usado_em);
+        """)
+        with self._lock, self._conn:
+            atual = self._conn.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()
+            if atual is None or atual[0] != versao:
+                # Treino ou schema mudaram: SQL antigo pode estar errado
+                self._conn.execute("DELETE FROM perguntas")
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('versao', ?)", (versao,))
+
+    def _assinatura(self, pergunta):
+        numeros = sorted(n.replace(',', '.') for n in _NUMERO_RE.findall(pergunta))
+        termos = []
+        resto = f' {pergunta} '
+        for termo in self.termos_protegidos:
+            if f' {termo} ' in resto:
+                termos.append(termo)
+                resto = resto.replace(f' {termo} ', ' ')
+        # Na ordem da frase: "não aceita pets, com garagem" != "aceita pets, sem garagem"
+        marcadores = [_MARCADORES[p] for p in _PALAVRA_RE.findall(resto) if p in _MARCADORES]
+        return '|'.join(numeros) + '#' + '|'.join(sorted(termos)) + '#' + '|'.join(marcadores)
+
+    def _embedding(self, pergunta):
+        if self.embedder is None:
+            return None
+        vetor = np.asarray(self.embedder(pergunta), dtype=np.float32)
+        return vetor / (np.linalg.norm(vetor) or 1.0)
+
+    def buscar(self, pergunta):
+        """Devolve o SQL guardado para a pergunta (ou uma quase idêntica), ou None."""
+        chave = normalizar_pergunta(pergunta)
+        agora = time.time()
+        limite = agora - self.ttl
+        with self._lock, self._conn:
+            linha = self._conn.execute(
+                "SELECT sql FROM perguntas WHERE pergunta = ? AND criado_em >= ?", (chave, limite)
+            ).fetchone()
+            if linha:
+                self._conn.execute("UPDATE perguntas SET usado_em = ? WHERE pergunta = ?", (agora, chave))
+                self.hits['exato'] += 1
+                return linha[0]
+            candidatos = self._conn.execute(
+                "SELECT pergunta, sql, embedding FROM perguntas "
+                "WHERE assinatura = ? AND criado_em >= ? AND embedding IS NOT NULL",
+                (self._assinatura(chave), limite),
+            ).fetchall()
+
+        if candidatos and self.embedder is not None:
+            vetor = self._embedding(chave)
+            matriz = np.stack([np.frombuffer(c[2], dtype=np.float32) for c in candidatos])
+            similaridades = matriz @ vetor
+            melhor = int(np.argmax(similaridades))
+            if similaridades[melhor] >= self.similaridade_minima:
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "UPDATE perguntas SET usado_em = ? WHERE pergunta = ?", (agora, candidatos[melhor][0])
+                    )
+                self.hits['similar'] += 1
+                return candidatos[melhor][1]
+        self.hits['miss'] += 1
+        return None
+
+    def guardar(self, pergunta, sql):
+        """Registra um SQL que rodou sem erro; aplica TTL e o limite de entradas (LRU)."""
+        chave = normalizar_pergunta(pergunta)
+        vetor = self._embedding(chave)
+        agora = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO perguntas VALUES (?, ?, ?, ?, ?, ?)",
+                (chave, self._assinatura(chave), sql, vetor.tobytes() if vetor is not None else None, agora, agora),
+            )
+            self._conn.execute("DELETE FROM perguntas WHERE criado_em < ?", (agora - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM perguntas WHERE pergunta IN ("
+                " SELECT pergunta FROM perguntas ORDER BY usado_em DESC LIMIT -1 OFFSET ?)",
+                (self.max_entradas,),
+            )
+
+    def invalidar(self, sql):
+        """Remove o SQL do cache (ex.: passou a falhar depois de uma mudança no banco)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM perguntas WHERE sql = ?", (sql,))
+
+    def limpar(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM perguntas")
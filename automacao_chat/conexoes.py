@@ -0,0 +1,106 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+import rastreio
+
+# ==========================================
+# POOL DE CONEXÕES SOMENTE LEITURA (SQLite em WAL)
+# ==========================================
+# Mesmos valores de SQLITE_PRAGMAS em imobiliaria_demo/settings.py. journal_mode
+# fica de fora: quem liga o WAL é o Django (é persistente no arquivo) e uma
+# conexão somente leitura não pode alterá-lo.
+PRAGMAS_LEITURA = {
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'query_only': 1,
+}
+
+
+class PoolLeitura:
+    """Pool thread-safe de conexões somente leitura ao db.sqlite3.
+
+    Cada sessão do Streamlit roda em uma thread própria; com uma conexão por
+    consulta emprestada do pool, várias conversas leem em paralelo e, em modo
+    WAL, nenhuma delas bloqueia (nem é bloqueada por) as escritas do admin.
+    """
+
+    def __init__(self, db_path, tamanho=4, pragmas=None, cache=None):
+        self.db_path = db_path
+        self.cache = cache
+        self.tamanho = tamanho
+        self.pragmas = {**PRAGMAS_LEITURA, **(pragmas or {})}
+        self._livres = queue.LifoQueue()
+        self._criadas = 0
+        self._lock = threading.Lock()
+
+    def _abrir(self):
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            timeout=self.pragmas['busy_timeout'] / 1000,
+        )
+        for nome, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nome}={valor}")
+        return conn
+
+    @contextmanager
+    def conexao(self, timeout=30):
+        try:
+            conn = self._livres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                criar = self._criadas < self.tamanho
+                if criar:
+                    self._criadas += 1
+            if criar:
+                try:
+                    conn = self._abrir()
+                except Exception:
+                    with self._lock:
+                        self._criadas -= 1
+                    raise
+            else:
+                # Pool cheio: espera alguma conversa devolver a conexão
+                conn = self._livres.get(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._livres.put(conn)
+
+    def _executar(self, sql, params, protecao):
+        with self.conexao() as conn:
+            with protecao(conn) if protecao else nullcontext():
+                return pd.read_sql_query(sql, conn, params=params)
+
+    def run_sql(self, sql, params=None, protecao=None):
+        """Mesmo contrato do run_sql do Vanna: executa e devolve um DataFrame.
+
+        Com `cache` (CacheResultados), SQL repetido não vai ao banco enquanto os
+        dados não mudarem. `protecao(conn)` é um context manager aplicado em volta
+        da execução, e só nela (um acerto no cache não passa por ele).
+        """
+        with rastreio.span("run_sql") as span:
+            if self.cache is None:
+                df = self._executar(sql, params, protecao)
+            else:
+                df = self.cache.obter(sql, params, lambda: self._executar(sql, params, protecao))
+            span["linhas"] = len(df)
+            return df
+
+    def fechar(self):
+        while True:
+            try:
+                self._livres.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._criadas = 0
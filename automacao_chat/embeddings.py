@@ -0,0 +1,108 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import rastreio
+
+# ==========================================
+# CAMADA DE EMBEDDINGS (CACHE POR CONTEÚDO + LOTES)
+# ==========================================
+# Envolve uma embedding function (assinatura do Chroma: lista de textos -> lista
+# de vetores). Cada texto é identificado por sha256(modelo + texto); o vetor fica
+# num SQLite em disco e numa LRU em memória. Só os textos nunca vistos vão para o
+# modelo, e numa chamada só por lote. Assim a mesma pergunta consultada nas três
+# coleções do Vanna é embedada uma vez, e re-indexar não re-embeda nada.
+TAMANHO_LOTE = 64
+MAX_MEMORIA = 4096
+
+
+def chave_embedding(modelo, texto):
+    return hashlib.sha256(f"{modelo}\0{texto}".encode("utf-8")).hexdigest()
+
+
+def embedder_ollama(modelo, host=None):
+    """Embedding function que manda a lista inteira num único /api/embed do ollama
+    (a do Chroma faz uma requisição por texto)."""
+    import ollama
+    cliente = ollama.Client(host=host)
+
+    def embedar(textos):
+        return cliente.embed(model=modelo, input=list(textos))["embeddings"]
+
+    return embedar
+
+
+class CacheEmbeddings:
+    """Embedding function com cache; pode ser passada direto para o Chroma/Vanna."""
+
+    def __init__(self, funcao, caminho, modelo, tamanho_lote=TAMANHO_LOTE, max_memoria=MAX_MEMORIA):
+        self.funcao = funcao
+        self.modelo = modelo
+        self.tamanho_lote = tamanho_lote
+        self.max_memoria = max_memoria
+        self.stats = {'memoria': 0, 'disco': 0, 'calculados': 0, 'chamadas': 0}
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS embeddings (chave TEXT PRIMARY KEY, vetor BLOB NOT NULL);
+        """)
+
+    def _lembrar(self, chave, vetor):
+        self._memoria[chave] = vetor
+        self._memoria.move_to_end(chave)
+        if len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def __call__(self, input):
+        # O Chroma confere o nome do parâmetro: tem que ser `input`
+        textos = list(input)
+        chaves = [chave_embedding(self.modelo, t) for t in textos]
+        vetores = {}
+        with self._lock:
+            for chave in chaves:
+                if chave in self._memoria:
+                    vetores[chave] = self._memoria[chave]
+                    self._memoria.move_to_end(chave)
+                    self.stats['memoria'] += 1
+            faltando = list(dict.fromkeys(c for c in chaves if c not in vetores))
+            for inicio in range(0, len(faltando), 500):
+                lote = faltando[inicio:inicio + 500]
+                marcas = ",".join("?" * len(lote))
+                for chave, blob in self._conn.execute(
+                    f"SELECT chave, vetor FROM embeddings WHERE chave IN ({marcas})", lote
+                ):
+                    vetores[chave] = np.frombuffer(blob, dtype=np.float32)
+                    self._lembrar(chave, vetores[chave])
+                    self.stats['disco'] += 1
+
+        # Textos repetidos no mesmo pedido vão uma vez só para o modelo
+        novos = list(dict.fromkeys((c, t) for c, t in zip(chaves, textos) if c not in vetores))
+        rastreio.contar(embeddings_cache=len(chaves) - len(novos), embeddings_calculados=len(novos))
+        for inicio in range(0, len(novos), self.tamanho_lote):
+            lote = novos[inicio:inicio + self.tamanho_lote]
+            calculados = self.funcao([t for _, t in lote])
+            self.stats['chamadas'] += 1
+            with self._lock, self._conn:
+                for (chave, _), vetor in zip(lote, calculados):
+                    vetor = np.asarray(vetor, dtype=np.float32)
+                    vetores[chave] = vetor
+                    self._lembrar(chave, vetor)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO embeddings (chave, vetor) VALUES (?, ?)", (chave, vetor.tobytes())
+                    )
+                self.stats['calculados'] += len(lote)
+        return [vetores[c].tolist() for c in chaves]
+
+    # Versões novas do Chroma chamam estes em vez do __call__
+    def embed_documents(self, input):
+        return self(input)
+
+    def embed_query(self, input):
+        return self(input)
@@ -0,0 +1,134 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+import rastreio
+from cache_sql import normalizar_pergunta
+
+# ==========================================
+# GATE DA REESCRITA CONTEXTUAL
+# ==========================================
+# A reescrita com o deepseek custa uma chamada inteira de LLM por turno. Boa parte
+# das perguntas, porém, já chega completa ("casas no Centro até 2000 reais"). O
+# gate decide localmente se a pergunta depende do histórico:
+#   1. referências ao que já foi dito (pronomes, "esse", "lá", "o primeiro"...) -> reescreve
+#   2. número de imóvel citado ("imóvel 131") -> não precisa de contexto
+#   3. a pergunta preenche todos os campos (bairro/tipo/quartos/custo/pets) que o
+#      turno anterior tinha -> não reescreve
+#   4. forma elíptica ("e no Centro?", "mas com 3 quartos?") -> reescreve
+#   5. se houver embedder, compara com exemplos das duas classes; sem margem clara,
+#      reescreve (errar para o lado da reescrita só custa tempo, não qualidade)
+MARGEM_EMBEDDING = 0.1
+
+_REFERENCIA_RE = re.compile(
+    r'\b(?:ele|ela|eles|elas|dele|dela|deles|delas|nele|nela|neles|nelas'
+    r'|esse|essa|esses|essas|desse|dessa|desses|dessas|nesse|nessa|nesses|nessas'
+    r'|este|estes|estas|deste|desta|destes|destas|neste|nesta|isso|isto|disso|nisso'
+    r'|aquele|aquela|aqueles|aquelas|daquele|daquela|naquele|naquela'
+    r'|mesmo|mesma|mesmos|mesmas|la|ali|dali|tambem|outro|outra|outros|outras'
+    r'|primeiro|primeira|segundo|segunda|terceiro|terceira|ultimo|ultima|anterior'
+    r'|citado|citada|mencionado|mencionada'
+    # "o acima" retoma o que foi dito; "acima de 3000" é um filtro de valor
+    r'|acima(?!\s+d[eo]s?\s+(?:r\s*)?\d))\b'
+)
+_ELIPTICA_RE = re.compile(r'^(?:e|mas|so que|agora|entao|ou|tipo|com|sem)\b')
+_IDENTIFICADOR_RE = re.compile(r'\b(?:imove(?:l|is)|codigo|id|referencia)\s+(?:n\s*)?\d+\b')
+
+# Campos do parser que contam como "slot"; ordem/limite não carregam contexto
+_SLOTS = {'bairro': 'bairro', 'tipo': 'tipo', 'quartos': 'quartos',
+          'custo_min': 'custo', 'custo_max': 'custo', 'pets': 'pets'}
+
+EXEMPLOS = {
+    True: [
+        "e no centro?", "e com dois quartos?", "tem mais barato?", "e casas?",
+        "quais aceitam pets?", "e até 1500?", "mostra mais opções", "qual o endereço?",
+        "quanto é o condomínio?", "tem com garagem?", "e no bairro ao lado?",
+    ],
+    False: [
+        "quais bairros vocês atendem?", "vocês trabalham com venda?", "qual o horário de visita?",
+        "como faço para alugar?", "quais documentos preciso?", "tem imóveis perto da ufjf?",
+        "quero alugar um imóvel em juiz de fora", "qual o imóvel mais barato de todos?",
+    ],
+}
+
+
+def _slots(campos):
+    return {_SLOTS[k] for k in campos if k in _SLOTS}
+
+
+class GateReescrita:
+    """Decide se a pergunta precisa da reescrita contextual.
+
+    `parser` é o ParserConsulta do analista (extrai os slots). `embedder` é opcional
+    (ex.: generate_embedding do Vanna) e só é consultado nos casos indecisos.
+    """
+
+    def __init__(self, parser, embedder=None, margem=MARGEM_EMBEDDING):
+        self.parser = parser
+        self.embedder = embedder
+        self.margem = margem
+        self._exemplos = None
+        self.motivos = Counter()
+
+    def _embedding(self, texto):
+        vetor = np.asarray(self.embedder(texto), dtype=np.float32)
+        return vetor / (np.linalg.norm(vetor) or 1.0)
+
+    def _independente_por_embedding(self, texto):
+        if self._exemplos is None:
+            self._exemplos = {
+                classe: np.stack([self._embedding(e) for e in exemplos]) for classe, exemplos in EXEMPLOS.items()
+            }
+        vetor = self._embedding(texto)
+        dependente = float(np.max(self._exemplos[True] @ vetor))
+        independente = float(np.max(self._exemplos[False] @ vetor))
+        return independente - dependente >= self.margem
+
+    def _contexto(self, historico):
+        """Slots do turno anterior: a pergunta já reescrita (se houver) acumula o contexto."""
+        for msg in reversed(historico[-4:]):
+            if msg.get("role") == "assistant" and msg.get("pergunta_traduzida"):
+                return msg["pergunta_traduzida"]
+            if msg.get("role") == "user":
+                return msg["content"]
+        return ""
+
+    def decidir(self, pergunta, historico):
+        """Devolve (precisa_reescrever, motivo)."""
+        if not historico:
+            return False, "sem_historico"
+        texto = normalizar_pergunta(pergunta)
+        if _REFERENCIA_RE.search(texto):
+            return True, "referencia"
+        if _IDENTIFICADOR_RE.search(texto):
+            return False, "identificador"
+
+        novos = _slots(self.parser.interpretar(pergunta)[0])
+        anteriores = _slots(self.parser.interpretar(self._contexto(historico))[0])
+        if novos and novos >= anteriores:
+            return False, "slots_completos"
+        if _ELIPTICA_RE.match(texto):
+            return True, "eliptica"
+        if self.embedder is not None:
+            try:
+                if self._independente_por_embedding(texto):
+                    return False, "embedding"
+            except Exception:
+                pass
+        return True, "slots_faltando"
+
+    def precisa_reescrever(self, pergunta, historico):
+        precisa, motivo = self.decidir(pergunta, historico)
+        self.motivos[motivo] += 1
+        rastreio.anotar(reescrever=precisa, motivo=motivo)
+        return precisa
+
+    @property
+    def evitadas(self):
+        """Reescritas evitadas em turnos que tinham histórico."""
+        return sum(n for motivo, n in self.motivos.items() if motivo in ("identificador", "slots_completos", "embedding"))
+
+    @property
+    def avaliadas(self):
+        return sum(n for motivo, n in self.motivos.items() if motivo != "sem_historico")
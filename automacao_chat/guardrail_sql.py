@@ -0,0 +1,301 @@
+import logging
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import sqlparse
+from sqlparse import tokens as T
+
+import rastreio
+
+# ==========================================
+# GUARDA DO SQL GERADO PELO LLM
+# ==========================================
+# Todo SQL que vem do Vanna (ou do cache dele) passa por aqui antes de rodar:
+#   1. sqlparse: um comando só, SELECT (ou WITH ... SELECT), só tabelas conhecidas
+#   2. LIMIT: injetado no nível de fora se faltar e limitado a LIMITE_MAXIMO em
+#      qualquer nível (inclusive subconsultas); LIMIT -1 também é cortado
+#   3. EXPLAIN QUERY PLAN: recusa varreduras completas aninhadas em tabelas grandes
+#      (o plano de um cross join ou de uma subconsulta correlacionada sem índice)
+#   4. execução com orçamento de tempo e de passos da VM do SQLite (progress handler)
+#      e com um authorizer que nega a leitura de qualquer tabela fora da lista, caso
+#      a análise do passo 1 deixe escapar alguma forma de citar uma tabela
+# As conexões do pool já são somente leitura; a guarda devolve um erro claro (que
+# volta para o LLM na tentativa de correção) em vez de deixar a consulta rodar.
+logger = logging.getLogger("bia.guarda")
+
+TABELAS_PERMITIDAS = ('core_imovel', 'core_imovel_fts')
+LIMITE_PADRAO = 10
+LIMITE_MAXIMO = 50
+TABELA_GRANDE = 5000
+ORCAMENTO_SEGUNDOS = 5.0
+ORCAMENTO_PASSOS = 50_000_000
+PASSOS_POR_VERIFICACAO = 10_000
+# Validade da contagem de linhas de cada tabela usada na checagem do plano
+TAMANHOS_TTL = 300
+
+PROIBIDAS = {
+    'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'UPSERT', 'MERGE', 'CREATE', 'DROP', 'ALTER',
+    'TRUNCATE', 'ATTACH', 'DETACH', 'PRAGMA', 'VACUUM', 'REINDEX', 'ANALYZE', 'BEGIN',
+    'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'INTO',
+}
+# Palavras que encerram a lista de tabelas do FROM
+_FIM_DO_FROM = {'WHERE', 'GROUP BY', 'ORDER BY', 'HAVING', 'LIMIT', 'UNION', 'UNION ALL',
+                'EXCEPT', 'INTERSECT', 'WINDOW', 'ON', 'USING'}
+# "WITH nome AS (" e "WITH RECURSIVE nome(col, ...) AS ("
+_CTE_RE = re.compile(
+    r'(?:\bwith(?:\s+recursive)?|,)\s*([A-Za-z_]\w*)\s*(?:\([^()]*\)\s*)?\bas\s*\(', re.IGNORECASE
+)
+# "SCAN x" e "SCAN x USING [COVERING] INDEX" percorrem a tabela (ou o índice) inteira
+_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?! VIRTUAL TABLE)')
+# Tabelas internas do FTS5, lidas pelo próprio SQLite ao consultar a tabela virtual
+_SOMBRAS_FTS5 = ('_data', '_idx', '_content', '_docsize', '_config')
+# O construtor da tabela virtual lê o schema; ele não é segredo (o LLM já vê o DDL)
+_SCHEMA = ('sqlite_master', 'sqlite_schema')
+
+
+class SQLRecusado(ValueError):
+    """SQL gerado que não passou na guarda (a mensagem vai para a correção do LLM)."""
+
+
+def _nome(token):
+    return token.value.strip('"`[]').lower()
+
+
+class GuardaSQL:
+    def __init__(self, tabelas=TABELAS_PERMITIDAS, limite_padrao=LIMITE_PADRAO, limite_maximo=LIMITE_MAXIMO,
+                 tabela_grande=TABELA_GRANDE, segundos=ORCAMENTO_SEGUNDOS, passos=ORCAMENTO_PASSOS,
+                 tamanhos_ttl=TAMANHOS_TTL):
+        self.tabelas = {t.lower() for t in tabelas}
+        self.limite_padrao = limite_padrao
+        self.limite_maximo = limite_maximo
+        self.tabela_grande = tabela_grande
+        self.segundos = segundos
+        self.passos = passos
+        self.tamanhos_ttl = tamanhos_ttl
+        self._tamanhos = {}
+        self.recusas = 0
+
+    # ---------- 1 e 2: análise e reescrita do SQL ----------
+    def validar(self, sql):
+        """Devolve o SQL pronto para rodar (LIMIT ajustado) ou levanta SQLRecusado."""
+        texto = sqlparse.format(str(sql), strip_comments=True).strip()
+        comandos = [c for c in sqlparse.parse(texto) if str(c).strip(' \n\t;')]
+        if len(comandos) != 1:
+            raise self._recusar(f"Envie exatamente um comando SQL (recebi {len(comandos)}).")
+        comando = comandos[0]
+        if comando.get_type() != 'SELECT':
+            raise self._recusar("Só é permitido SELECT (somente leitura).")
+
+        # Cada token significativo guarda o espaço que vinha antes dele, para o SQL
+        # reescrito sair igual ao original fora dos LIMITs
+        tokens, espacos, pendente = [], [], ''
+        for token in comando.flatten():
+            if token.is_whitespace or token.ttype in T.Comment:
+                pendente += token.value
+            else:
+                tokens.append(token)
+                espacos.append(pendente)
+                pendente = ''
+        while tokens and tokens[-1].match(T.Punctuation, ';'):
+            tokens.pop()
+        ctes = {nome.lower() for nome in _CTE_RE.findall(texto)}
+
+        profundidade, no_from, espera_tabela = 0, False, False
+        # Estado do FROM de cada nível de parênteses aberto, para retomar depois do ')'
+        pilha = []
+        topo_tem_limit = False
+        partes = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            chave = token.normalized.upper() if token.is_keyword else None
+            if chave and chave.split()[0] in PROIBIDAS:
+                raise self._recusar(f"Comando não permitido: {chave}.")
+
+            if token.match(T.Punctuation, '('):
+                profundidade += 1
+                pilha.append(no_from)
+                # Dentro de "FROM (" vem uma subconsulta ou uma tabela entre parênteses,
+                # "FROM (auth_user)", que também precisa passar pela lista
+                no_from = espera_tabela
+            elif token.match(T.Punctuation, ')'):
+                profundidade -= 1
+                no_from = pilha.pop() if pilha else False
+                espera_tabela = False
+            elif chave == 'FROM' or (chave and chave.endswith('JOIN')):
+                no_from, espera_tabela = True, True
+            elif chave in _FIM_DO_FROM or token.ttype in T.Keyword.DML:
+                no_from = espera_tabela = False
+            elif no_from and token.match(T.Punctuation, ','):
+                espera_tabela = True
+            elif espera_tabela and (token.ttype in T.Name or token.ttype in T.Literal.String.Symbol):
+                self._conferir_tabela(tokens, i, ctes)
+                espera_tabela = False
+
+            if chave == 'LIMIT':
+                topo_tem_limit = topo_tem_limit or profundidade == 0
+                consumidos, limite = self._ler_limit(tokens, i + 1)
+                partes.append(espacos[i] + limite)
+                i += 1 + consumidos
+                continue
+            partes.append(espacos[i] + token.value)
+            i += 1
+
+        sql_final = ''.join(partes).strip()
+        if not topo_tem_limit:
+            sql_final += f' LIMIT {self.limite_padrao}'
+        return sql_final
+
+    def _conferir_tabela(self, tokens, i, ctes):
+        nome = _nome(tokens[i])
+        if i + 2 < len(tokens) and tokens[i + 1].match(T.Punctuation, '.'):
+            # main.core_imovel -> core_imovel
+            i += 2
+            nome = _nome(tokens[i])
+        if i + 1 < len(tokens) and tokens[i + 1].match(T.Punctuation, '('):
+            raise self._recusar(f"Funções de tabela não são permitidas ({nome}).")
+        if nome not in self.tabelas and nome not in ctes:
+            raise self._recusar(f"Tabela desconhecida: {nome}. Use apenas: {', '.join(sorted(self.tabelas))}.")
+
+    def _ler_limit(self, tokens, inicio):
+        """Reescreve 'LIMIT n', 'LIMIT n OFFSET m' e 'LIMIT m, n' com n <= limite_maximo.
+        Devolve (tokens consumidos, texto do LIMIT)."""
+        def inteiro(j):
+            if j < len(tokens) and tokens[j].ttype in T.Literal.Number.Integer:
+                return int(tokens[j].value)
+            return None
+
+        primeiro = inteiro(inicio)
+        if primeiro is None:
+            # LIMIT com expressão ou parâmetro: troca pelo máximo (pula a expressão inteira)
+            fim, nivel = inicio, 0
+            while fim < len(tokens):
+                token = tokens[fim]
+                if token.match(T.Punctuation, '('):
+                    nivel += 1
+                elif token.match(T.Punctuation, ')'):
+                    if nivel == 0:
+                        break
+                    nivel -= 1
+                elif nivel == 0 and (token.match(T.Punctuation, ',') or (
+                        token.is_keyword and token.normalized.upper() in ('OFFSET', 'UNION', 'UNION ALL'))):
+                    break
+                fim += 1
+            return fim - inicio, f'LIMIT {self.limite_maximo}'
+        if inicio + 2 < len(tokens) and tokens[inicio + 1].match(T.Punctuation, ','):
+            deslocamento, quantidade = primeiro, inteiro(inicio + 2)
+            if quantidade is not None:
+                return 3, f'LIMIT {self._cortar(quantidade)} OFFSET {deslocamento}'
+        return 1, f'LIMIT {self._cortar(primeiro)}'
+
+    def _cortar(self, quantidade):
+        return self.limite_maximo if quantidade < 0 or quantidade > self.limite_maximo else quantidade
+
+    def _recusar(self, motivo):
+        self.recusas += 1
+        logger.warning("SQL recusado: %s", motivo)
+        return SQLRecusado(motivo)
+
+    # ---------- 3: plano de execução ----------
+    def _tamanho(self, conn, tabela):
+        # Recontada a cada TAMANHOS_TTL: uma importação pode tornar grande uma tabela pequena
+        agora = time.monotonic()
+        tamanho, contado_em = self._tamanhos.get(tabela, (0, None))
+        if contado_em is None or agora - contado_em > self.tamanhos_ttl:
+            try:
+                tamanho = conn.execute(f'SELECT COUNT(*) FROM "{tabela}"').fetchone()[0]
+            except sqlite3.Error:
+                tamanho = 0
+            self._tamanhos[tabela] = (tamanho, agora)
+        return tamanho
+
+    def verificar_plano(self, conn, sql, params=None):
+        """Recusa duas varreduras completas de tabela grande no mesmo laço (join sem
+        índice, cross join, subconsulta correlacionada). Uma varredura só é tolerada:
+        com LIMIT ela para cedo, e o orçamento cobre o resto."""
+        plano = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+        nos = {linha[0]: (linha[1], linha[-1]) for linha in plano}
+
+        def laco(pai):
+            # Subconsulta correlacionada roda uma vez por linha do laço de fora
+            while pai in nos and nos[pai][1].startswith('CORRELATED'):
+                pai = nos[pai][0]
+            return pai
+
+        por_laco = {}
+        for pai, detalhe in nos.values():
+            m = _SCAN_RE.match(detalhe)
+            if m and self._grande(conn, m.group(1).lower()):
+                por_laco.setdefault(laco(pai), []).append(m.group(1))
+        for varreduras in por_laco.values():
+            if len(varreduras) > 1:
+                raise self._recusar(
+                    f"Consulta faria varreduras completas aninhadas ({', '.join(varreduras)}). "
+                    "Filtre por colunas indexadas ou use a core_imovel_fts."
+                )
+        return plano
+
+    def _grande(self, conn, nome):
+        if nome in self.tabelas:
+            return self._tamanho(conn, nome) >= self.tabela_grande
+        # Apelido, CTE ou subconsulta: na dúvida, grande se alguma tabela conhecida for
+        return any(self._tamanho(conn, t) >= self.tabela_grande for t in self.tabelas)
+
+    # ---------- 4: orçamento de execução ----------
+    @contextmanager
+    def orcamento(self, conn):
+        inicio = time.monotonic()
+        verificacoes = 0
+        limite_verificacoes = self.passos // PASSOS_POR_VERIFICACAO
+
+        def progresso():
+            nonlocal verificacoes
+            verificacoes += 1
+            # Retornar não-zero interrompe a consulta (sqlite3.OperationalError: interrupted)
+            return verificacoes > limite_verificacoes or time.monotonic() - inicio > self.segundos
+
+        conn.set_progress_handler(progresso, PASSOS_POR_VERIFICACAO)
+        try:
+            yield
+        except Exception as e:
+            # O pandas embrulha o sqlite3.OperationalError("interrupted") num DatabaseError
+            if 'interrupted' in str(e).lower():
+                raise self._recusar(
+                    f"Consulta interrompida: passou do orçamento ({self.segundos:g}s / {self.passos} passos)."
+                ) from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def _autorizar(self, acao, tabela, coluna, banco, origem):
+        if acao == sqlite3.SQLITE_READ and tabela:
+            nome = tabela.lower()
+            if nome not in self.tabelas and nome not in _SCHEMA and not any(
+                    nome == t + sombra for t in self.tabelas for sombra in _SOMBRAS_FTS5):
+                return sqlite3.SQLITE_DENY
+        return sqlite3.SQLITE_OK
+
+    @contextmanager
+    def protecao(self, conn, sql):
+        conn.set_authorizer(self._autorizar)
+        try:
+            self.verificar_plano(conn, sql)
+            with self.orcamento(conn):
+                yield
+        except Exception as e:
+            # Mensagens do SQLite quando o authorizer nega ("access to x.y is prohibited")
+            if any(m in str(e).lower() for m in ('is prohibited', 'not authorized')):
+                raise self._recusar(
+                    f"Acesso negado a tabela fora da lista. Use apenas: {', '.join(sorted(self.tabelas))}."
+                ) from e
+            raise
+        finally:
+            conn.set_authorizer(None)
+
+    def executar(self, pool, sql):
+        """Valida, confere o plano e roda com orçamento. Devolve (DataFrame, SQL executado)."""
+        with rastreio.span("guarda"):
+            sql = self.validar(sql)
+        return pool.run_sql(sql, protecao=lambda conn: self.protecao(conn, sql)), sql
@@ -0,0 +1,103 @@
+import heapq
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from rapidfuzz import fuzz, process
+
+# ==========================================
+# ÍNDICE DE ENTIDADES (BAIRROS / RUAS / TIPOS)
+# ==========================================
+# Montado uma vez no preparar_agente. Cada pergunta consulta só um punhado de
+# candidatos (os que compartilham trigramas com o termo) em vez de re-normalizar
+# e comparar a lista inteira de entidades para cada palavra.
+SCORE_MINIMO = 90
+MAX_CANDIDATOS = 64
+
+_PONTUACAO_RE = re.compile(r'[^\w\s]')
+
+
+def normalizar(texto):
+    nfkd = unicodedata.normalize('NFKD', str(texto))
+    return "".join([c for c in nfkd if not unicodedata.combining(c)]).lower().strip()
+
+
+def trigramas(texto):
+    texto = f' {texto} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceEntidades:
+    def __init__(self, entidades, score_minimo=SCORE_MINIMO, max_candidatos=MAX_CANDIDATOS):
+        self.score_minimo = score_minimo
+        self.max_candidatos = max_candidatos
+        # Forma normalizada -> nome original (a primeira ocorrência vence, como no .index())
+        self.originais = {}
+        for entidade in entidades:
+            self.originais.setdefault(normalizar(entidade), entidade)
+        self.normalizadas = list(self.originais)
+        self.palavras = {n: len(n.split()) for n in self.normalizadas}
+        self.max_palavras = max(self.palavras.values(), default=1)
+        # (None, trigrama) indexa todas as entidades; (n, trigrama) só as de n palavras,
+        # usado na busca de frases
+        por_trigrama = defaultdict(list)
+        for i, nome in enumerate(self.normalizadas):
+            for tri in trigramas(nome):
+                por_trigrama[None, tri].append(i)
+                if self.palavras[nome] > 1:
+                    por_trigrama[self.palavras[nome], tri].append(i)
+        # Trigramas muito comuns (" ru", "rua", "ua ") não ajudam a separar candidatos
+        # e custariam percorrer milhares de ids; ficam fora do índice
+        limite = max(50, len(self.normalizadas) // 20)
+        self.por_trigrama = {chave: ids for chave, ids in por_trigrama.items() if len(ids) <= limite}
+
+    def _candidatos(self, termo, palavras=None):
+        tris = trigramas(termo)
+        contagem = Counter()
+        for tri in tris:
+            contagem.update(self.por_trigrama.get((palavras, tri), ()))
+        # Score >= 90 exige boa parte dos trigramas em comum; o resto nem é comparado
+        minimo = len(tris) // 2
+        ids = [i for i, n in contagem.items() if n >= minimo]
+        if len(ids) > self.max_candidatos:
+            ids = heapq.nlargest(self.max_candidatos, ids, key=contagem.__getitem__)
+        return [self.normalizadas[i] for i in ids]
+
+    def buscar(self, termo, palavras=None):
+        """Nome original da entidade mais parecida com o termo (já normalizado), ou None.
+
+        Sem `palavras`, usa o mesmo critério do extractOne padrão (WRatio). Com
+        `palavras`, compara frases inteiras só com entidades do mesmo tamanho.
+        """
+        if termo in self.originais:
+            return self.originais[termo]
+        candidatos = self._candidatos(termo, palavras)
+        if not candidatos:
+            return None
+        scorer = fuzz.WRatio if palavras is None else fuzz.ratio
+        match = process.extractOne(termo, candidatos, scorer=scorer, score_cutoff=self.score_minimo)
+        return self.originais[match[0]] if match else None
+
+    def substituir(self, pergunta):
+        """Troca trechos da pergunta pelas entidades reais, frases maiores primeiro
+        ("alto dos passos" vira uma entidade só, e não três palavras soltas)."""
+        tokens = pergunta.split()
+        normalizados = [_PONTUACAO_RE.sub('', normalizar(t)) for t in tokens]
+        resultado = []
+        i = 0
+        while i < len(tokens):
+            for tamanho in range(min(self.max_palavras, len(tokens) - i), 1, -1):
+                trecho = ' '.join(normalizados[i:i + tamanho])
+                entidade = self.buscar(trecho, palavras=tamanho)
+                if entidade:
+                    resultado.append(entidade)
+                    i += tamanho
+                    break
+            else:
+                termo = normalizados[i]
+                entidade = None
+                if not (termo.isdigit() or len(termo) <= 3):
+                    entidade = self.buscar(termo)
+                resultado.append(entidade or tokens[i])
+                i += 1
+        return " ".join(resultado)
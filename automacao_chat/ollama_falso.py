@@ -0,0 +1,385 @@
+"""Servidor HTTP local que imita a API do ollama, para medir o chat sem rede.
+
+Responde com as gravações (JSONL) de uma sessão contra o ollama real; o que não
+estiver gravado recebe uma resposta determinística (texto fixo, SQL padrão e
+vetores por hash de palavras/trigramas). Com --upstream, repassa ao ollama real
+e, com --gravar, guarda as respostas para os próximos replays. Uso:
+
+    python ollama_falso.py                                   # replay em 127.0.0.1:11435
+    python ollama_falso.py --upstream http://localhost:11434 --gravar
+    OLLAMA_HOST=http://127.0.0.1:11435 streamlit run ../app.py
+
+Contadores (chamadas, tokens, respostas sem gravação) em GET /_estatisticas.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# OLLAMA FALSO (REPLAY / GRAVAÇÃO)
+# ==========================================
+GRAVACOES_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gravacoes_ollama.jsonl")
+PORTA_PADRAO = 11435
+DIMENSAO_PADRAO = 384
+MODELOS_CONHECIDOS = ("qwen2.5-coder:7b", "deepseek-r1:8b", "nomic-embed-text:latest")
+SQL_PADRAO = "SELECT * FROM core_imovel LIMIT 10"
+RESPOSTA_PADRAO = "<think>resposta simulada</think>Encontrei algumas opções para você! Quer que eu detalhe alguma?"
+
+logger = logging.getLogger("bia.ollama_falso")
+
+_PEDACO_RE = re.compile(r"\s*\S+|\s+$")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_NOVA_PERGUNTA_RE = re.compile(r"Nova pergunta:\s*(.+?)\s*\n\s*Sua Resposta Esperada:", re.DOTALL)
+
+
+def chave_requisicao(tipo, modelo, conteudo):
+    texto = json.dumps([tipo, modelo, conteudo], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def contar_tokens(texto):
+    """Aproximação para o que não veio do ollama real (palavras + pontuação)."""
+    return len(_TOKEN_RE.findall(texto or ""))
+
+
+def vetor_deterministico(texto, dimensao=DIMENSAO_PADRAO):
+    """Embedding por hash de palavras e trigramas: textos parecidos ficam próximos,
+    o que basta para os caches semânticos, o gate e o roteador se comportarem."""
+    vetor = [0.0] * dimensao
+    palavras = re.findall(r"\w+", texto.lower())
+    trigramas = [p[i:i + 3] for p in palavras for i in range(max(1, len(p) - 2))]
+    for termo, peso in [(p, 1.0) for p in palavras] + [(t, 0.5) for t in trigramas]:
+        h = int.from_bytes(hashlib.blake2b(termo.encode("utf-8"), digest_size=8).digest(), "little")
+        vetor[h % dimensao] += peso if h & (1 << 63) else -peso
+    norma = math.sqrt(sum(v * v for v in vetor)) or 1.0
+    return [v / norma for v in vetor]
+
+
+class Gravacoes:
+    """Respostas gravadas, uma por linha: {"chave", "texto"|"vetor", "prompt_tokens", "completion_tokens"}."""
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho
+        self.itens = {}
+        self._lock = threading.Lock()
+        if caminho and os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as arquivo:
+                for linha in arquivo:
+                    if linha.strip():
+                        item = json.loads(linha)
+                        self.itens[item["chave"]] = item
+
+    def get(self, chave):
+        return self.itens.get(chave)
+
+    def guardar(self, chave, **item):
+        item = {"chave": chave, **item}
+        with self._lock:
+            self.itens[chave] = item
+            if self.caminho:
+                with open(self.caminho, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    @property
+    def modelos(self):
+        return {item["modelo"] for item in self.itens.values() if item.get("modelo")}
+
+
+class OllamaFalso:
+    def __init__(self, gravacoes=None, upstream=None, gravar=False, ms_por_token=0.0, ms_primeiro_token=0.0,
+                 host="127.0.0.1", porta=PORTA_PADRAO, sql_padrao=SQL_PADRAO, dimensao=DIMENSAO_PADRAO):
+        self.gravacoes = Gravacoes(gravacoes)
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.gravar = gravar
+        self.ms_por_token = ms_por_token
+        self.ms_primeiro_token = ms_primeiro_token
+        self.sql_padrao = sql_padrao
+        self.dimensao = dimensao
+        self._lock = threading.Lock()
+        self.zerar()
+        self._servidor = ThreadingHTTPServer((host, porta), _Handler)
+        self._servidor.daemon_threads = True
+        self._servidor.ollama = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name="ollama-falso", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    # ---------- contadores ----------
+    def zerar(self):
+        with self._lock:
+            self.stats = {"chamadas": Counter(), "prompt_tokens": 0, "completion_tokens": 0,
+                          "textos_embedados": 0, "gravadas": 0, "upstream": 0, "sem_gravacao": 0}
+
+    def estatisticas(self):
+        with self._lock:
+            return {**self.stats, "chamadas": dict(self.stats["chamadas"])}
+
+    def _contar(self, rota, modelo, origem, prompt_tokens=0, completion_tokens=0, textos=0):
+        with self._lock:
+            self.stats["chamadas"][f"{rota} {modelo}"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+            self.stats["textos_embedados"] += textos
+            self.stats[origem] += 1
+
+    # ---------- upstream ----------
+    def _pedir_upstream(self, rota, corpo):
+        """Linhas JSON da resposta do ollama real (uma só quando stream=False)."""
+        requisicao = urllib.request.Request(
+            self.upstream + rota, data=json.dumps(corpo).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(requisicao) as resposta:
+            for linha in resposta:
+                if linha.strip():
+                    yield json.loads(linha)
+
+    # ---------- geração (/api/generate e /api/chat) ----------
+    def _padrao(self, rota, corpo):
+        if rota == "/api/chat":
+            # O Vanna só pede SQL pelo chat
+            return self.sql_padrao
+        prompt = corpo.get("prompt") or ""
+        if not prompt:
+            # Aquecimento (prompt vazio só carrega o modelo)
+            return ""
+        reescrita = _NOVA_PERGUNTA_RE.search(prompt)
+        if reescrita:
+            # Reescritor contextual: devolver a própria pergunta é a saída mais neutra
+            return reescrita.group(1).strip()
+        return RESPOSTA_PADRAO
+
+    def gerar(self, rota, corpo, tokens):
+        """Pedaços de texto da resposta (gerador). No fim, `tokens` recebe as contagens
+        de prompt e de geração, e os contadores do servidor são atualizados."""
+        modelo = corpo.get("model", "")
+        if rota == "/api/chat":
+            conteudo = [{"role": m.get("role"), "content": m.get("content")} for m in corpo.get("messages", [])]
+            prompt_texto = " ".join(m["content"] or "" for m in conteudo)
+        else:
+            conteudo = {"system": corpo.get("system"), "prompt": corpo.get("prompt")}
+            prompt_texto = f"{conteudo['system'] or ''} {conteudo['prompt'] or ''}"
+        chave = chave_requisicao(rota, modelo, conteudo)
+
+        gravada = self.gravacoes.get(chave)
+        if gravada is not None:
+            origem, texto = "gravadas", gravada["texto"]
+            prompt_tokens, completion_tokens = gravada["prompt_tokens"], gravada["completion_tokens"]
+            pedacos = self._simular(texto, completion_tokens)
+        elif self.upstream:
+            origem, pedacos = "upstream", None
+        else:
+            origem, texto = "sem_gravacao", self._padrao(rota, corpo)
+            prompt_tokens, completion_tokens = contar_tokens(prompt_texto), contar_tokens(texto)
+            pedacos = self._simular(texto, completion_tokens)
+
+        if origem == "upstream":
+            # Repassa pedaço a pedaço (o TTFT medido é o do modelo real)
+            partes, final = [], {}
+            for parte in self._pedir_upstream(rota, {**corpo, "stream": True}):
+                pedaco = parte.get("message", {}).get("content", "") if rota == "/api/chat" else parte.get("response", "")
+                partes.append(pedaco)
+                if parte.get("done"):
+                    final = parte
+                if pedaco:
+                    yield pedaco
+            texto = "".join(partes)
+            prompt_tokens = final.get("prompt_eval_count") or contar_tokens(prompt_texto)
+            completion_tokens = final.get("eval_count") or contar_tokens(texto)
+            if self.gravar:
+                self.gravacoes.guardar(chave, rota=rota, modelo=modelo, texto=texto,
+                                       prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        else:
+            yield from pedacos
+        self._contar(rota, modelo, origem, prompt_tokens, completion_tokens)
+        tokens.update(prompt_eval_count=prompt_tokens, eval_count=completion_tokens)
+
+    def _simular(self, texto, completion_tokens):
+        """Pedaços do texto no ritmo configurado (--ms-primeiro-token / --ms-por-token)."""
+        pedacos = _PEDACO_RE.findall(texto)
+        if self.ms_primeiro_token:
+            time.sleep(self.ms_primeiro_token / 1000)
+        por_pedaco = self.ms_por_token * completion_tokens / max(len(pedacos), 1) / 1000
+        for pedaco in pedacos:
+            if por_pedaco:
+                time.sleep(por_pedaco)
+            yield pedaco
+
+    # ---------- embeddings (/api/embed e /api/embeddings) ----------
+    def embedar(self, modelo, textos):
+        chaves = [chave_requisicao("/api/embed", modelo, texto) for texto in textos]
+        vetores = {}
+        for chave in chaves:
+            gravada = self.gravacoes.get(chave)
+            if gravada is not None:
+                vetores[chave] = gravada["vetor"]
+        faltando = list(dict.fromkeys((c, t) for c, t in zip(chaves, textos) if c not in vetores))
+        if not faltando:
+            origem = "gravadas"
+        elif self.upstream:
+            origem = "upstream"
+            resposta = next(self._pedir_upstream("/api/embed", {"model": modelo, "input": [t for _, t in faltando]}))
+            for (chave, _), vetor in zip(faltando, resposta["embeddings"]):
+                vetores[chave] = vetor
+                if self.gravar:
+                    self.gravacoes.guardar(chave, rota="/api/embed", modelo=modelo, vetor=vetor)
+        else:
+            origem = "sem_gravacao"
+            for chave, texto in faltando:
+                vetores[chave] = vetor_deterministico(texto, self.dimensao)
+        self._contar("/api/embed", modelo, origem, textos=len(textos))
+        return [vetores[c] for c in chaves]
+
+    def modelos(self):
+        modelos = set(MODELOS_CONHECIDOS) | self.gravacoes.modelos
+        if self.upstream:
+            try:
+                with urllib.request.urlopen(self.upstream + "/api/tags") as resposta:
+                    modelos |= {m.get("model") or m["name"] for m in json.loads(resposta.read())["models"]}
+            except Exception:
+                logger.warning("Não foi possível listar os modelos do upstream", exc_info=True)
+        return sorted(modelos)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "OllamaFalso/1.0"
+
+    def log_message(self, formato, *args):
+        logger.debug(formato, *args)
+
+    def _json(self, dados, status=200):
+        corpo = json.dumps(dados).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        ollama = self.server.ollama
+        if self.path in ("/", "/api/version"):
+            if self.path == "/":
+                corpo = b"Ollama is running"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+            else:
+                self._json({"version": "0.0.0-falso"})
+        elif self.path == "/api/tags":
+            agora = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            self._json({"models": [
+                {"name": nome, "model": nome, "modified_at": agora, "size": 0, "digest": "", "details": {}}
+                for nome in ollama.modelos()
+            ]})
+        elif self.path == "/_estatisticas":
+            self._json(ollama.estatisticas())
+        else:
+            self._json({"error": f"rota desconhecida: {self.path}"}, 404)
+
+    def do_POST(self):
+        ollama = self.server.ollama
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+        try:
+            if self.path in ("/api/generate", "/api/chat"):
+                self._gerar(ollama, corpo)
+            elif self.path == "/api/embed":
+                entrada = corpo.get("input", [])
+                textos = [entrada] if isinstance(entrada, str) else list(entrada)
+                vetores = ollama.embedar(corpo.get("model", ""), textos)
+                self._json({"model": corpo.get("model"), "embeddings": vetores,
+                            "prompt_eval_count": sum(contar_tokens(t) for t in textos)})
+            elif self.path == "/api/embeddings":
+                self._json({"embedding": ollama.embedar(corpo.get("model", ""), [corpo.get("prompt", "")])[0]})
+            elif self.path == "/api/pull":
+                self._json({"status": "success"})
+            elif self.path == "/api/show":
+                self._json({"modelfile": "", "parameters": "", "template": "", "details": {}, "model_info": {}})
+            elif self.path == "/_zerar":
+                ollama.zerar()
+                self._json({"status": "ok"})
+            else:
+                self._json({"error": f"rota desconhecida: {self.path}"}, 404)
+        except Exception as e:
+            logger.exception("Falha em %s", self.path)
+            self._json({"error": str(e)}, 500)
+
+    def _gerar(self, ollama, corpo):
+        chat = self.path == "/api/chat"
+        modelo = corpo.get("model", "")
+        inicio = time.perf_counter_ns()
+
+        def linha(texto, done=False, **extra):
+            dados = {"model": modelo, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "done": done}
+            if chat:
+                dados["message"] = {"role": "assistant", "content": texto}
+            else:
+                dados["response"] = texto
+            return {**dados, **extra}
+
+        tokens = {}
+
+        def fim():
+            return {"done_reason": "stop", "total_duration": time.perf_counter_ns() - inicio, "load_duration": 0,
+                    **tokens}
+
+        pedacos = ollama.gerar(self.path, corpo, tokens)
+        if not corpo.get("stream", True):
+            texto = "".join(pedacos)
+            self._json(linha(texto, done=True, **fim()))
+            return
+
+        # NDJSON sem Content-Length: a conexão (HTTP/1.0) fecha no fim do stream
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for pedaco in pedacos:
+            self.wfile.write((json.dumps(linha(pedaco)) + "\n").encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write((json.dumps(linha("", done=True, **fim())) + "\n").encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    parser.add_argument('--gravacoes', default=GRAVACOES_PADRAO, help='Arquivo JSONL com as respostas gravadas')
+    parser.add_argument('--upstream', help='URL do ollama real (repassa o que não estiver gravado)')
+    parser.add_argument('--gravar', action='store_true', help='Grava as respostas do upstream em --gravacoes')
+    parser.add_argument('--ms-por-token', type=float, default=0.0, help='Ritmo simulado da geração no replay')
+    parser.add_argument('--ms-primeiro-token', type=float, default=0.0, help='Espera simulada antes do primeiro pedaço')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    ollama = OllamaFalso(args.gravacoes, upstream=args.upstream, gravar=args.gravar, porta=args.porta,
+                         ms_por_token=args.ms_por_token, ms_primeiro_token=args.ms_primeiro_token)
+    print(f"Ollama falso em {ollama.url} ({len(ollama.gravacoes.itens)} respostas gravadas)")
+    try:
+        ollama._servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
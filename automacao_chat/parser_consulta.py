@@ -0,0 +1,172 @@
+import re
+
+from cache_sql import normalizar_pergunta
+
+# ==========================================
+# PARSER DE REGRAS (CAMINHO RÁPIDO, SEM LLM)
+# ==========================================
+# A maioria das perguntas é uma conjunção simples: bairro, tipo, quartos mínimos,
+# faixa de custo total e pets. O parser extrai esses campos do português e monta
+# o SQL parametrizado direto; se sobrar alguma palavra que ele não entendeu
+# ("perto da UFJF", "com varanda"), a confiança cai e a pergunta vai para o Vanna.
+CONFIANCA_MINIMA = 1.0
+LIMITE_PADRAO = 10
+
+NUMEROS_POR_EXTENSO = {
+    'dois': 2, 'duas': 2, 'tres': 3, 'quatro': 4, 'cinco': 5,
+    'seis': 6, 'sete': 7, 'oito': 8, 'nove': 9, 'dez': 10, 'cem': 100, 'cento': 100,
+    'duzentos': 200, 'trezentos': 300, 'quatrocentos': 400, 'quinhentos': 500,
+    'seiscentos': 600, 'setecentos': 700, 'oitocentos': 800, 'novecentos': 900,
+}
+
+# Valor gravado em core_imovel.especificacao -> como o cliente escreve
+SINONIMOS_TIPO = {
+    'apartamento': ['apartamentos', 'apartamento', 'aptos', 'apto', 'ap'],
+    'casa': ['casas', 'casa', 'sobrado'],
+    'kitnet': ['kitnets', 'kitnet', 'kitinete', 'quitinete', 'quitinetes', 'kit'],
+    'comercio': ['comercio', 'loja', 'lojas', 'ponto comercial', 'sala comercial', 'imovel comercial'],
+}
+
+# Palavras que não mudam o filtro; qualquer outra que sobrar derruba a confiança
+PALAVRAS_NEUTRAS = set("""
+    a o as os um uma uns umas de do da dos das no na nos nas em para pra por com e
+    que qual quais quero queria gostaria procuro procurando preciso busco buscando tem
+    temos tenho existe existem algum alguma alguns algumas ha me mim voce voces ai
+    imovel imoveis opcao opcoes bairro reais real r$ mes mensal por mes aluguel
+    disponivel disponiveis r favor porfavor ola oi bom dia tarde noite bia
+    mostre mostra mostrar liste lista listar ver veja encontre achar acha
+""".split())
+
+# Valor em reais, com ou sem "R$" na frente (o normalizar_pergunta tira o "$")
+_VALOR = r'(?:r\$?\s*)?(\d+)'
+
+_QUARTOS_RE = re.compile(
+    r'\b(?:(pelo menos|no minimo|minimo de|mais de|acima de)\s+)?(\d+|um|uma)\s+(?:quartos?|dormitorios?|qtos?)\b'
+)
+_ENTRE_RE = re.compile(rf'\bentre\s+{_VALOR}\s+(?:reais\s+)?e\s+{_VALOR}\b')
+_MAXIMO_RE = re.compile(
+    rf'\b(ate|no maximo|maximo de|menos de|por menos de|abaixo de|mais barat[oa]s? (?:do )?que|menor que)\s+{_VALOR}\b'
+)
+_MINIMO_RE = re.compile(rf'\b(acima de|mais de|a partir de|no minimo|pelo menos|maior que)\s+{_VALOR}\b')
+_PETS_RE = re.compile(
+    r'\b(?:(?:que\s+)?(?:aceit[ae]m?|permit[ae]m?|pode(?:m)? ter)\s+)?(?:pets?|animais|animal|cachorros?|gatos?|caes|cao)\b'
+)
+_ORDEM_RE = re.compile(r'\b(?:(o|a)\s+)?mais (barat|car)[oa]s?\b')
+_SINGULAR_RE = re.compile(r'^\s*qual (?:e )?(?:o|a)\b')
+
+
+def _converter_numeros(texto):
+    """'dois mil e quinhentos' -> '2500', '2,5 mil' -> '2500', '1.500,00' -> '1500'."""
+    texto = ' '.join(str(NUMEROS_POR_EXTENSO.get(p, p)) for p in texto.split())
+    texto = re.sub(r'\b(\d{1,3})\.(\d{3})\b', r'\1\2', texto)
+    texto = re.sub(r'\b(\d+),\d{2}\b(?!\s*mil)', r'\1', texto)
+
+    def milhar(m):
+        base = float(m.group(1).replace(',', '.')) if m.group(1) else 1
+        return str(int(base * 1000 + int(m.group(2) or 0)))
+
+    return re.sub(r'\b(?:(\d+(?:[.,]\d+)?)\s+)?mil(?:\s+e\s+(\d+))?\b', milhar, texto)
+
+
+class ParserConsulta:
+    def __init__(self, bairros, tipos=None):
+        self.bairros = {normalizar_pergunta(b): b for b in bairros if b}
+        tipos_validos = set(tipos) if tipos else set(SINONIMOS_TIPO)
+        self.sinonimos = sorted(
+            ((normalizar_pergunta(s), tipo) for tipo, lista in SINONIMOS_TIPO.items() if tipo in tipos_validos for s in lista),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+
+    def interpretar(self, pergunta):
+        """Devolve (campos, confiança). Confiança 1.0 = todas as palavras foram entendidas."""
+        texto = f" {_converter_numeros(normalizar_pergunta(pergunta).replace('?', ' '))} "
+        campos = {}
+        singular = bool(_SINGULAR_RE.match(texto))
+
+        def consumir(padrao, funcao):
+            nonlocal texto
+            for m in list(padrao.finditer(texto)):
+                funcao(m)
+            texto = padrao.sub(' ', texto)
+
+        def quartos(m):
+            # "um"/"uma" só viram número aqui; em outros lugares são artigo
+            minimo = 1 if m.group(2) in ('um', 'uma') else int(m.group(2))
+            campos['quartos'] = minimo + 1 if m.group(1) in ('mais de', 'acima de') else minimo
+
+        def entre(m):
+            a, b = sorted((int(m.group(1)), int(m.group(2))))
+            campos['custo_min'], campos['custo_max'] = (a, '>='), (b, '<=')
+
+        def maximo(m):
+            estrito = m.group(1) != 'ate' and 'maximo' not in m.group(1)
+            campos['custo_max'] = (int(m.group(2)), '<' if estrito else '<=')
+
+        def minimo(m):
+            estrito = m.group(1) in ('acima de', 'mais de', 'maior que')
+            campos['custo_min'] = (int(m.group(2)), '>' if estrito else '>=')
+
+        def ordem(m):
+            campos['ordem'] = 'ASC' if m.group(2) == 'barat' else 'DESC'
+            if m.group(1) or singular:
+                # "o mais barato" / "qual o ... mais barato" pede um imóvel só
+                campos['limite'] = 1
+
+        consumir(_QUARTOS_RE, quartos)
+        consumir(_ENTRE_RE, entre)
+        consumir(_MAXIMO_RE, maximo)
+        consumir(_MINIMO_RE, minimo)
+        consumir(_PETS_RE, lambda m: campos.__setitem__('pets', True))
+        consumir(_ORDEM_RE, ordem)
+
+        for sinonimo, tipo in self.sinonimos:
+            if f' {sinonimo} ' in texto:
+                if campos.setdefault('tipo', tipo) != tipo:
+                    return campos, 0.0
+                texto = texto.replace(f' {sinonimo} ', ' ')
+        for nome, bairro in sorted(self.bairros.items(), key=lambda item: len(item[0]), reverse=True):
+            if f' {nome} ' in texto:
+                if campos.setdefault('bairro', bairro) != bairro:
+                    # Dois bairros ("Centro ou São Mateus") fica para o LLM
+                    return campos, 0.0
+                texto = texto.replace(f' {nome} ', ' ')
+
+        restantes = [p for p in re.findall(r'[\w$]+', texto) if p not in PALAVRAS_NEUTRAS]
+        filtros = {k for k in campos if k not in ('ordem', 'limite')}
+        if not filtros:
+            return campos, 0.0
+        palavras = len(re.findall(r'[\w$]+', normalizar_pergunta(pergunta)))
+        return campos, 1.0 - len(restantes) / max(palavras, 1)
+
+    def montar_sql(self, campos):
+        """SQL parametrizado (placeholders ?) para o run_sql do pool."""
+        condicoes, params = [], []
+        if 'bairro' in campos:
+            condicoes.append('bairro = ?')
+            params.append(campos['bairro'])
+        if 'tipo' in campos:
+            condicoes.append('especificacao = ?')
+            params.append(campos['tipo'])
+        if 'quartos' in campos:
+            condicoes.append('quartos >= ?')
+            params.append(campos['quartos'])
+        for chave in ('custo_min', 'custo_max'):
+            if chave in campos:
+                valor, operador = campos[chave]
+                condicoes.append(f'custo_total {operador} ?')
+                params.append(valor)
+        if campos.get('pets'):
+            condicoes.append('aceita_pets = 1')
+        sql = 'SELECT * FROM core_imovel WHERE ' + ' AND '.join(condicoes)
+        sql += f" ORDER BY custo_total {campos.get('ordem', 'ASC')}"
+        sql += f" LIMIT {campos.get('limite', LIMITE_PADRAO)}"
+        return sql, params
+
+
+def sql_legivel(sql, params):
+    """Só para exibir na tela: troca os ? pelos valores (nunca é executado)."""
+    for valor in params:
+        literal = "'" + str(valor).replace("'", "''") + "'" if isinstance(valor, str) else str(valor)
+        sql = sql.replace('?', literal, 1)
+    return sql
@@ -0,0 +1,130 @@
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import rastreio
+from cache_sql import normalizar_pergunta
+
+# ==========================================
+# PIPELINE DO TURNO (REESCRITA + SQL ESPECULATIVO)
+# ==========================================
+# A reescrita contextual (deepseek) e a geração de SQL (qwen) são chamadas
+# bloqueantes; aqui elas rodam em threads coordenadas por asyncio. Enquanto a
+# reescrita roda, o SQL da pergunta crua já vai sendo gerado: se a reescrita
+# devolver a mesma pergunta (o caso comum para perguntas completas), o resultado
+# especulativo é usado na hora. Cada etapa tem um tempo máximo, para que um
+# modelo travado não segure o turno para sempre.
+TIMEOUTS_ETAPAS = {
+    'reescrita': 30,
+    'sql': 90,
+    'resposta': 120,
+}
+
+logger = logging.getLogger("bia.pipeline")
+
+# Executor próprio, e não o padrão do loop: o asyncio.run espera as threads do
+# executor padrão terminarem, o que anularia o timeout de uma etapa abandonada
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="bia-pipeline")
+
+
+def _medir(etapa, atributos, funcao, *args):
+    with rastreio.span(etapa, **atributos):
+        return funcao(*args)
+
+
+async def _em_thread(etapa, timeout, funcao, *args, **atributos):
+    try:
+        # O run_in_executor não leva o contexto: sem a cópia, os spans da thread se perdem
+        contexto = contextvars.copy_context()
+        futuro = asyncio.get_running_loop().run_in_executor(
+            _executor, contexto.run, _medir, etapa, atributos, funcao, *args
+        )
+        return await asyncio.wait_for(futuro, timeout)
+    except asyncio.TimeoutError:
+        # A thread não pode ser interrompida; o timeout do cliente ollama a encerra depois
+        logger.warning("Etapa %s passou de %ss e foi abandonada", etapa, timeout)
+        rastreio.anotar(**{f"timeout_{etapa}": timeout})
+        raise
+
+
+class RodadaEspeculativa:
+    """Estado da consulta sobre a pergunta crua, feita enquanto a reescrita roda.
+
+    O analista não grava nada dessa rodada: anota aqui o caminho e o SQL a guardar
+    no cache, e o pipeline só os confirma (analista.confirmar_especulativo) se o
+    resultado for usado. O task.cancel() do asyncio não para a thread; ela
+    consulta `cancelada` entre gerar o SQL e executá-lo.
+    """
+
+    def __init__(self):
+        self.cancelada = threading.Event()
+        self.caminho = None
+        self.para_cache = None
+
+
+async def _consultar(analista, pergunta, timeouts, especulativo=None):
+    try:
+        return await _em_thread('sql', timeouts['sql'], analista.executar_consulta, pergunta, especulativo,
+                                pergunta=pergunta, especulativo=especulativo is not None)
+    except asyncio.TimeoutError:
+        return None, f"Tempo esgotado ao gerar o SQL ({timeouts['sql']}s)."
+
+
+def _valido(resultado):
+    df, _ = resultado
+    return df is not None
+
+
+async def preparar_turno(analista, reescrever, pergunta, historico, timeouts=None, gate=None):
+    """Devolve (pergunta usada, df, sql) para o turno.
+
+    Sem histórico (ou se o `gate` disser que a pergunta já é completa) não há
+    reescrita. Com histórico, a pergunta crua é consultada em paralelo com a
+    reescrita; vale o resultado da reescrita, com o especulativo como reserva se
+    a reescrita falhar, estourar o tempo ou o SQL dela der erro.
+    """
+    timeouts = {**TIMEOUTS_ETAPAS, **(timeouts or {})}
+    if historico and gate is not None:
+        with rastreio.span("gate"):
+            precisa = gate.precisa_reescrever(pergunta, historico)
+        if not precisa:
+            logger.info("Reescrita dispensada pelo gate (%d de %d evitadas)", gate.evitadas, gate.avaliadas)
+            historico = None
+    if not historico:
+        df, sql = await _consultar(analista, pergunta, timeouts)
+        return pergunta, df, sql
+
+    rodada = RodadaEspeculativa()
+    especulativo = asyncio.create_task(_consultar(analista, pergunta, timeouts, especulativo=rodada))
+    try:
+        reescrita = await _em_thread('reescrita', timeouts['reescrita'], reescrever, pergunta, historico)
+    except Exception:
+        reescrita = pergunta
+
+    if normalizar_pergunta(reescrita) == normalizar_pergunta(pergunta):
+        rastreio.anotar(resultado="especulativo")
+        df, sql = await especulativo
+        if df is not None:
+            analista.confirmar_especulativo(rodada)
+        return pergunta, df, sql
+
+    resultado = await _consultar(analista, reescrita, timeouts)
+    if _valido(resultado):
+        rodada.cancelada.set()
+        especulativo.cancel()
+        rastreio.anotar(resultado="reescrita")
+        return (reescrita, *resultado)
+    logger.info("SQL da pergunta reescrita falhou; usando o resultado especulativo")
+    rastreio.anotar(resultado="especulativo_reserva")
+    df, sql = await especulativo
+    if df is None:
+        return (reescrita, *resultado)
+    analista.confirmar_especulativo(rodada)
+    return pergunta, df, sql
+
+
+def executar_turno(analista, reescrever, pergunta, historico, timeouts=None, gate=None):
+    """Versão síncrona para o Streamlit (cada execução do script roda numa thread sem loop)."""
+    return asyncio.run(preparar_turno(analista, reescrever, pergunta, historico, timeouts, gate))
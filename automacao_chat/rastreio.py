@@ -0,0 +1,179 @@
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# ==========================================
+# RASTREIO POR ETAPA DO TURNO (SPANS)
+# ==========================================
+# Cada turno do chat vira um rastro com spans aninhados (gate, reescrita, sql,
+# parser, generate_sql, chroma, run_sql, resposta...) com tempo de parede e
+# atributos: modelo, tokens, acertos de cache, tentativas. O span atual fica numa
+# ContextVar, então quem instrumenta não recebe nada por parâmetro e, fora de um
+# turno, tudo vira no-op. Threads não herdam o contexto sozinhas: o pipeline e as
+# buscas no Chroma submetem o trabalho com contextvars.copy_context().run.
+#
+# No fim do turno o rastro vai, numa linha JSON, para um arquivo com rotação
+# (RotatingFileHandler) se configurar() tiver sido chamado.
+ARQUIVO_PADRAO = os.path.join("rastros", "turnos.jsonl")
+MAX_BYTES = 10 * 1024 * 1024
+COPIAS = 5
+
+# (rastro, span atual); span None = raiz do turno
+_atual = contextvars.ContextVar("bia_rastro", default=(None, None))
+
+_exportador = logging.getLogger("bia.rastros")
+_exportador.propagate = False
+
+
+class Rastro:
+    def __init__(self, nome, **atributos):
+        self.id = uuid.uuid4().hex[:16]
+        self.nome = nome
+        self.atributos = atributos
+        self.criado_em = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.inicio = time.perf_counter()
+        self.duracao = None
+        self.spans = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _novo_span(self, nome, pai, atributos):
+        with self._lock:
+            id_ = next(self._ids)
+        return {
+            "id": id_,
+            "pai": pai["id"] if pai else None,
+            "nome": nome,
+            "thread": threading.current_thread().name,
+            "inicio_ms": (time.perf_counter() - self.inicio) * 1000,
+            "atributos": atributos,
+        }
+
+    def _fechar(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def para_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["inicio_ms"])
+        return {
+            "rastro": self.id,
+            "nome": self.nome,
+            "criado_em": self.criado_em,
+            "duracao_ms": None if self.duracao is None else self.duracao * 1000,
+            "atributos": self.atributos,
+            "spans": spans,
+        }
+
+    def linhas(self):
+        """Spans em árvore (pai antes dos filhos), prontos para uma tabela."""
+        spans = self.para_dict()["spans"]
+        fechados = {s["id"] for s in spans}
+        filhos = defaultdict(list)
+        for s in spans:
+            # Filho de um span que ainda não terminou (etapa abandonada) sobe para a raiz
+            filhos[s["pai"] if s["pai"] in fechados else None].append(s)
+
+        linhas = []
+
+        def visitar(pai, nivel):
+            for s in filhos.get(pai, []):
+                detalhes = ", ".join(f"{k}={v}" for k, v in s["atributos"].items() if v is not None)
+                if "erro" in s:
+                    detalhes = f"ERRO {s['erro']}" + (f"; {detalhes}" if detalhes else "")
+                linhas.append({
+                    "etapa": "· " * nivel + s["nome"],
+                    "início (ms)": round(s["inicio_ms"], 1),
+                    "duração (ms)": round(s["duracao_ms"], 1),
+                    "detalhes": detalhes,
+                })
+                visitar(s["id"], nivel + 1)
+
+        visitar(None, 0)
+        return linhas
+
+
+@contextmanager
+def rastrear_turno(nome="turno", **atributos):
+    """Abre o rastro do turno; ao sair, grava no arquivo de rastros (se configurado)."""
+    rastro = Rastro(nome, **atributos)
+    token = _atual.set((rastro, None))
+    try:
+        yield rastro
+    except BaseException as e:
+        rastro.atributos["erro"] = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        rastro.duracao = time.perf_counter() - rastro.inicio
+        _atual.reset(token)
+        exportar(rastro)
+
+
+@contextmanager
+def span(nome, **atributos):
+    """Mede um trecho dentro do turno atual. Devolve o dict de atributos, que o
+    chamador pode completar (`s["hit"] = True`)."""
+    rastro, pai = _atual.get()
+    if rastro is None:
+        yield atributos
+        return
+    registro = rastro._novo_span(nome, pai, atributos)
+    token = _atual.set((rastro, registro))
+    inicio = time.perf_counter()
+    try:
+        yield atributos
+    except BaseException as e:
+        registro["erro"] = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        registro["duracao_ms"] = (time.perf_counter() - inicio) * 1000
+        _atual.reset(token)
+        rastro._fechar(registro)
+
+
+def _atributos_atuais():
+    rastro, registro = _atual.get()
+    if rastro is None:
+        return None
+    return registro["atributos"] if registro else rastro.atributos
+
+
+def anotar(**atributos):
+    """Acrescenta atributos ao span atual (ou à raiz do turno)."""
+    destino = _atributos_atuais()
+    if destino is not None:
+        destino.update(atributos)
+
+
+def contar(**quantidades):
+    """Soma contadores no span atual: tokens, tentativas, acertos de cache."""
+    destino = _atributos_atuais()
+    if destino is not None:
+        for chave, n in quantidades.items():
+            destino[chave] = (destino.get(chave) or 0) + (n or 0)
+
+
+def configurar(caminho=ARQUIVO_PADRAO, max_bytes=MAX_BYTES, copias=COPIAS):
+    """Liga a exportação dos rastros para `caminho` (JSONL com rotação). Idempotente."""
+    caminho = os.path.abspath(caminho)
+    for handler in _exportador.handlers:
+        if getattr(handler, "baseFilename", None) == caminho:
+            return
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    handler = RotatingFileHandler(caminho, maxBytes=max_bytes, backupCount=copias, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _exportador.addHandler(handler)
+    _exportador.setLevel(logging.INFO)
+
+
+def exportar(rastro):
+    if _exportador.handlers:
+        _exportador.info(json.dumps(rastro.para_dict(), ensure_ascii=False, default=str))
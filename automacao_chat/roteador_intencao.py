@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from cache_sql import normalizar_pergunta
+
+# ==========================================
+# ROTEADOR DE INTENÇÃO (BUSCAR / REGRAS / CONVERSAR)
+# ==========================================
+# Em vez de uma geração inteira do LLM para devolver uma palavra, a mensagem é
+# comparada (cosseno) com o centróide dos embeddings de exemplos rotulados de cada
+# intenção. Os embeddings dos exemplos são calculados uma vez e guardados em
+# disco; cada mensagem custa um embedding. Se a intenção vencedora não ganhar com
+# folga, a decisão fica para o LLM (fallback).
+SIMILARIDADE_MINIMA = 0.5
+MARGEM_MINIMA = 0.04
+MAX_MEMO = 512
+
+EXEMPLOS_INTENCAO = {
+    'BUSCAR': [
+        "quero alugar um apartamento no centro",
+        "tem casa com 3 quartos?",
+        "qual o imóvel mais barato?",
+        "apartamentos até 2000 reais no são mateus",
+        "quais imóveis vocês têm no granbery?",
+        "procuro kitnet perto da ufjf",
+        "tem casa que aceita cachorro no benfica?",
+        "quanto custa o aluguel do imóvel 131?",
+        "me mostra opções com garagem",
+        "quais bairros têm imóveis disponíveis?",
+        "e no cascatinha, tem alguma coisa?",
+        "preciso de um lugar com dois quartos e varanda",
+    ],
+    'REGRAS': [
+        "quais documentos preciso para alugar?",
+        "vocês aceitam fiador?",
+        "posso usar seguro fiança?",
+        "qual o horário de visita?",
+        "dá para visitar no sábado?",
+        "preciso comprovar quanto de renda?",
+        "aceitam título de capitalização como garantia?",
+        "posso ter animal de estimação no imóvel?",
+        "como funciona o contrato de locação?",
+        "quais são as garantias aceitas?",
+    ],
+    'CONVERSAR': [
+        "oi", "olá, tudo bem?", "bom dia", "boa tarde bia", "boa noite",
+        "obrigado", "valeu, até mais", "tchau", "quem é você?",
+        "você é um robô?", "tudo certo por aí?", "legal, obrigada pela ajuda",
+    ],
+}
+
+
+def _normalizar_linhas(matriz):
+    matriz = np.asarray(matriz, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    return matriz / np.where(normas == 0, 1.0, normas)
+
+
+class RoteadorIntencao:
+    """Classificador de intenção por centróide mais próximo.
+
+    `embedder` recebe uma lista de textos e devolve a lista de vetores (a mesma
+    assinatura das embedding functions do Chroma). `fallback` recebe o texto e
+    devolve a intenção quando a confiança não basta (ex.: a chamada ao LLM).
+    `caminho_cache` guarda os embeddings dos exemplos; `modelo` entra na chave,
+    para que trocar o modelo de embedding invalide o arquivo.
+    """
+
+    def __init__(self, embedder, exemplos=None, fallback=None, caminho_cache=None, modelo='',
+                 similaridade_minima=SIMILARIDADE_MINIMA, margem_minima=MARGEM_MINIMA):
+        self.embedder = embedder
+        self.fallback = fallback
+        self.similaridade_minima = similaridade_minima
+        self.margem_minima = margem_minima
+        self.exemplos = exemplos or EXEMPLOS_INTENCAO
+        self.classes = list(self.exemplos)
+        self.origens = Counter()
+        self._memo = OrderedDict()
+
+        textos = [t for classe in self.classes for t in self.exemplos[classe]]
+        vetores = self._embeddings_exemplos(textos, caminho_cache, modelo)
+        centroides, inicio = [], 0
+        for classe in self.classes:
+            fim = inicio + len(self.exemplos[classe])
+            centroides.append(vetores[inicio:fim].mean(axis=0))
+            inicio = fim
+        self.centroides = _normalizar_linhas(centroides)
+
+    def _embeddings_exemplos(self, textos, caminho_cache, modelo):
+        chave = hashlib.sha256(json.dumps([modelo, textos], ensure_ascii=False).encode("utf-8")).hexdigest()
+        if caminho_cache and os.path.exists(caminho_cache):
+            with np.load(caminho_cache) as salvo:
+                if str(salvo["chave"]) == chave:
+                    return salvo["vetores"]
+        # Uma chamada só ao embedder para todos os exemplos
+        vetores = _normalizar_linhas(self.embedder(textos))
+        if caminho_cache:
+            np.savez(caminho_cache, chave=chave, vetores=vetores)
+        return vetores
+
+    def pontuar(self, texto):
+        """Similaridade da mensagem com o centróide de cada intenção."""
+        chave = normalizar_pergunta(texto)
+        if chave not in self._memo:
+            vetor = _normalizar_linhas(self.embedder([texto]))[0]
+            self._memo[chave] = dict(zip(self.classes, (self.centroides @ vetor).tolist()))
+            if len(self._memo) > MAX_MEMO:
+                self._memo.popitem(last=False)
+        self._memo.move_to_end(chave)
+        return self._memo[chave]
+
+    def classificar(self, texto):
+        """Devolve (intenção, confiança, origem), com origem 'embedding' ou 'llm'."""
+        pontos = sorted(self.pontuar(texto).items(), key=lambda item: item[1], reverse=True)
+        (classe, melhor), (_, segundo) = pontos[0], pontos[1]
+        confianca = melhor - segundo
+        if self.fallback is not None and (melhor < self.similaridade_minima or confianca < self.margem_minima):
+            self.origens['llm'] += 1
+            return self.fallback(texto), confianca, 'llm'
+        self.origens['embedding'] += 1
+        return classe, confianca, 'embedding'
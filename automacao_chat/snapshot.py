@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# ==========================================
+# SNAPSHOT DO AGENTE (PARTIDA RÁPIDA)
+# ==========================================
+# Gerado pelo passo de build (python agentes.py --construir-snapshot) ao lado da
+# coleção do Chroma já treinada. Guarda o que a partida calculava toda vez: as
+# listas de bairros/ruas/tipos (o SELECT DISTINCT), o hash do schema e a impressão
+# digital do treino (usada pelo cache de SQL). Na partida, só se confere o schema
+# e a marca dos dados com duas consultas baratas; se algo mudou, o caminho lento
+# roda de novo e regrava o snapshot.
+VERSAO_SNAPSHOT = 1
+ARQUIVO = "snapshot.json"
+
+
+def _conectar(db_path):
+    return sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+
+
+def hash_schema(db_path):
+    conn = _conectar(db_path)
+    try:
+        linhas = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE name LIKE 'core_imovel%' ORDER BY name"
+        ).fetchall()
+    finally:
+        conn.close()
+    return hashlib.sha256(json.dumps(linhas).encode("utf-8")).hexdigest()
+
+
+def marca_dados(db_path):
+    """Muda sempre que um imóvel é criado, alterado ou apagado (índice em updated_at)."""
+    conn = _conectar(db_path)
+    try:
+        total, ultima = conn.execute("SELECT COUNT(*), MAX(updated_at) FROM core_imovel").fetchone()
+    finally:
+        conn.close()
+    return f"{total}:{ultima}"
+
+
+def carregar(pasta, db_path):
+    """Conteúdo do snapshot, ou None se não existir ou não valer para este banco."""
+    try:
+        with open(os.path.join(pasta, ARQUIVO), encoding="utf-8") as arquivo:
+            snapshot = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get("versao") != VERSAO_SNAPSHOT:
+        return None
+    if snapshot.get("schema") != hash_schema(db_path) or snapshot.get("dados") != marca_dados(db_path):
+        return None
+    return snapshot
+
+
+def gravar(pasta, db_path, **conteudo):
+    snapshot = {
+        "versao": VERSAO_SNAPSHOT,
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "schema": hash_schema(db_path),
+        "dados": marca_dados(db_path),
+        **conteudo,
+    }
+    os.makedirs(pasta, exist_ok=True)
+    temporario = os.path.join(pasta, ARQUIVO + ".tmp")
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(snapshot, arquivo, ensure_ascii=False, indent=1)
+    # Troca atômica: uma partida concorrente nunca lê um snapshot pela metade
+    os.replace(temporario, os.path.join(pasta, ARQUIVO))
+    return snapshot
@@ -0,0 +1,163 @@
+import time
+
+import ollama
+
+import rastreio
+
+# ==========================================
+# STREAMING DE RESPOSTAS (SEM O RACIOCÍNIO DO MODELO)
+# ==========================================
+# O deepseek-r1 escreve o raciocínio entre <think>...</think> (ou <thought>) antes
+# da resposta. O filtro recebe os pedaços conforme chegam e devolve só o texto
+# visível, mesmo quando uma tag vem quebrada entre dois pedaços ("<thi" + "nk>").
+TAGS_RACIOCINIO = {'<think>': '</think>', '<thought>': '</thought>'}
+_TODAS_AS_TAGS = list(TAGS_RACIOCINIO) + list(TAGS_RACIOCINIO.values())
+
+
+class FiltroRaciocinio:
+    """Filtro incremental de blocos de raciocínio.
+
+    Com `reter_ate_tag=True` (modelos que pensam), nada é mostrado até aparecer a
+    primeira tag: se ela for um fechamento sem abertura, o texto retido era
+    raciocínio e é descartado. Se nenhuma tag aparecer, o texto sai no final.
+    """
+
+    def __init__(self, reter_ate_tag=True):
+        self.buffer = ''
+        self.fechamento = None
+        self.retendo = reter_ate_tag
+        self.retido = []
+        self.emitiu = False
+
+    def _visivel(self, texto):
+        if self.retendo:
+            self.retido.append(texto)
+            return ''
+        if not self.emitiu:
+            # Descarta as quebras de linha que sobram depois do </think>
+            texto = texto.lstrip()
+            self.emitiu = bool(texto)
+        return texto
+
+    def _liberar_retido(self, descartar):
+        texto = '' if descartar else ''.join(self.retido)
+        self.retido = []
+        self.retendo = False
+        return self._visivel(texto) if texto else ''
+
+    def alimentar(self, pedaco):
+        self.buffer += pedaco
+        saida = []
+        while self.buffer:
+            if self.fechamento:
+                i = self.buffer.find(self.fechamento)
+                if i == -1:
+                    # Guarda só o suficiente para reconhecer a tag de fechamento partida
+                    self.buffer = self.buffer[-(len(self.fechamento) - 1):]
+                    break
+                self.buffer = self.buffer[i + len(self.fechamento):]
+                self.fechamento = None
+                continue
+
+            i = self.buffer.find('<')
+            if i == -1:
+                saida.append(self._visivel(self.buffer))
+                self.buffer = ''
+                break
+            if i:
+                saida.append(self._visivel(self.buffer[:i]))
+                self.buffer = self.buffer[i:]
+
+            tag = next((t for t in _TODAS_AS_TAGS if self.buffer.startswith(t)), None)
+            if tag in TAGS_RACIOCINIO:
+                saida.append(self._liberar_retido(descartar=False))
+                self.fechamento = TAGS_RACIOCINIO[tag]
+                self.buffer = self.buffer[len(tag):]
+            elif tag:
+                # Fechamento sem abertura: o texto retido até aqui era raciocínio
+                if self.retendo:
+                    self._liberar_retido(descartar=True)
+                self.buffer = self.buffer[len(tag):]
+            elif any(t.startswith(self.buffer) for t in _TODAS_AS_TAGS):
+                # Pode ser o começo de uma tag: espera o próximo pedaço
+                break
+            else:
+                saida.append(self._visivel('<'))
+                self.buffer = self.buffer[1:]
+        return ''.join(saida)
+
+    def finalizar(self):
+        resto = '' if self.fechamento else self.buffer
+        self.buffer = ''
+        saida = self._liberar_retido(descartar=False) if self.retendo else ''
+        return saida + (self._visivel(resto) if resto else '')
+
+
+_clientes = {}
+
+
+def pedacos_ollama(model, system, prompt, options=None, timeout=None):
+    """Texto cru do ollama.generate em modo stream, pedaço a pedaço.
+
+    `timeout` limita a espera por cada pedaço (inclusive o primeiro) no HTTP.
+    Modelo e tokens (do último pedaço) vão para o span atual do rastreio.
+    """
+    cliente = _clientes.get(timeout)
+    if cliente is None:
+        cliente = _clientes[timeout] = ollama.Client(timeout=timeout)
+    for parte in cliente.generate(model=model, system=system, prompt=prompt, options=options or {}, stream=True):
+        if parte.get('done'):
+            rastreio.anotar(modelo=model)
+            rastreio.contar(chamadas_llm=1, prompt_tokens=parte.get('prompt_eval_count'),
+                            completion_tokens=parte.get('eval_count'))
+        yield parte['response']
+
+
+class RespostaStream:
+    """Iterável com os trechos visíveis de uma resposta; mede o tempo até o primeiro.
+
+    `inicio` permite medir a partir do começo do turno (o que o cliente percebe).
+    `ao_terminar` recebe o texto completo se o stream acabar sem erro.
+    `limite` (segundos desde a criação) corta uma geração que não termina nunca.
+    """
+
+    def __init__(self, pedacos, pensa=True, inicio=None, ao_terminar=None, mensagem_erro=None, limite=None):
+        self.pedacos = pedacos
+        self.limite = limite
+        self.criado = time.perf_counter()
+        self.filtro = FiltroRaciocinio(reter_ate_tag=pensa)
+        self.inicio = inicio if inicio is not None else time.perf_counter()
+        self.ao_terminar = ao_terminar
+        self.mensagem_erro = mensagem_erro
+        self.ttft = None
+        self.duracao = None
+        self.texto = ''
+
+    def _registrar(self, trecho):
+        if self.ttft is None and trecho.strip():
+            self.ttft = time.perf_counter() - self.inicio
+        self.texto += trecho
+        return trecho
+
+    def __iter__(self):
+        try:
+            for pedaco in self.pedacos:
+                if self.limite is not None and time.perf_counter() - self.criado > self.limite:
+                    # Fechar o gerador encerra a conexão, e o ollama para de gerar
+                    getattr(self.pedacos, 'close', lambda: None)()
+                    raise TimeoutError(f"Resposta passou de {self.limite}s")
+                visivel = self.filtro.alimentar(pedaco)
+                if visivel:
+                    yield self._registrar(visivel)
+            resto = self.filtro.finalizar()
+            if resto:
+                yield self._registrar(resto)
+        except Exception:
+            if self.mensagem_erro is None:
+                raise
+            yield self._registrar(("\n\n" if self.texto else "") + self.mensagem_erro)
+        else:
+            if self.ao_terminar is not None:
+                self.ao_terminar(self.texto.strip())
+        finally:
+            self.duracao = time.perf_counter() - self.inicio
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import textwrap
+import time
+
+# ==========================================
+# MANIFESTO DE TREINO DO VANNA
+# ==========================================
+# Todo o material de treino (DDL, documentação e pares pergunta/SQL) declarado
+# num lugar só. Cada item é identificado pelo hash do conteúdo; na partida, o
+# manifesto é comparado com o que está no Chroma e só o que mudou é embedado de
+# novo (ou removido). Mudar a documentação não exige mais trocar o path do banco
+# vetorial e re-embedar tudo, e itens repetidos viram um só.
+logger = logging.getLogger("bia.treino")
+
+DDL = [
+    textwrap.dedent("""
+    CREATE TABLE core_imovel (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        titulo VARCHAR(200),
+        descricao TEXT,
+        quartos INTEGER,
+        banheiros INTEGER,
+        garagem INTEGER,
+        area DECIMAL,
+        bairro VARCHAR(100),
+        rua VARCHAR(100),
+        preco_aluguel DECIMAL,
+        preco_iptu DECIMAL,
+        preco_condominio DECIMAL,
+        aceita_pets BOOLEAN, -- 1 para Sim, 0 para Não
+        especificacao VARCHAR(100), -- apartamento, casa, kitnet, studio, loft, cobertura
+        custo_total DECIMAL -- preco_aluguel + preco_condominio + preco_iptu (coluna gerada e indexada)
+    );
+    """).strip(),
+    # Índice de texto completo (FTS5) sobre core_imovel: ignora acentos e maiúsculas
+    textwrap.dedent("""
+    CREATE VIRTUAL TABLE core_imovel_fts USING fts5(
+        titulo, descricao, bairro, rua, -- rowid = core_imovel.id
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    """).strip(),
+]
+
+# {bairros} é preenchido com os bairros do banco (mudou a lista, só este item é re-embedado)
+DOCUMENTACAO = [
+    textwrap.dedent("""
+    - Localização: Juiz de Fora, MG.
+    - REGRA DE ID: O campo 'id' é um INTEIRO. Ex: 'imóvel 131' deve ser traduzido como WHERE id = 131.
+    - REGRA DE PETS: Se o cliente citar 'gato', 'cachorro' ou 'pets', use 'aceita_pets = 1'.
+    - NUNCA use LOWER() ou LIKE em colunas booleanas (aceita_pets) ou numéricas (preços, quartos, id).
+    - Use LOWER() apenas para colunas de texto: bairro, rua, especificacao.
+    - BUSCA POR TEXTO (bairro, rua, palavras do título/descrição como 'loft', 'ufjf'): NUNCA use LIKE '%...%'.
+      Use a tabela core_imovel_fts: id IN (SELECT rowid FROM core_imovel_fts WHERE core_imovel_fts MATCH 'bairro:"sao mateus"').
+      O MATCH ignora acentos ('sao' encontra 'São'). Colunas: titulo, descricao, bairro, rua. Sem prefixo de coluna busca em todas.
+    - Custo Total: use SEMPRE a coluna custo_total (já é aluguel + condomínio + IPTU). Nunca some os preços na mão.
+    - Bairros válidos em JF: {bairros}.
+    """).strip(),
+]
+
+EXEMPLOS = [
+    ("Qual o apartamento mais barato no Centro?",
+     "SELECT * FROM core_imovel WHERE LOWER(especificacao) = 'apartamento' AND LOWER(bairro) = 'centro' ORDER BY preco_aluguel ASC LIMIT 1"),
+    ("Tem casa com 3 quartos que aceita cachorro?",
+     "SELECT * FROM core_imovel WHERE LOWER(especificacao) = 'casa' AND quartos >= 3 AND aceita_pets = 1 LIMIT 5"),
+    ("Qual o custo total desse imóvel?",
+     "SELECT id, titulo, custo_total FROM core_imovel LIMIT 5"),
+    ("Imóveis no São Mateus por menos de 2000 reais",
+     "SELECT * FROM core_imovel WHERE id IN (SELECT rowid FROM core_imovel_fts WHERE core_imovel_fts MATCH 'bairro:\"sao mateus\"') AND custo_total < 2000 LIMIT 5"),
+    ("Tem algum loft perto da UFJF?",
+     "SELECT * FROM core_imovel WHERE id IN (SELECT rowid FROM core_imovel_fts WHERE core_imovel_fts MATCH 'loft OR ufjf') LIMIT 5"),
+    ("Imóveis na Rua Padre Cafe",
+     "SELECT * FROM core_imovel WHERE id IN (SELECT rowid FROM core_imovel_fts WHERE core_imovel_fts MATCH 'rua:\"padre cafe\"') LIMIT 5"),
+    # Exemplos para ensinar a LLM a lidar com "teto" e "piso" de valores
+    ("Quero um apartamento de até 1500 reais",
+     "SELECT * FROM core_imovel WHERE LOWER(especificacao) = 'apartamento' AND custo_total <= 1500 LIMIT 5"),
+    ("Tem casa mais barata que 2 mil?",
+     "SELECT * FROM core_imovel WHERE LOWER(especificacao) = 'casa' AND custo_total < 2000 ORDER BY preco_aluguel ASC LIMIT 5"),
+    ("Imóveis entre 1000 e 2000 reais no Centro",
+     "SELECT * FROM core_imovel WHERE LOWER(bairro) = 'centro' AND custo_total BETWEEN 1000 AND 2000 LIMIT 5"),
+]
+
+
+def hash_item(tipo, conteudo, pergunta=None):
+    return hashlib.sha256(json.dumps([tipo, pergunta, conteudo], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def manifesto(bairros):
+    """{hash: (tipo, conteúdo, pergunta)}; itens idênticos colapsam no mesmo hash."""
+    itens = [('ddl', ddl, None) for ddl in DDL]
+    itens += [('documentation', doc.format(bairros=", ".join(bairros)), None) for doc in DOCUMENTACAO]
+    itens += [('sql', sql, pergunta) for pergunta, sql in EXEMPLOS]
+    return {hash_item(*item): item for item in itens}
+
+
+def hash_manifesto(itens):
+    return hashlib.sha256("".join(sorted(itens)).encode("utf-8")).hexdigest()
+
+
+def sincronizar(vn, itens):
+    """Deixa o banco vetorial igual ao manifesto: remove o que saiu (ou está
+    duplicado) e adiciona só o que falta. Devolve (adicionados, removidos)."""
+    inicio = time.perf_counter()
+    atuais = vn.get_training_data()
+    presentes = set()
+    remover = []
+    for linha in atuais.itertuples(index=False) if not atuais.empty else ():
+        pergunta = linha.question if linha.training_data_type == 'sql' else None
+        chave = hash_item(linha.training_data_type, linha.content, pergunta)
+        if chave in itens and chave not in presentes:
+            presentes.add(chave)
+        else:
+            remover.append(linha.id)
+
+    for id_ in remover:
+        vn.remove_training_data(id_)
+    faltando = [chave for chave in itens if chave not in presentes]
+    for chave in faltando:
+        tipo, conteudo, pergunta = itens[chave]
+        if tipo == 'ddl':
+            vn.add_ddl(conteudo)
+        elif tipo == 'documentation':
+            vn.add_documentation(conteudo)
+        else:
+            vn.add_question_sql(question=pergunta, sql=conteudo)
+
+    logger.info("Treino sincronizado em %.2fs: +%d -%d (%d inalterados)",
+                time.perf_counter() - inicio, len(faltando), len(remover), len(presentes))
+    return len(faltando), len(remover)
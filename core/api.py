@@ -0,0 +1,149 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Prefetch
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .forms import BuscaForm
+from .models import Imovel, ImovelImage
+from .variantes import VARIANTES
+from .views import ORDENACOES, keyset_page
+
+# Campos expostos na API; ?campos=titulo,preco_aluguel,imagens escolhe um subconjunto
+CAMPOS = (
+    'id', 'titulo', 'descricao', 'especificacao', 'quartos', 'banheiros', 'garagem',
+    'area', 'cidade', 'bairro', 'codigo_bairro', 'rua', 'numero', 'preco_aluguel',
+    'preco_iptu', 'preco_condominio', 'custo_total', 'aceita_pets', 'updated_at',
+    'imagens',
+)
+# A listagem omite a descrição por padrão (é o campo mais pesado)
+CAMPOS_LISTA = tuple(campo for campo in CAMPOS if campo != 'descricao')
+
+# Exclusões não deixam rastro em updated_at; guardamos o horário da última
+EXCLUSAO_KEY = 'api:imoveis:exclusao'
+
+
+def marcar_exclusao():
+    cache.set(EXCLUSAO_KEY, timezone.now(), None)
+
+
+def _projecao(request, padrao):
+    pedido = request.GET.get('campos')
+    if not pedido:
+        return padrao
+    nomes = [nome.strip() for nome in pedido.split(',') if nome.strip()]
+    if any(nome not in CAMPOS for nome in nomes):
+        return None
+    # Sempre na ordem de CAMPOS, para que ?campos=a,b e ?campos=b,a tenham o mesmo ETag
+    return tuple(campo for campo in CAMPOS if campo in nomes)
+
+
+def _etag(*partes):
+    digest = hashlib.sha256('|'.join(str(parte) for parte in partes).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _condicional(request, etag, ultima_alteracao, gerar):
+    """Responde 304/412 só com os validadores; o JSON é montado apenas se necessário."""
+    timestamp = int(ultima_alteracao.timestamp()) if ultima_alteracao else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = JsonResponse(gerar())
+    response.headers['ETag'] = etag
+    if timestamp is not None:
+        response.headers['Last-Modified'] = http_date(timestamp)
+    # O cliente pode guardar a resposta, mas revalida sempre (barato: 304 sem corpo)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _erro_campos():
+    return JsonResponse({'erro': f'Campos válidos: {", ".join(CAMPOS)}'}, status=400)
+
+
+def _imagem(request, imagem):
+    dados = {'id': imagem.pk, 'url': request.build_absolute_uri(imagem.image.url)}
+    if imagem.variantes_prontas:
+        dados['variantes'] = {
+            nome: {
+                'largura': imagem.variantes[nome]['largura'],
+                'webp': request.build_absolute_uri(imagem.image.storage.url(imagem.variantes[nome]['webp'])),
+                'jpeg': request.build_absolute_uri(imagem.image.storage.url(imagem.variantes[nome]['jpeg'])),
+            }
+            for nome in VARIANTES
+        }
+    return dados
+
+
+def _serializar(request, imovel, campos):
+    dados = {campo: getattr(imovel, campo) for campo in campos if campo != 'imagens'}
+    if 'imagens' in campos:
+        dados['imagens'] = [_imagem(request, imagem) for imagem in imovel.imagens_api]
+    return dados
+
+
+def _carregar(queryset, campos, ordem=()):
+    """Lê do banco só as colunas projetadas (+ as do cursor) e as imagens se pedidas."""
+    colunas = {campo for campo in campos if campo != 'imagens'}
+    colunas.update(campo.lstrip('-') for campo in ordem)
+    queryset = queryset.only(*colunas)
+    if 'imagens' in campos:
+        imagens = ImovelImage.objects.only('imovel_id', 'image', 'variantes').order_by('id')
+        queryset = queryset.prefetch_related(Prefetch('images', queryset=imagens, to_attr='imagens_api'))
+    return queryset
+
+
+@require_safe
+def imoveis_lista(request):
+    campos = _projecao(request, CAMPOS_LISTA)
+    if campos is None:
+        return _erro_campos()
+    form = BuscaForm(request.GET)
+    form.is_valid()
+    ordem = request.GET.get('ordem', 'id')
+    if ordem not in ORDENACOES:
+        ordem = 'id'
+    cursor = request.GET.get('apos')
+    filtrados = Imovel.objects.filter(**form.filtros())
+
+    # Uma consulta agregada decide o 304; o total muda quando algo sai do filtro
+    resumo = filtrados.aggregate(ultimo=Max('updated_at'), total=Count('id'))
+    exclusao = cache.get(EXCLUSAO_KEY)
+    ultima_alteracao = max(filter(None, (resumo['ultimo'], exclusao)), default=None)
+    parametros = sorted((chave, valor) for chave, valor in request.GET.lists() if chave != 'campos')
+    etag = _etag('lista', resumo['total'], resumo['ultimo'], exclusao, campos, ordem, parametros)
+
+    def gerar():
+        imoveis, proximo = keyset_page(_carregar(filtrados, campos, ORDENACOES[ordem]), ordem, cursor)
+        proxima_url = None
+        if proximo:
+            query = request.GET.copy()
+            query['apos'] = proximo
+            proxima_url = request.build_absolute_uri('?' + query.urlencode())
+        return {
+            'total': resumo['total'],
+            'proximo': proxima_url,
+            'resultados': [_serializar(request, imovel, campos) for imovel in imoveis],
+        }
+
+    return _condicional(request, etag, ultima_alteracao, gerar)
+
+
+@require_safe
+def imovel_item(request, pk):
+    campos = _projecao(request, CAMPOS)
+    if campos is None:
+        return _erro_campos()
+    ultima_alteracao = Imovel.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if ultima_alteracao is None:
+        return JsonResponse({'erro': 'Imóvel não encontrado'}, status=404)
+    etag = _etag('imovel', pk, ultima_alteracao, campos)
+
+    def gerar():
+        return _serializar(request, _carregar(Imovel.objects.filter(pk=pk), campos).get(), campos)
+
+    return _condicional(request, etag, ultima_alteracao, gerar)
@@ -0,0 +1,36 @@
+from django import forms
+
+from .fts import fts_ids, fts_query
+from .models import Imovel
+
+
+class BuscaForm(forms.Form):
+    q = forms.CharField(required=False, max_length=200)
+    bairro = forms.CharField(required=False)
+    tipo = forms.ChoiceField(required=False, choices=[('', 'Todos')] + Imovel.TIPO_IMOVEL_CHOICES)
+    quartos = forms.IntegerField(required=False, min_value=0)
+    pets = forms.BooleanField(required=False)
+    custo_min = forms.DecimalField(required=False, min_value=0, max_digits=12, decimal_places=2)
+    custo_max = forms.DecimalField(required=False, min_value=0, max_digits=12, decimal_places=2)
+
+    # Filtro de cada campo; as facetas ignoram o próprio filtro para mostrar as alternativas
+    LOOKUPS = {
+        'bairro': 'bairro',
+        'tipo': 'especificacao',
+        'quartos': 'quartos__gte',
+        'pets': 'aceita_pets',
+        'custo_min': 'custo_total__gte',
+        'custo_max': 'custo_total__lte',
+    }
+
+    def filtros(self, exceto=None):
+        filtros = {}
+        for campo, lookup in self.LOOKUPS.items():
+            valor = self.cleaned_data.get(campo)
+            if campo == exceto or valor in (None, '', False):
+                continue
+            filtros[lookup] = valor
+        # Texto livre vai para o índice FTS5 (sem acento, por prefixo)
+        if exceto != 'q' and fts_query(self.cleaned_data.get('q')):
+            filtros['id__in'] = fts_ids(self.cleaned_data['q'])
+        return filtros
@@ -0,0 +1,22 @@
+import re
+
+from django.db.models.expressions import RawSQL
+
+# Tabela virtual FTS5 criada na migração 0008 (titulo, descricao, bairro, rua).
+# Os triggers que a mantêm em dia somem quando o SQLite recria core_imovel
+# (AddField com UNIQUE/default): toda migração que faz isso precisa recriá-los,
+# com uma cópia própria do SQL (ver 0010 e 0011).
+FTS_TABLE = 'core_imovel_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_query(texto):
+    """Converte texto livre em uma consulta FTS5 segura: cada palavra vira um prefixo entre aspas."""
+    tokens = _TOKEN_RE.findall(texto or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def fts_ids(texto):
+    """Subconsulta com os ids dos imóveis que casam com o texto, para usar em id__in."""
+    return RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [fts_query(texto)])
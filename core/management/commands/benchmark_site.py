@@ -0,0 +1,171 @@
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from core import sinteticos
+from core.models import Imovel
+
+# Nome do cenário -> função que recebe o id de um imóvel e devolve a URL
+CENARIOS = {
+    'index': lambda pk: '/',
+    'index_preco': lambda pk: '/?ordem=preco',
+    'detalhe': lambda pk: f'/imovel/{pk}/',
+    'busca_filtros': lambda pk: '/busca/?bairro=Centro&tipo=apartamento&custo_max=2000',
+    'busca_texto': lambda pk: '/busca/?q=sao+mateus',
+    'admin_changelist': lambda pk: '/admin/core/imovel/',
+    'admin_busca': lambda pk: '/admin/core/imovel/?q=benfica',
+}
+
+# Acima desta piora (em %) na mediana o --comparar marca regressão
+LIMITE_REGRESSAO = 20
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the site views (index, detail, search, admin changelist) at several '
+        'table sizes and writes latency and query counts to a JSON file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 100000, 1000000],
+                            help='Synthetic table sizes to measure (default: 1000 100000 1000000)')
+        parser.add_argument('--repeticoes', type=int, default=20, help='Requests per scenario')
+        parser.add_argument('--cenarios', nargs='+', choices=list(CENARIOS), default=list(CENARIOS))
+        parser.add_argument('--saida', help='Output JSON file (default: benchmarks/<commit>.json)')
+        parser.add_argument('--comparar', help='Previous JSON result to compare against')
+        parser.add_argument('--manter', action='store_true', help='Keep the synthetic listings afterwards')
+
+    def handle(self, *args, **options):
+        if Imovel.objects.exclude(codigo_externo__startswith=sinteticos.PREFIXO).count() > 1000:
+            raise CommandError('This database has real listings; run the benchmark against a scratch database')
+
+        # Nome descartável; no fim só apaga a conta se foi este comando que a criou
+        usuario, criado = get_user_model().objects.get_or_create(
+            username='benchmark-site-temporario', defaults={'is_staff': True, 'is_superuser': True},
+        )
+        cliente = Client(HTTP_HOST='localhost')
+        cliente.force_login(usuario)
+
+        resultados = []
+        try:
+            for tamanho in sorted(options['tamanhos']):
+                self.preparar_tamanho(tamanho)
+                amostra = list(Imovel.objects.order_by('?').values_list('id', flat=True)[:options['repeticoes']])
+                for nome in options['cenarios']:
+                    for modo in ('frio', 'quente'):
+                        resultado = self.medir(cliente, nome, modo, amostra, options['repeticoes'])
+                        resultado['linhas'] = tamanho
+                        resultados.append(resultado)
+                        self.stdout.write(
+                            f"{tamanho:>8} {nome:<17} {modo:<6} p50={resultado['p50_ms']:8.1f}ms "
+                            f"p95={resultado['p95_ms']:8.1f}ms queries={resultado['queries']:>3} "
+                            f"sql={resultado['sql_ms']:8.1f}ms"
+                        )
+        finally:
+            if criado:
+                usuario.delete()
+            if not options['manter']:
+                sinteticos.limpar()
+
+        commit = _commit_atual()
+        saida = Path(options['saida'] or settings.BASE_DIR / 'benchmarks' / f'{commit}.json')
+        saida.parent.mkdir(parents=True, exist_ok=True)
+        saida.write_text(json.dumps({
+            'commit': commit,
+            'data': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'repeticoes': options['repeticoes'],
+            'resultados': resultados,
+        }, indent=2, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(f'Results written to {saida}'))
+
+        if options['comparar']:
+            self.comparar(json.loads(Path(options['comparar']).read_text()), resultados)
+
+    def preparar_tamanho(self, tamanho):
+        atual = sinteticos.contar()
+        if atual > tamanho:
+            sinteticos.limpar()
+            atual = 0
+        if atual < tamanho:
+            self.stdout.write(f'Generating {tamanho - atual} synthetic listings...')
+            sinteticos.gerar(tamanho - atual)
+        connection.cursor().execute('ANALYZE')
+
+    def medir(self, cliente, nome, modo, amostra, repeticoes):
+        """Mede um cenário. 'frio' limpa o cache antes de cada requisição; 'quente' não."""
+        latencias, queries, sql_ms = [], [], []
+        urls = [CENARIOS[nome](amostra[i % len(amostra)]) for i in range(repeticoes)]
+        # Aquece o processo (imports, templates) e, no modo quente, o cache de cada URL
+        for url in (urls if modo == 'quente' else urls[:1]):
+            cliente.get(url)
+        for url in urls:
+            if modo == 'frio':
+                cache.clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                resposta = cliente.get(url)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            if resposta.status_code != 200:
+                raise CommandError(f'{url} returned {resposta.status_code}')
+            queries.append(len(capturadas.captured_queries))
+            sql_ms.append(sum(float(q['time']) for q in capturadas.captured_queries) * 1000)
+        return {
+            'cenario': nome,
+            'cache': modo,
+            'p50_ms': round(statistics.median(latencias), 2),
+            'p95_ms': round(_percentil(latencias, 95), 2),
+            'media_ms': round(statistics.fmean(latencias), 2),
+            'queries': max(queries),
+            'sql_ms': round(statistics.median(sql_ms), 2),
+        }
+
+    def comparar(self, anterior, resultados):
+        chave = lambda r: (r['linhas'], r['cenario'], r['cache'])  # noqa: E731
+        base = {chave(r): r for r in anterior['resultados']}
+        self.stdout.write(f"\nComparison with {anterior['commit']}:")
+        for resultado in resultados:
+            antigo = base.get(chave(resultado))
+            if not antigo or not antigo['p50_ms']:
+                continue
+            delta = (resultado['p50_ms'] - antigo['p50_ms']) / antigo['p50_ms'] * 100
+            linha = (
+                f"{resultado['linhas']:>8} {resultado['cenario']:<17} {resultado['cache']:<6} "
+                f"p50 {antigo['p50_ms']:.1f} -> {resultado['p50_ms']:.1f}ms ({delta:+.0f}%) "
+                f"queries {antigo['queries']} -> {resultado['queries']}"
+            )
+            if delta > LIMITE_REGRESSAO or resultado['queries'] > antigo['queries']:
+                self.stdout.write(self.style.ERROR(linha + '  REGRESSION'))
+            else:
+                self.stdout.write(linha)
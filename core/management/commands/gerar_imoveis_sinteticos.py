@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import sinteticos
+from core.page_cache import AVISO_CACHE_LOCAL, cache_local
+
+
+class Command(BaseCommand):
+    help = 'Generates N realistic synthetic Juiz de Fora listings (with 0-10 images each) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quantidade', type=int, help='Number of listings to add')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible data sets')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--limpar', action='store_true', help='Delete previously generated listings first')
+
+    def handle(self, *args, **options):
+        if cache_local():
+            self.stderr.write(self.style.WARNING(AVISO_CACHE_LOCAL))
+        if options['limpar']:
+            self.stdout.write(f'Deleted {sinteticos.limpar()} synthetic rows')
+
+        inicio = time.monotonic()
+
+        def progresso(criados):
+            self.stdout.write(f'{criados} listings ({criados / (time.monotonic() - inicio):.0f} rows/s)')
+
+        criados = sinteticos.gerar(options['quantidade'], options['seed'], options['batch_size'], progresso)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {criados} synthetic listings in {time.monotonic() - inicio:.1f}s '
+            f'({sinteticos.contar()} synthetic listings in the database)'
+        ))
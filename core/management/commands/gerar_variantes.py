@@ -0,0 +1,53 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Imovel, ImovelImage
+from core.page_cache import AVISO_CACHE_LOCAL, bump_imoveis, cache_local
+from core.variantes import gerar_variantes
+
+
+class Command(BaseCommand):
+    help = 'Generates card/gallery/full WebP and JPEG variants for existing ImovelImage files in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+        parser.add_argument('--todas', action='store_true', help='Regenerate variants even for images that already have them')
+
+    def handle(self, *args, **options):
+        imagens = ImovelImage.objects.only('id', 'imovel_id', 'image', 'variantes').order_by('id')
+        pendentes = [img for img in imagens.iterator() if options['todas'] or not img.variantes_prontas]
+        if not pendentes:
+            self.stdout.write('No images need variants.')
+            return
+
+        if cache_local():
+            self.stderr.write(self.style.WARNING(AVISO_CACHE_LOCAL))
+        self.stdout.write(f'Generating variants for {len(pendentes)} images...')
+        media_root = str(settings.MEDIA_ROOT)
+        imoveis = set()
+        falhas = 0
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futuros = {pool.submit(gerar_variantes, media_root, img.image.name): img for img in pendentes}
+            for futuro in as_completed(futuros):
+                img = futuros[futuro]
+                try:
+                    variantes = futuro.result()
+                except Exception as e:
+                    falhas += 1
+                    self.stderr.write(f'  {img.image.name}: {e}')
+                    continue
+                ImovelImage.objects.filter(pk=img.pk).update(variantes=variantes)
+                imoveis.add(img.imovel_id)
+
+        # update() não dispara signals nem auto_now: avança o ETag/Last-Modified da API aqui
+        agora = timezone.now()
+        imoveis = sorted(imoveis)
+        for i in range(0, len(imoveis), 500):
+            Imovel.objects.filter(pk__in=imoveis[i:i + 500]).update(updated_at=agora)
+        bump_imoveis(imoveis)
+
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {len(pendentes) - falhas} images ({falhas} failed)'))
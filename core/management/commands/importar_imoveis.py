@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Imovel
+from core.page_cache import AVISO_CACHE_LOCAL, bump_imoveis, cache_local
+
+# Campos aceitos no arquivo de entrada (além de codigo_externo, que é obrigatório)
+CAMPOS = [
+    'titulo', 'descricao', 'quartos', 'banheiros', 'garagem', 'area', 'cidade',
+    'bairro', 'rua', 'numero', 'preco_aluguel', 'preco_iptu', 'preco_condominio',
+    'aceita_pets', 'imagem', 'codigo_bairro', 'especificacao',
+]
+
+VERDADEIROS = {'1', 'true', 'sim', 's', 'yes', 'y'}
+FALSOS = {'0', 'false', 'nao', 'não', 'n', 'no', ''}
+
+MAX_ERROS_EXIBIDOS = 20
+
+
+def ler_csv(arquivo):
+    for numero, linha in enumerate(csv.DictReader(arquivo), start=2):
+        yield numero, linha
+
+
+def ler_jsonl(arquivo):
+    for numero, linha in enumerate(arquivo, start=1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            yield numero, json.loads(linha)
+        except json.JSONDecodeError as e:
+            yield numero, ValidationError(f'JSON inválido: {e}')
+
+
+def validar(registro):
+    """Converte e valida uma linha com as regras dos próprios campos do model."""
+    codigo = str(registro.get('codigo_externo') or '').strip()
+    if not codigo:
+        raise ValidationError('codigo_externo é obrigatório')
+
+    dados = {}
+    erros = {}
+    for nome in CAMPOS:
+        campo = Imovel._meta.get_field(nome)
+        valor = registro.get(nome)
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if nome == 'aceita_pets' and isinstance(valor, str):
+            if valor.lower() not in VERDADEIROS | FALSOS:
+                erros[nome] = [f'valor inválido: {valor!r}']
+                continue
+            valor = valor.lower() in VERDADEIROS
+        if valor == '' and campo.null:
+            valor = None
+        try:
+            dados[nome] = campo.clean(valor, None)
+        except ValidationError as e:
+            erros[nome] = e.messages
+    if erros:
+        raise ValidationError(erros)
+    return codigo, dados
+
+
+class Command(BaseCommand):
+    help = 'Streams listings from a CSV or JSONL feed and upserts them by codigo_externo in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Path to the feed, or - for stdin')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per transaction (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the feed without writing to the database')
+
+    def handle(self, *args, **options):
+        caminho = options['arquivo']
+        formato = options['formato'] or ('jsonl' if caminho.endswith(('.jsonl', '.ndjson')) else 'csv')
+        tamanho = options['batch_size']
+        if tamanho < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if cache_local() and not options['dry_run']:
+            self.stderr.write(self.style.WARNING(AVISO_CACHE_LOCAL))
+
+        if caminho == '-':
+            arquivo = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+        else:
+            try:
+                arquivo = open(caminho, encoding='utf-8-sig', newline='')
+            except OSError as e:
+                raise CommandError(f'Cannot open {caminho}: {e}')
+
+        leitor = ler_jsonl(arquivo) if formato == 'jsonl' else ler_csv(arquivo)
+        self.totais = {'lidas': 0, 'criadas': 0, 'atualizadas': 0, 'invalidas': 0}
+        inicio = time.monotonic()
+
+        with arquivo:
+            while True:
+                lote = list(islice(leitor, tamanho))
+                if not lote:
+                    break
+                self.processar_lote(lote, options['dry_run'])
+                decorrido = time.monotonic() - inicio
+                self.stdout.write(
+                    f"{self.totais['lidas']} rows ({self.totais['lidas'] / decorrido:.0f} rows/s)"
+                )
+
+        decorrido = time.monotonic() - inicio
+        taxa = self.totais['lidas'] / decorrido if decorrido else 0
+        resumo = (
+            f"{self.totais['lidas']} rows in {decorrido:.1f}s ({taxa:.0f} rows/s): "
+            f"{self.totais['criadas']} created, {self.totais['atualizadas']} updated, "
+            f"{self.totais['invalidas']} invalid"
+        )
+        if options['dry_run']:
+            resumo += ' (dry run, nothing written)'
+        self.stdout.write(self.style.SUCCESS(resumo))
+
+    def formatar_erro(self, erro):
+        if hasattr(erro, 'error_dict'):
+            return '; '.join(f'{campo}: {" ".join(msgs)}' for campo, msgs in erro.message_dict.items())
+        return '; '.join(erro.messages)
+
+    def processar_lote(self, lote, dry_run):
+        validos = {}
+        for numero, registro in lote:
+            self.totais['lidas'] += 1
+            try:
+                if isinstance(registro, ValidationError):
+                    raise registro
+                codigo, dados = validar(registro)
+            except ValidationError as e:
+                self.totais['invalidas'] += 1
+                if self.totais['invalidas'] <= MAX_ERROS_EXIBIDOS:
+                    self.stderr.write(f'  line {numero}: {self.formatar_erro(e)}')
+                continue
+            # Código repetido dentro do lote: a última linha vence
+            validos[codigo] = dados
+
+        existentes = dict(
+            Imovel.objects.filter(codigo_externo__in=list(validos)).values_list('codigo_externo', 'id')
+        )
+        self.totais['criadas'] += len(validos) - len(existentes)
+        self.totais['atualizadas'] += len(existentes)
+        if dry_run:
+            return
+
+        # Um único INSERT ... ON CONFLICT(codigo_externo) DO UPDATE por lote
+        imoveis = [Imovel(codigo_externo=codigo, **dados) for codigo, dados in validos.items()]
+        with transaction.atomic():
+            Imovel.objects.bulk_create(
+                imoveis,
+                update_conflicts=True,
+                unique_fields=['codigo_externo'],
+                update_fields=CAMPOS + ['updated_at'],
+            )
+        # Escritas em lote não disparam signals: invalida o cache das páginas aqui
+        bump_imoveis(existentes.values())
@@ -0,0 +1,104 @@
+import bisect
+import threading
+from collections import defaultdict
+
+from django.http import HttpResponse
+
+# Limites dos histogramas (segundos e número de queries), no estilo do cliente Prometheus
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_QUERIES = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histograma:
+    def __init__(self, nome, ajuda, buckets):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.buckets = buckets
+        # labels -> [contagem por bucket..., soma, total]
+        self.series = defaultdict(lambda: [0] * len(buckets) + [0, 0])
+
+    def observar(self, labels, valor):
+        serie = self.series[labels]
+        indice = bisect.bisect_left(self.buckets, valor)
+        if indice < len(self.buckets):
+            # Acima do último limite entra só no +Inf (que é o total)
+            serie[indice] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} histogram']
+        for labels, serie in sorted(self.series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, serie):
+                acumulado += contagem
+                linhas.append(f'{self.nome}_bucket{_labels(labels, le=_numero(limite))} {acumulado}')
+            linhas.append(f'{self.nome}_bucket{_labels(labels, le="+Inf")} {serie[-1]}')
+            linhas.append(f'{self.nome}_sum{_labels(labels)} {_numero(serie[-2])}')
+            linhas.append(f'{self.nome}_count{_labels(labels)} {serie[-1]}')
+        return linhas
+
+
+class Contador:
+    def __init__(self, nome, ajuda):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.series = defaultdict(int)
+
+    def incrementar(self, labels, valor=1):
+        self.series[labels] += valor
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} counter']
+        for labels, valor in sorted(self.series.items()):
+            linhas.append(f'{self.nome}{_labels(labels)} {valor}')
+        return linhas
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extras):
+    pares = list(labels) + list(extras.items())
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+# Registro em memória, por processo: com vários workers cada um expõe o seu
+# (o Prometheus soma as séries de todas as instâncias raspadas).
+_lock = threading.Lock()
+
+requisicoes = Contador('django_http_requests_total', 'Requisições amostradas por view, método e status.')
+latencia = Histograma('django_http_request_duration_seconds', 'Latência da requisição por view.', BUCKETS_SEGUNDOS)
+queries = Histograma('django_db_queries_per_request', 'Queries SQL por requisição.', BUCKETS_QUERIES)
+tempo_sql = Histograma('django_db_query_duration_seconds', 'Tempo total em SQL por requisição.', BUCKETS_SEGUNDOS)
+n_mais_um = Contador('django_db_n_plus_one_total', 'Requisições em que a mesma query se repetiu acima do limite.')
+
+METRICAS = (requisicoes, latencia, queries, tempo_sql, n_mais_um)
+
+
+def registrar(view, metodo, status, duracao, total_queries, duracao_sql, suspeita_n_mais_um):
+    labels = (('view', view),)
+    with _lock:
+        requisicoes.incrementar(labels + (('method', metodo), ('status', str(status))))
+        latencia.observar(labels, duracao)
+        queries.observar(labels, total_queries)
+        tempo_sql.observar(labels, duracao_sql)
+        if suspeita_n_mais_um:
+            n_mais_um.incrementar(labels)
+
+
+def exportar():
+    with _lock:
+        linhas = [linha for metrica in METRICAS for linha in metrica.exportar()]
+    return '\n'.join(linhas) + '\n'
+
+
+def metrics(request):
+    return HttpResponse(exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,79 @@
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metricas
+
+logger = logging.getLogger(__name__)
+
+
+class ConsultasRequisicao:
+    """execute_wrapper que conta as queries da requisição e o tempo gasto nelas.
+
+    O SQL chega com placeholders (%s) separados dos parâmetros, então o próprio
+    texto já é o "formato" da query: a mesma query com ids diferentes repete a chave.
+    """
+
+    def __init__(self):
+        self.formatos = Counter()
+        self.duracao = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duracao += time.perf_counter() - inicio
+            self.formatos[sql] += 1
+
+    @property
+    def total(self):
+        return sum(self.formatos.values())
+
+
+class MetricasMiddleware:
+    """Latência, número de queries e tempo de SQL por view, expostos em /metrics/.
+
+    Só as requisições sorteadas por METRICS_SAMPLE_RATE são medidas; com a taxa em
+    0 o custo por requisição é uma comparação.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.taxa = settings.METRICS_SAMPLE_RATE
+        self.limite_n_mais_um = settings.METRICS_N_PLUS_ONE_THRESHOLD
+
+    def __call__(self, request):
+        if self.taxa <= 0 or (self.taxa < 1 and random.random() >= self.taxa):
+            return self.get_response(request)
+
+        consultas = ConsultasRequisicao()
+        inicio = time.perf_counter()
+        with ExitStack() as stack:
+            for conexao in connections.all():
+                stack.enter_context(conexao.execute_wrapper(consultas))
+            response = self.get_response(request)
+        duracao = time.perf_counter() - inicio
+
+        match = request.resolver_match
+        view = match.view_name if match else '<sem rota>'
+        if view == 'metrics':
+            return response
+
+        formato, repeticoes = (consultas.formatos.most_common(1) or [(None, 0)])[0]
+        suspeita = repeticoes >= self.limite_n_mais_um
+        if suspeita:
+            logger.warning(
+                'Possível N+1 em %s %s: query repetida %d vezes: %s',
+                request.method, view, repeticoes, formato[:300],
+            )
+        metricas.registrar(
+            view, request.method, response.status_code, duracao,
+            consultas.total, consultas.duracao, suspeita,
+        )
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-16 22:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_imovel_especificacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(fields=['preco_aluguel', 'id'], name='core_imovel_preco_id_idx'),
+        ),
+    ]
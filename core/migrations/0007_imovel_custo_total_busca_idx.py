@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-16 22:27
+
+import django.db.models.expressions
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_imovel_preco_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imovel',
+            name='custo_total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('preco_aluguel'), '+', models.F('preco_condominio')), '+', models.F('preco_iptu')), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(fields=['custo_total', 'id'], name='core_imovel_custo_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(fields=['bairro', 'especificacao', 'custo_total'], name='core_imovel_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(fields=['especificacao', 'quartos', 'custo_total'], name='core_imovel_tipo_quartos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='imovel',
+            index=models.Index(django.db.models.functions.text.Lower('bairro'), django.db.models.functions.text.Lower('especificacao'), models.F('custo_total'), name='core_imovel_lower_busca_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Índice FTS5 "sombra" de core_imovel. O tokenizer unicode61 com remove_diacritics
+# faz "sao mateus" casar com "São Mateus". Os triggers mantêm o índice em dia em
+# qualquer escrita na tabela (admin, seed, importações e SQL direto).
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE core_imovel_fts USING fts5(
+        titulo, descricao, bairro, rua,
+        content='core_imovel', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER core_imovel_fts_ai AFTER INSERT ON core_imovel BEGIN
+        INSERT INTO core_imovel_fts(rowid, titulo, descricao, bairro, rua)
+        VALUES (new.id, new.titulo, new.descricao, new.bairro, new.rua);
+    END
+    """,
+    """
+    CREATE TRIGGER core_imovel_fts_ad AFTER DELETE ON core_imovel BEGIN
+        INSERT INTO core_imovel_fts(core_imovel_fts, rowid, titulo, descricao, bairro, rua)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.bairro, old.rua);
+    END
+    """,
+    """
+    CREATE TRIGGER core_imovel_fts_au AFTER UPDATE OF titulo, descricao, bairro, rua ON core_imovel BEGIN
+        INSERT INTO core_imovel_fts(core_imovel_fts, rowid, titulo, descricao, bairro, rua)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.bairro, old.rua);
+        INSERT INTO core_imovel_fts(rowid, titulo, descricao, bairro, rua)
+        VALUES (new.id, new.titulo, new.descricao, new.bairro, new.rua);
+    END
+    """,
+    "INSERT INTO core_imovel_fts(core_imovel_fts) VALUES ('rebuild')",
+]
+
+DROP_FTS = [
+    "DROP TRIGGER IF EXISTS core_imovel_fts_au",
+    "DROP TRIGGER IF EXISTS core_imovel_fts_ad",
+    "DROP TRIGGER IF EXISTS core_imovel_fts_ai",
+    "DROP TABLE IF EXISTS core_imovel_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_imovel_custo_total_busca_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FTS, reverse_sql=DROP_FTS),
+    ]
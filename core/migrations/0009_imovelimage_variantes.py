@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-16 22:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_imovel_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imovelimage',
+            name='variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
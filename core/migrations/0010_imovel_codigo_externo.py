@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-16 22:37
+
+from django.db import migrations, models
+
+# Cópia congelada dos triggers do FTS (migração 0008): a migração não pode
+# depender de código do app, que muda depois.
+CREATE_TRIGGERS = [
+    """
+    CREATE TRIGGER core_imovel_fts_ai AFTER INSERT ON core_imovel BEGIN
+        INSERT INTO core_imovel_fts(rowid, titulo, descricao, bairro, rua)
+        VALUES (new.id, new.titulo, new.descricao, new.bairro, new.rua);
+    END
+    """,
+    """
+    CREATE TRIGGER core_imovel_fts_ad AFTER DELETE ON core_imovel BEGIN
+        INSERT INTO core_imovel_fts(core_imovel_fts, rowid, titulo, descricao, bairro, rua)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.bairro, old.rua);
+    END
+    """,
+    """
+    CREATE TRIGGER core_imovel_fts_au AFTER UPDATE OF titulo, descricao, bairro, rua ON core_imovel BEGIN
+        INSERT INTO core_imovel_fts(core_imovel_fts, rowid, titulo, descricao, bairro, rua)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.bairro, old.rua);
+        INSERT INTO core_imovel_fts(rowid, titulo, descricao, bairro, rua)
+        VALUES (new.id, new.titulo, new.descricao, new.bairro, new.rua);
+    END
+    """,
+]
+
+DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS core_imovel_fts_au",
+    "DROP TRIGGER IF EXISTS core_imovel_fts_ad",
+    "DROP TRIGGER IF EXISTS core_imovel_fts_ai",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_imovelimage_variantes'),
+    ]
+
+    # O campo UNIQUE faz o SQLite recriar core_imovel, o que apaga os triggers do FTS
+    operations = [
+        migrations.RunSQL(DROP_TRIGGERS, reverse_sql=CREATE_TRIGGERS),
+        migrations.AddField(
+            model_name='imovel',
+            name='codigo_externo',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, reverse_sql=DROP_TRIGGERS),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
 
 class Imovel(models.Model):
     titulo = models.CharField(max_length=200)
@@ -19,6 +21,8 @@ class Imovel(models.Model):
     
     # Novos campos solicitados
     codigo_bairro = models.CharField(max_length=100, blank=True, null=True, help_text="Ex: São Mateus 200")
+    # Código do imóvel no feed de estoque, usado como chave no importar_imoveis
+    codigo_externo = models.CharField(max_length=64, unique=True, blank=True, null=True)
     
     TIPO_IMOVEL_CHOICES = [
         ('casa', 'Casa'),
@@ -28,12 +32,72 @@ class Imovel(models.Model):
     ]
     especificacao = models.CharField(max_length=50, choices=TIPO_IMOVEL_CHOICES, blank=True, null=True)
 
+    # Aluguel + condomínio + IPTU, calculado e gravado pelo próprio SQLite
+    custo_total = models.GeneratedField(
+        expression=F('preco_aluguel') + F('preco_condominio') + F('preco_iptu'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
+
+    # Base do ETag/Last-Modified da API; alterações nas imagens também atualizam (signals)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Paginação por cursor (keyset) ordenada por preço
+            models.Index(fields=['preco_aluguel', 'id'], name='core_imovel_preco_id_idx'),
+            models.Index(fields=['custo_total', 'id'], name='core_imovel_custo_id_idx'),
+            # Filtros da busca do site (valores exatos vindos das facetas)
+            models.Index(fields=['bairro', 'especificacao', 'custo_total'], name='core_imovel_busca_idx'),
+            models.Index(fields=['especificacao', 'quartos', 'custo_total'], name='core_imovel_tipo_quartos_idx'),
+            # Filtros gerados pelo chatbot, que compara com LOWER(bairro)/LOWER(especificacao)
+            models.Index(Lower('bairro'), Lower('especificacao'), 'custo_total', name='core_imovel_lower_busca_idx'),
+        ]
+
     def __str__(self):
         return self.titulo
 
 class ImovelImage(models.Model):
     imovel = models.ForeignKey(Imovel, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='imoveis/')
+    # Variantes redimensionadas (card/galeria/full em WebP e JPEG), preenchidas em segundo plano
+    variantes = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"Image for {self.imovel.titulo}"
+
+    @property
+    def variantes_prontas(self):
+        return self.variantes.get('origem') == self.image.name
+
+    def _srcset(self, formato):
+        larguras = {}
+        for nome in ('card', 'galeria', 'full'):
+            variante = self.variantes[nome]
+            larguras.setdefault(variante['largura'], self.image.storage.url(variante[formato]))
+        return ', '.join(f'{url} {largura}w' for largura, url in larguras.items())
+
+    @property
+    def srcset_webp(self):
+        return self._srcset('webp')
+
+    @property
+    def srcset_jpeg(self):
+        return self._srcset('jpeg')
+
+    def variant_url(self, nome):
+        if not self.variantes_prontas:
+            return self.image.url
+        return self.image.storage.url(self.variantes[nome]['jpeg'])
+
+    @property
+    def card_url(self):
+        return self.variant_url('card')
+
+    @property
+    def galeria_url(self):
+        return self.variant_url('galeria')
+
+    @property
+    def full_url(self):
+        return self.variant_url('full')
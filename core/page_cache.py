@@ -0,0 +1,83 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+# Versão global da listagem: muda a cada escrita em qualquer Imovel/ImovelImage
+LISTAGEM_VERSAO_KEY = 'imoveis:versao'
+
+
+def _imovel_versao_key(pk):
+    return f'imovel:{pk}:versao'
+
+
+def _nova_versao():
+    # Token aleatório em vez de contador: se a chave for despejada do cache,
+    # a nova versão nunca colide com páginas antigas ainda guardadas.
+    return uuid.uuid4().hex[:12]
+
+
+def _versoes(chaves):
+    versoes = cache.get_many(chaves)
+    faltando = {chave: _nova_versao() for chave in chaves if chave not in versoes}
+    for chave, versao in faltando.items():
+        if not cache.add(chave, versao, None):
+            versao = cache.get(chave) or versao
+        versoes[chave] = versao
+    return versoes
+
+
+def listing_version():
+    return _versoes([LISTAGEM_VERSAO_KEY])[LISTAGEM_VERSAO_KEY]
+
+
+def annotate_versions(imoveis):
+    """Preenche imovel.cache_versao (usada no cache de fragmento dos cards) com uma ida ao cache."""
+    chaves = {imovel.pk: _imovel_versao_key(imovel.pk) for imovel in imoveis}
+    versoes = _versoes(list(chaves.values()))
+    for imovel in imoveis:
+        imovel.cache_versao = versoes[chaves[imovel.pk]]
+    return imoveis
+
+
+def bump_imovel(pk):
+    bump_imoveis([pk])
+
+
+def bump_imoveis(pks):
+    """Invalida vários imóveis de uma vez (para escritas em lote, que não disparam signals)."""
+    nova = _nova_versao()
+    versoes = {_imovel_versao_key(pk): nova for pk in pks}
+    versoes[LISTAGEM_VERSAO_KEY] = nova
+    cache.set_many(versoes, None)
+
+
+def cache_local():
+    """True se o cache é a memória do próprio processo (locmem): o que um comando de
+    terminal invalida ali não chega aos processos do servidor web."""
+    return isinstance(caches['default'], LocMemCache)
+
+
+AVISO_CACHE_LOCAL = (
+    "The page cache is per-process (LISTING_CACHE_BACKEND = 'locmem'): running web "
+    "servers will not see this invalidation and keep serving cached pages until they "
+    "restart. Use the 'file' backend when writing from the command line."
+)
+
+
+def page_key(nome, versao, params=None):
+    params = sorted((params or {}).items())
+    digest = hashlib.md5(repr(params).encode(), usedforsecurity=False).hexdigest()
+    return f'pagina:{nome}:{versao}:{digest}'
+
+
+def cached_html(chave, renderizar):
+    """Devolve o HTML guardado em `chave` ou chama renderizar() e guarda o resultado."""
+    html = cache.get(chave)
+    if html is None:
+        html = renderizar()
+        cache.set(chave, html, settings.LISTING_CACHE_TIMEOUT)
+    return HttpResponse(html)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .api import marcar_exclusao
+from .models import Imovel, ImovelImage
+from .page_cache import bump_imovel
+from .variantes import agendar_variantes, remover_variantes
+
+
+@receiver([post_save, post_delete], sender=Imovel)
+def invalidar_imovel(sender, instance, **kwargs):
+    bump_imovel(instance.pk)
+
+
+@receiver(post_delete, sender=Imovel)
+def registrar_exclusao(sender, instance, **kwargs):
+    marcar_exclusao()
+
+
+@receiver([post_save, post_delete], sender=ImovelImage)
+def invalidar_imagem(sender, instance, **kwargs):
+    # As imagens fazem parte do JSON do imóvel: avança o updated_at (ETag da API)
+    Imovel.objects.filter(pk=instance.imovel_id).update(updated_at=timezone.now())
+    bump_imovel(instance.imovel_id)
+
+
+@receiver(post_save, sender=ImovelImage)
+def gerar_variantes_imagem(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image or instance.variantes_prontas:
+        return
+    transaction.on_commit(lambda: agendar_variantes(instance))
+
+
+@receiver(post_delete, sender=ImovelImage)
+def apagar_variantes_imagem(sender, instance, **kwargs):
+    if instance.variantes:
+        remover_variantes(str(settings.MEDIA_ROOT), instance.variantes)
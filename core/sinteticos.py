@@ -0,0 +1,172 @@
+import io
+import json
+import os
+import random
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from .api import marcar_exclusao
+from .models import Imovel, ImovelImage
+from .page_cache import bump_imoveis
+from .variantes import remover_variantes
+
+# Prefixo de codigo_externo que identifica os imóveis gerados (para limpar depois)
+PREFIXO = 'SINT-'
+
+# Bairro -> multiplicador do preço em relação à média da cidade
+BAIRROS = {
+    'Centro': 1.0,
+    'São Mateus': 1.15,
+    'Alto dos Passos': 1.3,
+    'Bom Pastor': 1.25,
+    'Cascatinha': 1.4,
+    'Granbery': 1.2,
+    'Santa Helena': 1.1,
+    'Jardim Glória': 1.05,
+    'Morro da Glória': 1.0,
+    'Paineiras': 1.1,
+    'São Pedro': 0.95,
+    'Cruzeiro do Sul': 0.85,
+    'Benfica': 0.7,
+    'Manoel Honório': 0.8,
+    'Mariano Procópio': 0.85,
+    'Santa Luzia': 0.75,
+    'Vitorino Braga': 0.8,
+    'Grama': 0.7,
+    'Bairu': 0.75,
+    'Costa Carvalho': 0.9,
+}
+
+RUAS = [
+    'Av. Rio Branco', 'Rua Halfeld', 'Rua Santo Antônio', 'Rua Batista de Oliveira',
+    'Rua São Mateus', 'Rua Padre Café', 'Av. Presidente Itamar Franco', 'Rua Dr. Romualdo',
+    'Rua Morais e Castro', 'Av. Independência', 'Rua Espírito Santo', 'Rua Marechal Deodoro',
+    'Rua Santa Rita', 'Rua Chanceler Oswaldo Aranha', 'Av. Getúlio Vargas', 'Rua Mister Moore',
+    'Rua Dom Viçoso', 'Rua Tiradentes', 'Rua Oscar Vidal', 'Rua Severino Meireles',
+]
+
+# Tipo -> (peso no sorteio, aluguel base, faixa de quartos)
+TIPOS = {
+    'apartamento': (50, 1500, (1, 4)),
+    'casa': (25, 2200, (2, 5)),
+    'kitnet': (15, 800, (1, 1)),
+    'comercio': (10, 3000, (0, 0)),
+}
+
+ADJETIVOS = ['Amplo', 'Reformado', 'Aconchegante', 'Moderno', 'Iluminado', 'Novo', 'Charmoso', 'Espaçoso']
+DESTAQUES = [
+    'próximo ao comércio', 'com varanda gourmet', 'sol da manhã', 'perto da UFJF',
+    'com vista livre', 'rua tranquila', 'próximo ao Independência Shopping', 'com área de serviço',
+]
+
+FOTOS = 8
+
+
+def _dinheiro(valor):
+    return Decimal(round(valor / 10) * 10).quantize(Decimal('0.01'))
+
+
+def _fotos_placeholder():
+    """Cria (uma vez) algumas fotos pequenas que as imagens sintéticas reaproveitam."""
+    from PIL import Image
+
+    nomes = []
+    pasta = os.path.join(settings.MEDIA_ROOT, 'imoveis', 'sinteticos')
+    os.makedirs(pasta, exist_ok=True)
+    for i in range(FOTOS):
+        nome = f'imoveis/sinteticos/foto_{i}.jpg'
+        caminho = os.path.join(settings.MEDIA_ROOT, nome)
+        if not os.path.exists(caminho):
+            buffer = io.BytesIO()
+            Image.new('RGB', (1200, 800), (40 + i * 25, 90, 160 - i * 10)).save(buffer, 'JPEG', quality=70)
+            with open(caminho, 'wb') as arquivo:
+                arquivo.write(buffer.getvalue())
+        nomes.append(nome)
+    return nomes
+
+
+def imovel_aleatorio(rng, numero):
+    tipos = list(TIPOS)
+    tipo = rng.choices(tipos, weights=[TIPOS[t][0] for t in tipos])[0]
+    _, base, (min_q, max_q) = TIPOS[tipo]
+    bairro = rng.choice(list(BAIRROS))
+    quartos = rng.randint(min_q, max_q)
+
+    aluguel = base * BAIRROS[bairro] * rng.lognormvariate(0, 0.3) * (1 + 0.15 * max(quartos - 2, 0))
+    condominio = aluguel * rng.uniform(0.1, 0.3) if tipo in ('apartamento', 'kitnet') else 0
+    iptu = aluguel * rng.uniform(0.04, 0.12)
+    area = (25 if tipo == 'kitnet' else 45) + quartos * rng.uniform(15, 30)
+
+    return Imovel(
+        titulo=f'{rng.choice(ADJETIVOS)} {dict(Imovel.TIPO_IMOVEL_CHOICES)[tipo]} em {bairro}',
+        descricao=f'{dict(Imovel.TIPO_IMOVEL_CHOICES)[tipo]} {rng.choice(DESTAQUES)}, {rng.choice(DESTAQUES)}.',
+        quartos=quartos,
+        banheiros=max(1, quartos - rng.randint(0, 1)),
+        garagem=rng.randint(0, 2),
+        area=Decimal(f'{area:.2f}'),
+        cidade='Juiz de Fora',
+        bairro=bairro,
+        rua=rng.choice(RUAS),
+        numero=str(rng.randint(1, 3000)),
+        preco_aluguel=_dinheiro(aluguel),
+        preco_iptu=_dinheiro(iptu),
+        preco_condominio=_dinheiro(condominio),
+        aceita_pets=rng.random() < 0.45,
+        especificacao=tipo,
+        codigo_externo=f'{PREFIXO}{numero}',
+    )
+
+
+def contar():
+    return Imovel.objects.filter(codigo_externo__startswith=PREFIXO).count()
+
+
+def gerar(quantidade, seed=42, batch_size=5000, progresso=None):
+    """Acrescenta `quantidade` imóveis sintéticos (com 0–10 fotos cada) em lotes."""
+    inicio = contar()
+    # A semente inclui o total atual para que rodadas incrementais não repitam dados
+    rng = random.Random(f'{seed}-{inicio}')
+    fotos = _fotos_placeholder()
+    criados = 0
+    while criados < quantidade:
+        lote = min(batch_size, quantidade - criados)
+        imoveis = [imovel_aleatorio(rng, inicio + criados + i) for i in range(lote)]
+        with transaction.atomic():
+            Imovel.objects.bulk_create(imoveis)
+            imagens = [
+                ImovelImage(imovel_id=imovel.pk, image=rng.choice(fotos))
+                for imovel in imoveis
+                for _ in range(rng.choices(range(11), weights=[3, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1])[0])
+            ]
+            ImovelImage.objects.bulk_create(imagens)
+        criados += lote
+        if progresso:
+            progresso(criados)
+    bump_imoveis([])
+    return criados
+
+
+def limpar():
+    """Apaga os imóveis sintéticos e suas fotos com dois DELETE em lote.
+
+    O .delete() normal carregaria linha a linha por causa dos receivers de
+    post_delete (core/signals.py); o que eles fariam é feito aqui uma vez só.
+    """
+    imoveis = Imovel.objects.filter(codigo_externo__startswith=PREFIXO)
+    imagens = ImovelImage.objects.filter(imovel__codigo_externo__startswith=PREFIXO)
+    # As fotos sintéticas repetem os mesmos placeholders: cada arquivo só uma vez
+    variantes = {
+        json.dumps(v, sort_keys=True): v
+        for v in imagens.exclude(variantes={}).values_list('variantes', flat=True)
+    }
+    with transaction.atomic():
+        apagados = imagens._raw_delete(imagens.db)
+        apagados += imoveis._raw_delete(imoveis.db)
+    for v in variantes.values():
+        remover_variantes(str(settings.MEDIA_ROOT), v)
+    if apagados:
+        marcar_exclusao()
+    bump_imoveis([])
+    return apagados
@@ -0,0 +1,53 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.models import ImovelImage
+
+from .util import CACHE_TESTES, criar_imovel
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.imovel = criar_imovel()
+
+    def test_etag_e_304(self):
+        resposta = self.client.get('/api/imoveis/')
+        self.assertEqual(resposta.status_code, 200)
+        etag = resposta.headers['ETag']
+        self.assertEqual(self.client.get('/api/imoveis/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.imovel.preco_aluguel = Decimal('1600')
+        self.imovel.save()
+        resposta = self.client.get('/api/imoveis/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta.headers['ETag'], etag)
+
+    def test_exclusao_muda_o_etag_da_lista(self):
+        outro = criar_imovel(titulo='Casa no Benfica')
+        etag = self.client.get('/api/imoveis/').headers['ETag']
+        outro.delete()
+        self.assertEqual(self.client.get('/api/imoveis/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_nova_imagem_muda_o_etag_do_item(self):
+        url = f'/api/imoveis/{self.imovel.pk}/'
+        etag = self.client.get(url).headers['ETag']
+        ImovelImage.objects.create(imovel=self.imovel, image='imoveis/foto.jpg')
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.json()['imagens']), 1)
+
+    def test_etag_muda_com_a_projecao(self):
+        url = f'/api/imoveis/{self.imovel.pk}/'
+        etag = self.client.get(url).headers['ETag']
+        self.assertNotEqual(self.client.get(url + '?campos=titulo').headers['ETag'], etag)
+        self.assertEqual(self.client.get(url + '?campos=titulo,bairro').json(), {'titulo': 'Apartamento no Centro',
+                                                                                 'bairro': 'Centro'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_campos_invalidos_e_404(self):
+        self.assertEqual(self.client.get('/api/imoveis/?campos=senha').status_code, 400)
+        self.assertEqual(self.client.get('/api/imoveis/999999/').status_code, 404)
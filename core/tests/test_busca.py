@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.fts import fts_ids, fts_query
+from core.models import Imovel
+
+from .util import CACHE_TESTES, criar_imovel
+
+
+def buscar(texto):
+    return set(Imovel.objects.filter(id__in=fts_ids(texto)).values_list('titulo', flat=True))
+
+
+class FtsTests(TestCase):
+    def test_fts_query_escapa_o_texto(self):
+        self.assertEqual(fts_query('casa "São" OR-x'), '"casa"* "São"* "OR"* "x"*')
+        self.assertEqual(fts_query(''), '')
+
+    def test_triggers_sobrevivem_as_migracoes_que_recriam_a_tabela(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'core_imovel'")
+            triggers = {nome for nome, in cursor.fetchall()}
+        self.assertEqual(triggers, {'core_imovel_fts_ai', 'core_imovel_fts_ad', 'core_imovel_fts_au'})
+
+    def test_indice_acompanha_insert_update_e_delete(self):
+        imovel = criar_imovel(titulo='Casa com quintal', bairro='São Mateus')
+        self.assertEqual(buscar('quintal'), {'Casa com quintal'})
+
+        imovel.titulo = 'Casa com piscina'
+        imovel.save()
+        self.assertEqual(buscar('quintal'), set())
+        self.assertEqual(buscar('piscina'), {'Casa com piscina'})
+
+        imovel.delete()
+        self.assertEqual(buscar('piscina'), set())
+
+    def test_busca_ignora_acentos_e_casa_prefixos(self):
+        criar_imovel(titulo='Apartamento reformado', bairro='São Mateus')
+        criar_imovel(titulo='Kitnet', bairro='Benfica')
+        self.assertEqual(buscar('sao mateus'), {'Apartamento reformado'})
+        self.assertEqual(buscar('reform'), {'Apartamento reformado'})
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class BuscaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_custo_total_e_calculado_pelo_banco(self):
+        imovel = criar_imovel(preco_aluguel=Decimal('1000'), preco_iptu=Decimal('40'), preco_condominio=Decimal('260'))
+        imovel.refresh_from_db()
+        self.assertEqual(imovel.custo_total, Decimal('1300'))
+
+    def test_faceta_de_quartos_segue_o_filtro(self):
+        for quartos in (1, 2, 2, 3):
+            criar_imovel(quartos=quartos)
+        resposta = self.client.get('/busca/')
+        totais = {item['valor']: item['total'] for item in resposta.context['facetas']['quartos']}
+        self.assertEqual(totais, {1: 4, 2: 3, 3: 1})
+        resposta = self.client.get('/busca/?quartos=2')
+        self.assertEqual(len(resposta.context['imoveis']), totais[2])
+
+    def test_filtros_da_busca(self):
+        criar_imovel(bairro='Centro', aceita_pets=True)
+        criar_imovel(bairro='Centro', especificacao='casa')
+        criar_imovel(bairro='Benfica', titulo='Casa em Benfica', especificacao='casa')
+        contagem = {
+            '/busca/?bairro=Centro': 2,
+            '/busca/?tipo=casa': 2,
+            '/busca/?bairro=Centro&tipo=casa': 1,
+            '/busca/?pets=on': 1,
+            '/busca/?q=benfica': 1,
+            '/busca/?custo_max=100': 0,
+        }
+        for url, total in contagem.items():
+            self.assertEqual(len(self.client.get(url).context['imoveis']), total, url)
@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+
+from .util import instalado
+
+
+@skipUnless(instalado('ollama', 'vanna', 'chromadb'), 'chat sem ollama/vanna/chromadb instalados')
+class ContextoChromaTests(SimpleTestCase):
+    def setUp(self):
+        import agentes
+
+        self.agentes = agentes
+        # Sem o __init__: só o que o _contexto usa, sem Chroma nem ollama de verdade
+        self.analista = agentes.SQLAnalyst.__new__(agentes.SQLAnalyst)
+        self.analista._executor_chroma = ThreadPoolExecutor(max_workers=3)
+        self.addCleanup(self.analista._executor_chroma.shutdown)
+        self.analista._contextos = OrderedDict()
+        self.analista._contextos_lock = threading.Lock()
+        self.analista.generate_embedding = lambda pergunta: [0.0]
+
+    def buscas(self, ddl):
+        vetor = self.agentes.ChromaDB_VectorStore
+        return mock.patch.multiple(
+            vetor,
+            get_similar_question_sql=lambda self, q: [],
+            get_related_ddl=ddl,
+            get_related_documentation=lambda self, q: [],
+        )
+
+    def test_busca_que_falhou_nao_fica_memorizada(self):
+        chamadas = []
+
+        def ddl(self, pergunta):
+            chamadas.append(pergunta)
+            if len(chamadas) == 1:
+                raise TimeoutError('chroma ocupado')
+            return ['CREATE TABLE core_imovel (...)']
+
+        with self.buscas(ddl):
+            with self.assertRaises(TimeoutError):
+                self.analista.get_related_ddl('casas no centro')
+            self.assertEqual(self.analista.get_related_ddl('casas no centro'), ['CREATE TABLE core_imovel (...)'])
+        self.assertEqual(len(chamadas), 2)
+
+    def test_busca_bem_sucedida_e_reaproveitada(self):
+        chamadas = []
+
+        def ddl(self, pergunta):
+            chamadas.append(pergunta)
+            return ['ddl']
+
+        with self.buscas(ddl):
+            self.analista.get_related_ddl('casas')
+            self.analista.get_related_ddl('casas')
+        self.assertEqual(chamadas, ['casas'])
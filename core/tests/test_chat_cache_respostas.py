@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from cache_respostas import CacheRespostas  # noqa: E402
+
+LINHAS = [{'titulo': 'Casa no Centro', 'custo_total': 1500}, {'titulo': 'Kitnet', 'custo_total': 800}]
+
+
+class CacheRespostasTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = CacheRespostas(':memory:')
+
+    def test_chave_ignora_forma_da_pergunta_e_ordem_das_colunas(self):
+        invertidas = [{'custo_total': 1500, 'titulo': 'Casa no Centro'}, {'custo_total': 800, 'titulo': 'Kitnet'}]
+        self.assertEqual(self.cache.chave('Casas no Centro?', LINHAS, 'deepseek'),
+                         self.cache.chave('casas no centro', invertidas, 'deepseek'))
+
+    def test_chave_muda_com_as_linhas_e_o_modelo(self):
+        chave = self.cache.chave('casas no centro', LINHAS, 'deepseek')
+        self.assertNotEqual(chave, self.cache.chave('casas no centro', LINHAS[:1], 'deepseek'))
+        self.assertNotEqual(chave, self.cache.chave('casas no centro', LINHAS, 'outro-modelo'))
+
+    def test_guarda_busca_e_conta_acertos(self):
+        chave = self.cache.chave('casas no centro', LINHAS)
+        self.assertIsNone(self.cache.buscar(chave))
+        self.cache.guardar(chave, 'Temos uma casa no Centro por R$ 1.500.')
+        self.assertEqual(self.cache.buscar(chave), 'Temos uma casa no Centro por R$ 1.500.')
+        self.assertEqual(self.cache.taxa_acerto, 0.5)
+
+    def test_limite_em_bytes_descarta_entradas(self):
+        cache = CacheRespostas(':memory:', max_bytes=10)
+        cache.guardar('a', 'x' * 6)
+        cache.guardar('b', 'y' * 6)
+        self.assertEqual(sum(cache.buscar(chave) is not None for chave in 'ab'), 1)
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from cache_resultados import CacheResultados, sql_canonico  # noqa: E402
+
+
+class CacheResultadosTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.db = os.path.join(pasta.name, 'db.sqlite3')
+        self.escrever("CREATE TABLE core_imovel (id INTEGER PRIMARY KEY, bairro TEXT)",
+                      "INSERT INTO core_imovel VALUES (1, 'Centro')")
+        self.cache = CacheResultados(self.db)
+        self.addCleanup(self.cache._sentinela.close)
+        self.execucoes = 0
+
+    def escrever(self, *comandos):
+        conn = sqlite3.connect(self.db)
+        with conn:
+            for sql in comandos:
+                conn.execute(sql)
+        conn.close()
+
+    def consultar(self, sql, params=None):
+        def calcular():
+            self.execucoes += 1
+            conn = sqlite3.connect(self.db)
+            try:
+                return pd.read_sql_query(sql, conn, params=params)
+            finally:
+                conn.close()
+        return self.cache.obter(sql, params, calcular)
+
+    def test_mesmo_sql_escrito_diferente_acerta_o_cache(self):
+        self.assertEqual(sql_canonico('select *  from core_imovel -- todos\n;'), 'SELECT * FROM core_imovel')
+        self.consultar('SELECT * FROM core_imovel')
+        df = self.consultar('select *\nfrom core_imovel;')
+        self.assertEqual(self.execucoes, 1)
+        self.assertEqual(len(df), 1)
+        self.assertEqual((self.cache.stats['hits'], self.cache.stats['misses']), (1, 1))
+
+    def test_parametros_fazem_parte_da_chave(self):
+        sql = 'SELECT * FROM core_imovel WHERE bairro = ?'
+        self.assertEqual(len(self.consultar(sql, ['Centro'])), 1)
+        self.assertEqual(len(self.consultar(sql, ['Benfica'])), 0)
+        self.assertEqual(self.execucoes, 2)
+
+    def test_escrita_de_outra_conexao_invalida(self):
+        self.consultar('SELECT * FROM core_imovel')
+        self.escrever("INSERT INTO core_imovel VALUES (2, 'Grama')")
+        self.assertEqual(len(self.consultar('SELECT * FROM core_imovel')), 2)
+        self.assertEqual(self.execucoes, 2)
+        self.assertEqual(self.cache.stats['invalidacoes'], 1)
+
+    def test_limite_em_bytes_descarta_o_mais_antigo(self):
+        self.consultar('SELECT 1')
+        # Cabem quatro resultados do mesmo tamanho
+        self.cache.max_bytes = self.cache.bytes * 4
+        for n in range(2, 6):
+            self.consultar(f'SELECT {n}')
+        self.assertLessEqual(self.cache.bytes, self.cache.max_bytes)
+        self.consultar('SELECT 1')
+        self.assertEqual(self.cache.stats['hits'], 0)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from cache_sql import CacheSQL, normalizar_pergunta  # noqa: E402
+
+VOCABULARIO = ('apartamento', 'casa', 'centro', 'benfica', 'pets')
+
+
+def embedder(texto):
+    """Conta as palavras do vocabulário (por prefixo): frases com o mesmo assunto têm o mesmo vetor."""
+    palavras = normalizar_pergunta(texto).split()
+    return [sum(p.startswith(v) for p in palavras) for v in VOCABULARIO]
+
+
+class CacheSQLTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = CacheSQL(':memory:', 'v1', embedder=embedder, termos_protegidos=['Centro', 'apartamento'])
+
+    def test_assinatura_separa_negacao_e_atributos(self):
+        assinaturas = {
+            self.cache._assinatura(normalizar_pergunta(pergunta))
+            for pergunta in (
+                'Apartamento no Centro que aceita pets',
+                'Apartamento no Centro que não aceita pets',
+                'Apartamento no Centro com garagem, sem pets',
+                'Apartamento no Centro sem garagem, com pets',
+            )
+        }
+        self.assertEqual(len(assinaturas), 4)
+
+    def test_busca_exata(self):
+        self.cache.guardar('Apartamento no Centro?', 'SELECT 1')
+        self.assertEqual(self.cache.buscar('apartamento no centro'), 'SELECT 1')
+        self.assertIsNone(self.cache.buscar('apartamento no centro sem pets'))
+        self.assertEqual(self.cache.hits, {'exato': 1, 'similar': 0, 'miss': 1})
+
+    def test_similar_so_com_a_mesma_assinatura(self):
+        self.cache.guardar('tem apartamento no centro até 1500', 'SELECT 1500')
+        self.assertEqual(self.cache.buscar('algum apartamento disponível no centro até 1500?'), 'SELECT 1500')
+        # Mesmo embedding, outro valor: nunca reaproveita
+        self.assertIsNone(self.cache.buscar('algum apartamento disponível no centro até 2000?'))
+        self.assertEqual(self.cache.hits['similar'], 1)
+
+    def test_invalidar_e_limite_de_entradas(self):
+        cache = CacheSQL(':memory:', 'v1', max_entradas=2)
+        for i in range(3):
+            cache.guardar(f'pergunta {i}', f'SELECT {i}')
+        guardadas = [i for i in range(3) if cache.buscar(f'pergunta {i}')]
+        self.assertEqual(len(guardadas), 2)
+        cache.invalidar(f'SELECT {guardadas[0]}')
+        self.assertIsNone(cache.buscar(f'pergunta {guardadas[0]}'))
+        self.assertEqual(cache.buscar(f'pergunta {guardadas[1]}'), f'SELECT {guardadas[1]}')
+
+    def test_nova_versao_esvazia_o_cache(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        caminho = os.path.join(pasta.name, 'cache_sql.sqlite3')
+        CacheSQL(caminho, 'treino-1').guardar('casas no centro', 'SELECT 1')
+        self.assertEqual(CacheSQL(caminho, 'treino-1').buscar('casas no centro'), 'SELECT 1')
+        self.assertIsNone(CacheSQL(caminho, 'treino-2').buscar('casas no centro'))
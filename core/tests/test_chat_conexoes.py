@@ -0,0 +1,44 @@
+import os
+import queue
+import sqlite3
+import tempfile
+
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from conexoes import PoolLeitura  # noqa: E402
+
+
+class PoolLeituraTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.db = os.path.join(pasta.name, 'db.sqlite3')
+        conn = sqlite3.connect(self.db)
+        with conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE core_imovel (id INTEGER PRIMARY KEY, bairro TEXT)')
+            conn.execute("INSERT INTO core_imovel VALUES (1, 'Centro')")
+        conn.close()
+        self.pool = PoolLeitura(self.db, tamanho=2)
+        self.addCleanup(self.pool.fechar)
+
+    def test_run_sql_devolve_dataframe(self):
+        df = self.pool.run_sql('SELECT bairro FROM core_imovel WHERE id = ?', [1])
+        self.assertEqual(df['bairro'].tolist(), ['Centro'])
+
+    def test_conexao_e_somente_leitura(self):
+        with self.assertRaises(Exception):
+            self.pool.run_sql("DELETE FROM core_imovel")
+        self.assertEqual(len(self.pool.run_sql('SELECT * FROM core_imovel')), 1)
+
+    def test_reaproveita_conexoes_e_respeita_o_tamanho(self):
+        with self.pool.conexao() as primeira:
+            pass
+        with self.pool.conexao() as segunda, self.pool.conexao():
+            self.assertIs(segunda, primeira)
+            with self.assertRaises(queue.Empty):
+                with self.pool.conexao(timeout=0.01):
+                    pass
+        self.assertEqual(self.pool._criadas, 2)
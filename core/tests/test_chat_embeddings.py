@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from embeddings import CacheEmbeddings  # noqa: E402
+
+
+class ModeloFalso:
+    def __init__(self):
+        self.lotes = []
+
+    def __call__(self, textos):
+        self.lotes.append(list(textos))
+        return [[float(len(t)), 1.0] for t in textos]
+
+
+class CacheEmbeddingsTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.caminho = os.path.join(pasta.name, 'embeddings.sqlite3')
+        self.modelo = ModeloFalso()
+
+    def abrir(self, funcao, modelo='nomic', **opcoes):
+        cache = CacheEmbeddings(funcao, self.caminho, modelo, **opcoes)
+        self.addCleanup(cache._conn.close)
+        return cache
+
+    def test_repetidos_e_ja_vistos_nao_vao_para_o_modelo(self):
+        cache = self.abrir(self.modelo)
+        self.assertEqual(cache(['casa', 'casa', 'apto']), [[4.0, 1.0], [4.0, 1.0], [4.0, 1.0]])
+        self.assertEqual(self.modelo.lotes, [['casa', 'apto']])
+        cache.embed_query(['casa'])
+        self.assertEqual(len(self.modelo.lotes), 1)
+        self.assertEqual(cache.stats['memoria'], 1)
+
+    def test_textos_novos_vao_em_lotes(self):
+        cache = self.abrir(self.modelo, tamanho_lote=2)
+        cache([f'texto {i}' for i in range(5)])
+        self.assertEqual([len(lote) for lote in self.modelo.lotes], [2, 2, 1])
+        self.assertEqual(cache.stats['chamadas'], 3)
+
+    def test_vetores_ficam_em_disco_por_modelo(self):
+        self.abrir(self.modelo)(['casa com quintal'])
+        outro = ModeloFalso()
+        self.assertEqual(self.abrir(outro)(['casa com quintal']), [[16.0, 1.0]])
+        self.assertEqual(outro.lotes, [])
+        # Outro modelo de embedding não reaproveita o vetor
+        self.abrir(outro, modelo='bge')(['casa com quintal'])
+        self.assertEqual(outro.lotes, [['casa com quintal']])
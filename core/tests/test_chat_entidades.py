@@ -0,0 +1,30 @@
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+from .util import instalado
+
+
+@skipUnless(instalado('rapidfuzz'), 'rapidfuzz não instalado')
+class IndiceEntidadesTests(SimpleTestCase):
+    def setUp(self):
+        from indice_entidades import IndiceEntidades
+
+        self.indice = IndiceEntidades(
+            ['Centro', 'São Mateus', 'Alto dos Passos', 'Rua Halfeld', 'apartamento', 'Bom Pastor']
+        )
+
+    def test_forma_normalizada_devolve_o_nome_original(self):
+        self.assertEqual(self.indice.buscar('sao mateus'), 'São Mateus')
+
+    def test_sem_candidato_parecido_devolve_none(self):
+        self.assertIsNone(self.indice.buscar('xyz'))
+
+    def test_substitui_frases_inteiras_e_erros_de_digitacao(self):
+        self.assertEqual(
+            self.indice.substituir('apartamentos no alto dos pasos perto da rua halfed'),
+            'apartamento no Alto dos Passos perto da Rua Halfeld',
+        )
+
+    def test_numeros_e_palavras_curtas_ficam_como_estao(self):
+        self.assertEqual(self.indice.substituir('kitnet no sao mateus 2000'), 'kitnet no São Mateus 2000')
@@ -0,0 +1,54 @@
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from gate_reescrita import GateReescrita  # noqa: E402
+from parser_consulta import ParserConsulta  # noqa: E402
+
+BAIRROS = ['Centro', 'São Mateus', 'Benfica', 'Granbery']
+TIPOS = ['apartamento', 'casa', 'kitnet']
+
+
+def historico_de(anterior):
+    return [
+        {'role': 'user', 'content': anterior},
+        {'role': 'assistant', 'content': '(resposta da Bia)', 'pergunta_traduzida': anterior},
+    ]
+
+
+class GateReescritaTests(SimpleTestCase):
+    def setUp(self):
+        self.gate = GateReescrita(ParserConsulta(BAIRROS, TIPOS))
+
+    def decidir(self, anterior, nova):
+        return self.gate.decidir(nova, historico_de(anterior))
+
+    def test_sem_historico_nao_reescreve(self):
+        self.assertEqual(self.gate.decidir('e no centro?', []), (False, 'sem_historico'))
+
+    def test_acima_de_valor_e_filtro_e_nao_referencia(self):
+        self.assertEqual(self.decidir('Casas no Centro até 2000 reais', 'Apartamentos no Centro acima de 3000'),
+                         (False, 'slots_completos'))
+        self.assertEqual(self.decidir('Kitnets no Benfica', 'Casas no São Mateus acima de R$ 2.500'),
+                         (False, 'slots_completos'))
+
+    def test_acima_sem_valor_retoma_o_contexto(self):
+        self.assertEqual(self.decidir('Casas no Centro', 'O imóvel acima aceita pets?'), (True, 'referencia'))
+
+    def test_perguntas_dependentes_sao_reescritas(self):
+        for anterior, nova, motivo in (
+            ('Queria casas no Centro', 'E no São Mateus?', 'eliptica'),
+            ('Apartamento no Granbery', 'Qual o endereço dele?', 'referencia'),
+            ('Apartamentos no Granbery', 'E acima de 2000?', 'eliptica'),
+        ):
+            self.assertEqual(self.decidir(anterior, nova), (True, motivo), nova)
+
+    def test_identificador_dispensa_contexto(self):
+        self.assertEqual(self.decidir('Kitnet em São Mateus até 1500', 'Qual o custo total do imóvel 131?'),
+                         (False, 'identificador'))
+
+    def test_contagem_de_evitadas(self):
+        self.gate.precisa_reescrever('Apartamentos no Centro acima de 3000', historico_de('Casas no Centro'))
+        self.gate.precisa_reescrever('E no Benfica?', historico_de('Casas no Centro'))
+        self.gate.precisa_reescrever('casas', [])
+        self.assertEqual((self.gate.evitadas, self.gate.avaliadas), (1, 2))
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import tempfile
+
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from conexoes import PoolLeitura  # noqa: E402
+from guardrail_sql import GuardaSQL, SQLRecusado  # noqa: E402
+
+
+def banco_de_teste(pasta):
+    """db.sqlite3 mínimo: core_imovel com FTS5 e uma tabela que o chat nunca pode ler."""
+    caminho = os.path.join(pasta, 'db.sqlite3')
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE core_imovel (id INTEGER PRIMARY KEY, titulo TEXT, custo_total REAL);
+        CREATE VIRTUAL TABLE core_imovel_fts USING fts5(titulo, content='core_imovel', content_rowid='id');
+        CREATE TABLE auth_user (id INTEGER PRIMARY KEY, password TEXT);
+        INSERT INTO core_imovel VALUES (1, 'Casa no Centro', 1500), (2, 'Apartamento em Benfica', 900);
+        INSERT INTO core_imovel_fts(core_imovel_fts) VALUES ('rebuild');
+        INSERT INTO auth_user VALUES (1, 'pbkdf2_sha256$hash');
+    """)
+    conn.commit()
+    conn.close()
+    return caminho
+
+
+class GuardaSQLTests(SimpleTestCase):
+    def setUp(self):
+        self.guarda = GuardaSQL()
+
+    def recusar(self, sql):
+        with self.assertRaises(SQLRecusado, msg=sql), self.assertLogs('bia.guarda', 'WARNING'):
+            self.guarda.validar(sql)
+
+    def test_limit_injetado_e_limitado(self):
+        self.assertEqual(self.guarda.validar('SELECT * FROM core_imovel'), 'SELECT * FROM core_imovel LIMIT 10')
+        self.assertEqual(self.guarda.validar('SELECT * FROM core_imovel LIMIT 1000'),
+                         'SELECT * FROM core_imovel LIMIT 50')
+        self.assertEqual(
+            self.guarda.validar('SELECT * FROM (SELECT * FROM core_imovel LIMIT 500) LIMIT 5, 200'),
+            'SELECT * FROM (SELECT * FROM core_imovel LIMIT 50) LIMIT 50 OFFSET 5',
+        )
+        self.assertTrue(self.guarda.validar('SELECT id FROM core_imovel LIMIT -1').endswith('LIMIT 50'))
+
+    def test_recusa_tabelas_e_escritas(self):
+        for sql in (
+            'SELECT * FROM auth_user',
+            'SELECT * FROM core_imovel JOIN auth_user ON 1',
+            'SELECT * FROM core_imovel, sqlite_master',
+            'DELETE FROM core_imovel',
+            'SELECT 1; DROP TABLE core_imovel',
+            'PRAGMA table_info(core_imovel)',
+        ):
+            self.recusar(sql)
+
+    def test_recusa_tabela_entre_parenteses(self):
+        for sql in (
+            'SELECT * FROM (auth_user)',
+            'SELECT * FROM core_imovel, (auth_user)',
+            'SELECT * FROM core_imovel WHERE id IN (SELECT id FROM (auth_user))',
+            'SELECT * FROM ((auth_user))',
+            'SELECT * FROM (SELECT id FROM core_imovel) t, auth_user',
+            'SELECT * FROM core_imovel JOIN (auth_user) ON 1',
+        ):
+            self.recusar(sql)
+
+    def test_aceita_subconsultas_e_cte(self):
+        for sql in (
+            'SELECT COUNT(*) FROM (core_imovel)',
+            'SELECT * FROM (SELECT id FROM core_imovel WHERE custo_total < 1000) t',
+            'WITH baratos AS (SELECT id FROM core_imovel WHERE custo_total < 1000) SELECT * FROM baratos',
+            'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 5) SELECT x FROM c',
+            'WITH a (id) AS (SELECT id FROM core_imovel), b(n, m) AS (SELECT 1, 2) SELECT * FROM a, b',
+        ):
+            self.assertTrue(self.guarda.validar(sql).endswith('LIMIT 10'), sql)
+
+
+class GuardaNoBancoTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pool = PoolLeitura(banco_de_teste(pasta.name))
+        self.addCleanup(self.pool.fechar)
+        self.guarda = GuardaSQL()
+
+    def rodar_sem_validar(self, sql):
+        return self.pool.run_sql(sql, protecao=lambda conn: self.guarda.protecao(conn, sql))
+
+    def test_authorizer_nega_tabela_que_escapou_da_analise(self):
+        # Segunda barreira: mesmo sem passar pelo validar(), o SQLite não lê auth_user
+        for sql in ('SELECT * FROM (auth_user) LIMIT 5', 'SELECT password FROM core_imovel, auth_user LIMIT 5'):
+            with self.assertRaises(SQLRecusado, msg=sql), self.assertLogs('bia.guarda', 'WARNING'):
+                self.rodar_sem_validar(sql)
+
+    def test_fts_continua_permitido(self):
+        df, sql = self.guarda.executar(
+            self.pool,
+            "SELECT id FROM core_imovel WHERE id IN "
+            "(SELECT rowid FROM core_imovel_fts WHERE core_imovel_fts MATCH 'benfica')",
+        )
+        self.assertEqual(df['id'].tolist(), [2])
+        self.assertTrue(sql.endswith('LIMIT 10'))
+
+    def test_tamanho_das_tabelas_e_recontado_apos_ttl(self):
+        escrita = sqlite3.connect(self.pool.db_path)
+        self.addCleanup(escrita.close)
+        with self.pool.conexao() as conn:
+            self.assertEqual(self.guarda._tamanho(conn, 'core_imovel'), 2)
+            escrita.execute("INSERT INTO core_imovel VALUES (3, 'Kitnet', 700)")
+            escrita.commit()
+            # Dentro da validade, vale a contagem guardada
+            self.assertEqual(self.guarda._tamanho(conn, 'core_imovel'), 2)
+            self.guarda.tamanhos_ttl = -1
+            self.assertEqual(self.guarda._tamanho(conn, 'core_imovel'), 3)
+
+    def test_conexao_volta_ao_pool_sem_authorizer(self):
+        self.guarda.executar(self.pool, 'SELECT id FROM core_imovel')
+        with self.pool.conexao() as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM auth_user').fetchone()[0], 1)
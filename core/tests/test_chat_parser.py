@@ -0,0 +1,54 @@
+import sqlite3
+
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from parser_consulta import CONFIANCA_MINIMA, ParserConsulta, sql_legivel  # noqa: E402
+
+
+class ParserConsultaTests(SimpleTestCase):
+    def setUp(self):
+        self.parser = ParserConsulta(['Centro', 'São Mateus'])
+
+    def test_pergunta_simples(self):
+        campos, confianca = self.parser.interpretar('apartamento no centro até 2000 reais com 2 quartos')
+        self.assertGreaterEqual(confianca, CONFIANCA_MINIMA)
+        self.assertEqual(campos, {'quartos': 2, 'custo_max': (2000, '<='), 'tipo': 'apartamento', 'bairro': 'Centro'})
+        sql, params = self.parser.montar_sql(campos)
+        self.assertIn('quartos >= ?', sql)
+        self.assertEqual(params, ['Centro', 'apartamento', 2, 2000])
+
+    def test_pets_e_acentos(self):
+        campos, confianca = self.parser.interpretar('Casa em Sao Mateus que aceita pets')
+        self.assertGreaterEqual(confianca, CONFIANCA_MINIMA)
+        self.assertEqual(campos, {'pets': True, 'tipo': 'casa', 'bairro': 'São Mateus'})
+
+    def test_valores_escritos_e_limites_estritos(self):
+        campos, _ = self.parser.interpretar('kitnet no centro acima de 1.500,00')
+        self.assertEqual(campos['custo_min'], (1500, '>'))
+        campos, _ = self.parser.interpretar('casa no centro até dois mil e quinhentos')
+        self.assertEqual(campos['custo_max'], (2500, '<='))
+        campos, _ = self.parser.interpretar('apartamento no centro com mais de 2 quartos')
+        self.assertEqual(campos['quartos'], 3)
+
+    def test_o_mais_barato_pede_um_so(self):
+        campos, confianca = self.parser.interpretar('qual o apartamento mais barato no centro')
+        self.assertGreaterEqual(confianca, CONFIANCA_MINIMA)
+        self.assertEqual((campos['ordem'], campos['limite']), ('ASC', 1))
+
+    def test_fica_para_o_llm(self):
+        for pergunta in ('casa no centro ou são mateus', 'quero um imóvel perto da ufjf com varanda gourmet'):
+            self.assertLess(self.parser.interpretar(pergunta)[1], CONFIANCA_MINIMA, pergunta)
+
+    def test_sql_montado_roda_no_sqlite(self):
+        conn = sqlite3.connect(':memory:')
+        self.addCleanup(conn.close)
+        conn.execute('CREATE TABLE core_imovel (bairro, especificacao, quartos, custo_total, aceita_pets)')
+        conn.executemany('INSERT INTO core_imovel VALUES (?, ?, ?, ?, ?)', [
+            ('Centro', 'casa', 3, 1800, 1), ('Centro', 'casa', 3, 2600, 1), ('Centro', 'casa', 1, 900, 1),
+        ])
+        campos, _ = self.parser.interpretar('casa no centro com 2 quartos até 2000 que aceita pets')
+        sql, params = self.parser.montar_sql(campos)
+        self.assertEqual(conn.execute(sql, params).fetchall(), [('Centro', 'casa', 3, 1800, 1)])
+        self.assertIn("bairro = 'Centro'", sql_legivel(sql, params))
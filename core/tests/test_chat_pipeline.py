@@ -0,0 +1,93 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from pipeline import executar_turno  # noqa: E402
+
+
+class AnalistaFalso:
+    """Responde pelo dicionário `respostas` e registra o que o pipeline pediu."""
+
+    def __init__(self, respostas):
+        self.respostas = respostas
+        self.chamadas = []
+        self.rodadas = []
+        self.confirmadas = []
+
+    def executar_consulta(self, pergunta, especulativo=None):
+        self.chamadas.append((pergunta, especulativo is not None))
+        if especulativo is not None:
+            self.rodadas.append(especulativo)
+            especulativo.caminho = 'llm'
+            especulativo.para_cache = (pergunta, f'SQL de {pergunta}')
+        resultado = self.respostas[pergunta]
+        return resultado if isinstance(resultado, tuple) else (resultado, f'SQL de {pergunta}')
+
+    def confirmar_especulativo(self, rodada):
+        self.confirmadas.append(rodada)
+
+
+def reescrever_para(texto):
+    return lambda pergunta, historico: texto
+
+
+HISTORICO = [{'role': 'user', 'content': 'Casas no Centro'}, {'role': 'assistant', 'content': 'Temos 3.'}]
+
+
+class PipelineTests(SimpleTestCase):
+    def test_sem_historico_consulta_uma_vez_sem_especular(self):
+        analista = AnalistaFalso({'casas no centro': 'df'})
+        resultado = executar_turno(analista, reescrever_para('nunca usada'), 'casas no centro', [])
+        self.assertEqual(resultado, ('casas no centro', 'df', 'SQL de casas no centro'))
+        self.assertEqual(analista.chamadas, [('casas no centro', False)])
+
+    def test_reescrita_igual_promove_e_confirma_o_especulativo(self):
+        analista = AnalistaFalso({'Tem casas no Centro?': 'df'})
+        resultado = executar_turno(analista, reescrever_para('tem casas no centro'), 'Tem casas no Centro?', HISTORICO)
+        self.assertEqual(resultado, ('Tem casas no Centro?', 'df', 'SQL de Tem casas no Centro?'))
+        self.assertEqual(analista.chamadas, [('Tem casas no Centro?', True)])
+        self.assertEqual(analista.confirmadas, analista.rodadas)
+
+    def test_reescritor_com_erro_usa_o_especulativo(self):
+        def falhar(pergunta, historico):
+            raise RuntimeError('ollama fora do ar')
+
+        analista = AnalistaFalso({'e no benfica?': 'df'})
+        self.assertEqual(executar_turno(analista, falhar, 'e no benfica?', HISTORICO)[1], 'df')
+        self.assertEqual(len(analista.confirmadas), 1)
+
+    def test_reescrita_valida_vence_e_cancela_o_especulativo(self):
+        analista = AnalistaFalso({'e no benfica?': 'df crua', 'casas no benfica': 'df reescrita'})
+        resultado = executar_turno(analista, reescrever_para('casas no benfica'), 'e no benfica?', HISTORICO)
+        self.assertEqual(resultado, ('casas no benfica', 'df reescrita', 'SQL de casas no benfica'))
+        self.assertEqual(analista.confirmadas, [])
+        self.assertTrue(analista.rodadas[0].cancelada.is_set())
+
+    def test_reserva_especulativa_quando_o_sql_da_reescrita_falha(self):
+        analista = AnalistaFalso({'e no benfica?': 'df crua', 'casas no benfica': (None, 'erro')})
+        resultado = executar_turno(analista, reescrever_para('casas no benfica'), 'e no benfica?', HISTORICO)
+        self.assertEqual(resultado, ('e no benfica?', 'df crua', 'SQL de e no benfica?'))
+        self.assertEqual(analista.confirmadas, analista.rodadas)
+
+    def test_as_duas_falham_devolve_o_erro_da_reescrita(self):
+        analista = AnalistaFalso({'e no benfica?': (None, 'erro cru'), 'casas no benfica': (None, 'erro')})
+        resultado = executar_turno(analista, reescrever_para('casas no benfica'), 'e no benfica?', HISTORICO)
+        self.assertEqual(resultado, ('casas no benfica', None, 'erro'))
+        self.assertEqual(analista.confirmadas, [])
+
+    def test_timeout_do_sql_devolve_mensagem(self):
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+
+        class Travado(AnalistaFalso):
+            def executar_consulta(self, pergunta, especulativo=None):
+                liberar.wait(5)
+                return None, 'tarde demais'
+
+        with self.assertLogs('bia.pipeline', 'WARNING'):
+            df, sql = executar_turno(Travado({}), None, 'casas', [], timeouts={'sql': 0.05})[1:]
+        self.assertIsNone(df)
+        self.assertIn('Tempo esgotado', sql)
+
@@ -0,0 +1,79 @@
+import contextvars
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+import rastreio  # noqa: E402
+
+
+class RastreioTests(SimpleTestCase):
+    def test_spans_aninhados_com_atributos_e_contadores(self):
+        with rastreio.rastrear_turno('turno', sessao='s1') as rastro:
+            rastreio.anotar(rota='sql')
+            with rastreio.span('sql', modelo='qwen') as atributos:
+                rastreio.contar(tokens=10)
+                with rastreio.span('run_sql'):
+                    rastreio.anotar(cache='hit')
+                rastreio.contar(tokens=5)
+                atributos['linhas'] = 3
+        dados = rastro.para_dict()
+        self.assertEqual(dados['atributos'], {'sessao': 's1', 'rota': 'sql'})
+        spans = {s['nome']: s for s in dados['spans']}
+        self.assertEqual(spans['sql']['atributos'], {'modelo': 'qwen', 'tokens': 15, 'linhas': 3})
+        self.assertEqual(spans['run_sql']['pai'], spans['sql']['id'])
+        self.assertEqual(spans['run_sql']['atributos'], {'cache': 'hit'})
+        self.assertEqual([linha['etapa'] for linha in rastro.linhas()], ['sql', '· run_sql'])
+
+    def test_fora_de_um_turno_nao_faz_nada(self):
+        with rastreio.span('solto', a=1) as atributos:
+            rastreio.anotar(b=2)
+            rastreio.contar(c=3)
+        self.assertEqual(atributos, {'a': 1})
+
+    def test_erro_fica_no_span_e_no_rastro(self):
+        with self.assertRaises(ValueError):
+            with rastreio.rastrear_turno() as rastro:
+                with rastreio.span('gate'):
+                    raise ValueError('quebrou')
+        self.assertEqual(rastro.atributos['erro'], 'ValueError: quebrou')
+        self.assertEqual(rastro.spans[0]['erro'], 'ValueError: quebrou')
+
+    def test_thread_com_contexto_copiado_entra_no_mesmo_rastro(self):
+        def buscar():
+            with rastreio.span('chroma'):
+                pass
+
+        with rastreio.rastrear_turno() as rastro, ThreadPoolExecutor(1) as executor:
+            with rastreio.span('generate_sql'):
+                executor.submit(contextvars.copy_context().run, buscar).result()
+        spans = {s['nome']: s for s in rastro.spans}
+        self.assertEqual(spans['chroma']['pai'], spans['generate_sql']['id'])
+
+    def test_exporta_um_rastro_por_linha(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        caminho = os.path.join(pasta.name, 'rastros', 'turnos.jsonl')
+        rastreio.configurar(caminho)
+        rastreio.configurar(caminho)
+        self.assertEqual(len(rastreio._exportador.handlers), 1)
+        self.addCleanup(self.desligar_exportacao)
+
+        for nome in ('t1', 't2'):
+            with rastreio.rastrear_turno(nome):
+                with rastreio.span('resposta'):
+                    pass
+        with open(caminho, encoding='utf-8') as arquivo:
+            linhas = [json.loads(linha) for linha in arquivo]
+        self.assertEqual([linha['nome'] for linha in linhas], ['t1', 't2'])
+        self.assertEqual(linhas[0]['spans'][0]['nome'], 'resposta')
+        self.assertIsNotNone(linhas[0]['duracao_ms'])
+
+    def desligar_exportacao(self):
+        for handler in list(rastreio._exportador.handlers):
+            rastreio._exportador.removeHandler(handler)
+            handler.close()
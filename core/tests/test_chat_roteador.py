@@ -0,0 +1,74 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+from cache_sql import normalizar_pergunta  # noqa: E402
+from roteador_intencao import RoteadorIntencao  # noqa: E402
+
+# Cada intenção tem as suas palavras; o "embedding" conta quantas aparecem
+PALAVRAS = {
+    'BUSCAR': ('apartamento', 'casa', 'quartos', 'alugar'),
+    'REGRAS': ('fiador', 'documentos', 'contrato', 'visita'),
+    'CONVERSAR': ('oi', 'obrigado', 'tchau', 'bom'),
+}
+EXEMPLOS = {
+    'BUSCAR': ['quero alugar um apartamento', 'tem casa com 3 quartos?'],
+    'REGRAS': ['vocês aceitam fiador?', 'quais documentos para o contrato?'],
+    'CONVERSAR': ['oi', 'obrigado, tchau'],
+}
+
+
+class EmbedderFalso:
+    def __init__(self):
+        self.textos = []
+
+    def __call__(self, textos):
+        self.textos += textos
+        vetores = []
+        for texto in textos:
+            palavras = normalizar_pergunta(texto).split()
+            vetores.append([sum(p in palavras for p in lista) for lista in PALAVRAS.values()])
+        return vetores
+
+
+class RoteadorIntencaoTests(SimpleTestCase):
+    def setUp(self):
+        self.embedder = EmbedderFalso()
+        self.chamadas_llm = []
+        self.roteador = RoteadorIntencao(self.embedder, EXEMPLOS, fallback=self.llm)
+
+    def llm(self, texto):
+        self.chamadas_llm.append(texto)
+        return 'CONVERSAR'
+
+    def test_classifica_pelo_centroide_sem_chamar_o_llm(self):
+        self.assertEqual(self.roteador.classificar('Tem apartamento para alugar?')[::2], ('BUSCAR', 'embedding'))
+        self.assertEqual(self.roteador.classificar('Preciso de fiador?')[::2], ('REGRAS', 'embedding'))
+        self.assertEqual(self.chamadas_llm, [])
+
+    def test_sem_folga_vai_para_o_fallback(self):
+        self.assertEqual(self.roteador.classificar('casa e contrato')[::2], ('CONVERSAR', 'llm'))
+        self.assertEqual(self.roteador.classificar('qualquer coisa')[::2], ('CONVERSAR', 'llm'))
+        self.assertEqual(self.roteador.origens, {'llm': 2})
+
+    def test_mensagem_repetida_nao_embeda_de_novo(self):
+        antes = len(self.embedder.textos)
+        self.roteador.classificar('Oi!')
+        self.roteador.classificar('oi')
+        self.assertEqual(len(self.embedder.textos), antes + 1)
+
+    def test_embeddings_dos_exemplos_ficam_em_disco(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        caminho = os.path.join(pasta.name, 'intencoes.npz')
+
+        RoteadorIntencao(EmbedderFalso(), EXEMPLOS, caminho_cache=caminho, modelo='m1')
+        embedder = EmbedderFalso()
+        RoteadorIntencao(embedder, EXEMPLOS, caminho_cache=caminho, modelo='m1')
+        self.assertEqual(embedder.textos, [])
+        # Outro modelo de embedding invalida o arquivo
+        RoteadorIntencao(embedder, EXEMPLOS, caminho_cache=caminho, modelo='m2')
+        self.assertEqual(len(embedder.textos), 6)
@@ -0,0 +1,58 @@
+import json
+import os
+import sqlite3
+import tempfile
+
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+import snapshot  # noqa: E402
+
+
+class SnapshotTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        self.db = os.path.join(self.pasta, 'db.sqlite3')
+        self.escrever("CREATE TABLE core_imovel (id INTEGER PRIMARY KEY, bairro TEXT, updated_at TEXT)",
+                      "INSERT INTO core_imovel VALUES (1, 'Centro', '2026-01-01 10:00:00')")
+        snapshot.gravar(self.pasta, self.db, bairros=['Centro'], ruas=[], tipos=['casa'])
+
+    def escrever(self, *comandos):
+        conn = sqlite3.connect(self.db)
+        with conn:
+            for sql in comandos:
+                conn.execute(sql)
+        conn.close()
+
+    def test_carrega_o_que_foi_gravado(self):
+        conteudo = snapshot.carregar(self.pasta, self.db)
+        self.assertEqual((conteudo['bairros'], conteudo['tipos']), (['Centro'], ['casa']))
+        self.assertFalse(os.path.exists(os.path.join(self.pasta, snapshot.ARQUIVO + '.tmp')))
+
+    def test_edicao_nos_dados_invalida(self):
+        self.escrever("UPDATE core_imovel SET bairro = 'Benfica', updated_at = '2026-01-02 09:00:00'")
+        self.assertIsNone(snapshot.carregar(self.pasta, self.db))
+
+    def test_exclusao_invalida(self):
+        self.escrever("INSERT INTO core_imovel VALUES (2, 'Grama', '2025-12-01 10:00:00')")
+        snapshot.gravar(self.pasta, self.db, bairros=['Centro', 'Grama'])
+        self.escrever("DELETE FROM core_imovel WHERE id = 2")
+        self.assertIsNone(snapshot.carregar(self.pasta, self.db))
+
+    def test_mudanca_no_schema_invalida(self):
+        self.escrever("CREATE INDEX core_imovel_bairro ON core_imovel (bairro)")
+        self.assertIsNone(snapshot.carregar(self.pasta, self.db))
+
+    def test_arquivo_corrompido_ou_de_outra_versao(self):
+        caminho = os.path.join(self.pasta, snapshot.ARQUIVO)
+        with open(caminho, encoding='utf-8') as arquivo:
+            conteudo = json.load(arquivo)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump({**conteudo, 'versao': snapshot.VERSAO_SNAPSHOT + 1}, arquivo)
+        self.assertIsNone(snapshot.carregar(self.pasta, self.db))
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('{quebrado')
+        self.assertIsNone(snapshot.carregar(self.pasta, self.db))
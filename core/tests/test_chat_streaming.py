@@ -0,0 +1,56 @@
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+from .util import instalado
+
+
+@skipUnless(instalado('ollama'), 'streaming.py importa o cliente do ollama')
+class FiltroRaciocinioTests(SimpleTestCase):
+    def filtrar(self, pedacos, **opcoes):
+        from streaming import FiltroRaciocinio
+
+        filtro = FiltroRaciocinio(**opcoes)
+        return ''.join(filtro.alimentar(p) for p in pedacos) + filtro.finalizar()
+
+    def test_remove_raciocinio_com_tag_partida(self):
+        self.assertEqual(self.filtrar(['<thi', 'nk>pensando', '...</th', 'ink>\n\nOlá!', ' Tudo bem?']), 'Olá! Tudo bem?')
+
+    def test_fechamento_sem_abertura_descarta_o_retido(self):
+        self.assertEqual(self.filtrar(['pensando sem tag', '</think>', 'Resposta']), 'Resposta')
+
+    def test_sem_tags_sai_no_final(self):
+        self.assertEqual(self.filtrar(['Aluguel ', '< 2000 reais']), 'Aluguel < 2000 reais')
+        self.assertEqual(self.filtrar(['a', 'b'], reter_ate_tag=False), 'ab')
+
+
+@skipUnless(instalado('ollama'), 'streaming.py importa o cliente do ollama')
+class RespostaStreamTests(SimpleTestCase):
+    def test_trechos_visiveis_ttft_e_ao_terminar(self):
+        from streaming import RespostaStream
+
+        guardado = []
+        stream = RespostaStream(['<think>hmm</think>', 'Temos ', 'duas casas.'], ao_terminar=guardado.append)
+        self.assertEqual(list(stream), ['Temos ', 'duas casas.'])
+        self.assertEqual(guardado, ['Temos duas casas.'])
+        self.assertIsNotNone(stream.ttft)
+        self.assertGreaterEqual(stream.duracao, stream.ttft)
+
+    def test_erro_no_meio_vira_mensagem_e_nao_guarda(self):
+        from streaming import RespostaStream
+
+        def pedacos():
+            yield 'Temos'
+            raise ConnectionError('ollama caiu')
+
+        guardado = []
+        stream = RespostaStream(pedacos(), pensa=False, ao_terminar=guardado.append, mensagem_erro='Tente de novo.')
+        self.assertEqual(''.join(stream), 'Temos\n\nTente de novo.')
+        self.assertEqual(guardado, [])
+
+    def test_limite_corta_a_geracao(self):
+        from streaming import RespostaStream
+
+        stream = RespostaStream(iter(['a', 'b']), pensa=False, limite=-1)
+        with self.assertRaises(TimeoutError):
+            list(stream)
@@ -0,0 +1,65 @@
+import itertools
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from .util import CHAT_DIR  # noqa: F401 (coloca automacao_chat no sys.path)
+
+import treino  # noqa: E402
+
+
+class VetorialFalso:
+    """Mesma interface de treino do Vanna, guardando os itens num dicionário."""
+
+    def __init__(self):
+        self.itens = {}
+        self.ids = itertools.count()
+        self.embedados = 0
+
+    def _add(self, tipo, conteudo, pergunta=None):
+        self.embedados += 1
+        id_ = f'{next(self.ids)}-{tipo}'
+        self.itens[id_] = {'id': id_, 'training_data_type': tipo, 'content': conteudo, 'question': pergunta}
+        return id_
+
+    def add_ddl(self, ddl):
+        return self._add('ddl', ddl)
+
+    def add_documentation(self, documentation):
+        return self._add('documentation', documentation)
+
+    def add_question_sql(self, question, sql):
+        return self._add('sql', sql, question)
+
+    def remove_training_data(self, id):
+        return self.itens.pop(id, None) is not None
+
+    def get_training_data(self):
+        return pd.DataFrame(list(self.itens.values()))
+
+
+class TreinoTests(SimpleTestCase):
+    def setUp(self):
+        self.vn = VetorialFalso()
+        self.itens = treino.manifesto(['Centro', 'Benfica'])
+
+    def test_primeira_sincronizacao_adiciona_tudo_e_a_segunda_nada(self):
+        self.assertEqual(treino.sincronizar(self.vn, self.itens), (len(self.itens), 0))
+        self.assertEqual(treino.sincronizar(self.vn, self.itens), (0, 0))
+        self.assertEqual(self.vn.embedados, len(self.itens))
+
+    def test_mudanca_nos_bairros_so_reembeda_a_documentacao_afetada(self):
+        treino.sincronizar(self.vn, self.itens)
+        novos = treino.manifesto(['Centro', 'Benfica', 'Grama'])
+        mudados = len(set(novos) - set(self.itens))
+        self.assertGreater(mudados, 0)
+        self.assertLess(mudados, len(novos))
+        self.assertEqual(treino.sincronizar(self.vn, novos), (mudados, mudados))
+        self.assertNotEqual(treino.hash_manifesto(novos), treino.hash_manifesto(self.itens))
+
+    def test_remove_duplicados_e_itens_fora_do_manifesto(self):
+        treino.sincronizar(self.vn, self.itens)
+        self.vn.add_ddl(treino.DDL[0])
+        self.vn.add_question_sql(question='pergunta antiga', sql='SELECT 1')
+        self.assertEqual(treino.sincronizar(self.vn, self.itens), (0, 2))
+        self.assertEqual(len(self.vn.itens), len(self.itens))
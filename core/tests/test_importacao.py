@@ -0,0 +1,71 @@
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.fts import fts_ids
+from core.models import Imovel
+
+from .util import CACHE_TESTES
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ImportacaoTests(TestCase):
+    CABECALHO = ('codigo_externo,titulo,descricao,quartos,banheiros,garagem,area,cidade,bairro,rua,'
+                 'numero,preco_aluguel,preco_iptu,preco_condominio,aceita_pets,especificacao\n')
+
+    def setUp(self):
+        cache.clear()
+
+    def importar(self, conteudo, sufixo='.csv', *opcoes):
+        with tempfile.NamedTemporaryFile('w', suffix=sufixo, encoding='utf-8', delete=False) as arquivo:
+            arquivo.write(conteudo)
+        self.addCleanup(Path(arquivo.name).unlink)
+        saida, erros = StringIO(), StringIO()
+        call_command('importar_imoveis', arquivo.name, *opcoes, stdout=saida, stderr=erros)
+        return saida.getvalue(), erros.getvalue()
+
+    def test_upsert_por_codigo_externo(self):
+        _, erros = self.importar(self.CABECALHO + ''.join([
+            'JF1,Casa 1,desc,2,1,0,50,Juiz de Fora,Centro,Rua A,1,1000,50,100,sim,casa\n',
+            'JF2,Casa 2,desc,3,2,1,80,Juiz de Fora,Benfica,Rua B,2,1500,60,0,não,casa\n',
+            'JF3,Sem preço,desc,3,2,1,80,Juiz de Fora,Benfica,Rua B,2,,60,0,não,casa\n',
+        ]))
+        self.assertEqual(Imovel.objects.count(), 2)
+        self.assertIn('line 4: preco_aluguel', erros)
+
+        saida, _ = self.importar(
+            self.CABECALHO + 'JF1,Casa 1,desc,2,1,0,50,Juiz de Fora,Centro,Rua A,1,1200,50,100,sim,casa\n'
+        )
+        self.assertIn('0 created, 1 updated', saida)
+        self.assertEqual(Imovel.objects.count(), 2)
+        imovel = Imovel.objects.get(codigo_externo='JF1')
+        self.assertEqual(imovel.preco_aluguel, Decimal('1200'))
+        self.assertEqual(imovel.custo_total, Decimal('1350'))
+        self.assertTrue(imovel.aceita_pets)
+
+    def test_jsonl_em_lotes_entra_no_indice_fts(self):
+        linhas = [
+            json.dumps({'codigo_externo': f'JF{i}', 'titulo': f'Casa {i}', 'descricao': 'Com piscina',
+                        'quartos': 2, 'banheiros': 1, 'garagem': 0, 'area': 70, 'cidade': 'Juiz de Fora',
+                        'bairro': 'Centro', 'rua': 'Rua A', 'numero': str(i), 'preco_aluguel': 1000,
+                        'preco_iptu': 0, 'preco_condominio': 0, 'aceita_pets': False, 'especificacao': 'casa'})
+            for i in range(5)
+        ]
+        saida, _ = self.importar('\n'.join(linhas + ['{quebrado']) + '\n', '.jsonl', '--batch-size', '2')
+        self.assertIn('5 created, 0 updated, 1 invalid', saida)
+        self.assertEqual(Imovel.objects.filter(id__in=fts_ids('piscina')).count(), 5)
+
+    def test_dry_run_nao_grava(self):
+        saida, _ = self.importar(
+            self.CABECALHO + 'JF1,Casa 1,desc,2,1,0,50,Juiz de Fora,Centro,Rua A,1,1000,50,100,sim,casa\n',
+            '.csv', '--dry-run',
+        )
+        self.assertIn('1 created', saida)
+        self.assertIn('dry run', saida)
+        self.assertFalse(Imovel.objects.exists())
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.models import Imovel
+from core.views import ORDENACOES, PAGE_SIZE, _decode_cursor, _encode_cursor, keyset_page
+
+from .util import CACHE_TESTES, criar_imovel
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class CursorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_ida_e_volta(self):
+        imovel = criar_imovel(preco_aluguel=Decimal('1234.50'))
+        imovel.refresh_from_db()
+        for campos in ORDENACOES.values():
+            cursor = _encode_cursor(imovel, campos)
+            esperado = [getattr(imovel, campo.lstrip('-')) for campo in campos]
+            self.assertEqual(_decode_cursor(cursor, campos), esperado)
+
+    def test_cursor_invalido(self):
+        campos = ORDENACOES['preco']
+        for cursor in ('', '1', 'abc,1', '10,x', '1,2,3', 'NaN,1', 'sNaN,1', 'Infinity,1', '-inf,1'):
+            self.assertIsNone(_decode_cursor(cursor, campos), cursor)
+
+    def test_paginas_sem_repeticao(self):
+        for preco in range(PAGE_SIZE + 10):
+            criar_imovel(preco_aluguel=Decimal(1000 + preco % 7))
+        for ordem in ORDENACOES:
+            vistos, cursor = [], None
+            while True:
+                itens, cursor = keyset_page(Imovel.objects.all(), ordem, cursor)
+                vistos += [imovel.pk for imovel in itens]
+                if not cursor:
+                    break
+            self.assertEqual(sorted(vistos), sorted(Imovel.objects.values_list('pk', flat=True)), ordem)
+            self.assertEqual(len(vistos), len(set(vistos)), ordem)
+
+    def test_cursor_invalido_volta_para_a_primeira_pagina(self):
+        criar_imovel()
+        for url in ('/?ordem=preco&apos=NaN,1', '/?ordem=preco&apos=abc', '/?ordem=-preco&apos=Infinity,1'):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class IndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_capa_em_consultas_fixas(self):
+        # Com o prefetch da capa, o número de consultas não cresce com a página
+        for i in range(5):
+            criar_imovel(titulo=f'Imóvel {i}')
+        with self.assertNumQueries(2):
+            resposta = self.client.get('/')
+        self.assertEqual(len(resposta.context['imoveis']), 5)
+        self.assertIsNone(resposta.context['proximo_cursor'])
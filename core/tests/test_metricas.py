@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+
+from core import metricas
+from core.middleware import MetricasMiddleware
+from core.models import Imovel
+
+from .util import CACHE_TESTES, criar_imovel
+
+
+class HistogramaTests(SimpleTestCase):
+    def test_buckets_acumulados_e_inf(self):
+        histograma = metricas.Histograma('h', 'ajuda', (1, 5))
+        for valor in (0.5, 3, 3, 9):
+            histograma.observar((('view', 'x'),), valor)
+        self.assertEqual(histograma.exportar()[2:], [
+            'h_bucket{view="x",le="1"} 1',
+            'h_bucket{view="x",le="5"} 3',
+            'h_bucket{view="x",le="+Inf"} 4',
+            'h_sum{view="x"} 15.5',
+            'h_count{view="x"} 4',
+        ])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class MetricasMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def requisicao(self, caminho='/'):
+        request = RequestFactory().get(caminho)
+        request.resolver_match = resolve(caminho)
+        return request
+
+    def n_mais_um(self, view):
+        return metricas.n_mais_um.series[(('view', view),)]
+
+    def test_requisicao_aparece_no_endpoint(self):
+        criar_imovel()
+        self.client.get('/')
+        texto = self.client.get('/metrics/').content.decode()
+        self.assertIn('django_http_requests_total{view="index",method="GET",status="200"}', texto)
+        self.assertIn('django_db_queries_per_request_count{view="index"}', texto)
+        self.assertNotIn('view="metrics"', texto)
+
+    @override_settings(METRICS_N_PLUS_ONE_THRESHOLD=5)
+    def test_query_repetida_marca_n_mais_um(self):
+        imoveis = [criar_imovel() for _ in range(5)]
+
+        def view(request):
+            # Uma query por imóvel: o padrão que o contador deve pegar
+            for imovel in imoveis:
+                Imovel.objects.get(pk=imovel.pk)
+            return HttpResponse()
+
+        antes = self.n_mais_um('busca')
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            MetricasMiddleware(view)(self.requisicao('/busca/'))
+        self.assertIn('repetida 5 vezes', logs.output[0])
+        self.assertEqual(self.n_mais_um('busca'), antes + 1)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_taxa_zero_nao_mede(self):
+        antes = dict(metricas.requisicoes.series)
+        MetricasMiddleware(lambda request: HttpResponse())(self.requisicao('/busca/'))
+        self.assertEqual(dict(metricas.requisicoes.series), antes)
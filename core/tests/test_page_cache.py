@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core import page_cache
+
+from .util import CACHE_TESTES, criar_imovel
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_listagem_em_cache_nao_consulta_o_banco(self):
+        criar_imovel(titulo='Casa com quintal')
+        self.assertContains(self.client.get('/'), 'Casa com quintal')
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get('/'), 'Casa com quintal')
+
+    def test_save_invalida_a_listagem(self):
+        imovel = criar_imovel(titulo='Casa antiga')
+        self.assertContains(self.client.get('/'), 'Casa antiga')
+        imovel.titulo = 'Casa reformada'
+        imovel.save()
+        self.assertContains(self.client.get('/'), 'Casa reformada')
+
+    def test_bump_em_lote_troca_a_versao(self):
+        antes = page_cache.listing_version()
+        page_cache.bump_imoveis([1, 2])
+        self.assertNotEqual(page_cache.listing_version(), antes)
+
+    def test_detalhe_inexistente_nao_cria_versao(self):
+        self.assertEqual(self.client.get('/imovel/999999/').status_code, 404)
+        self.assertIsNone(cache.get(page_cache._imovel_versao_key(999999)))
+
+    def test_detalhe_reflete_edicao(self):
+        imovel = criar_imovel(titulo='Casa antiga')
+        self.assertContains(self.client.get(f'/imovel/{imovel.pk}/'), 'Casa antiga')
+        imovel.titulo = 'Casa reformada'
+        imovel.save()
+        self.assertContains(self.client.get(f'/imovel/{imovel.pk}/'), 'Casa reformada')
@@ -0,0 +1,64 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core import sinteticos
+from core.models import Imovel, ImovelImage
+
+from .util import CACHE_TESTES, criar_imovel
+
+
+class SinteticosTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = Path(pasta.name)
+        # As fotos placeholder vão para um MEDIA_ROOT descartável
+        configuracao = override_settings(MEDIA_ROOT=pasta.name, CACHES=CACHE_TESTES)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+
+class GeradorTests(SinteticosTestCase):
+    def test_gerar_em_lotes_e_limpar_so_os_sinteticos(self):
+        real = criar_imovel(codigo_externo='JF1')
+        self.assertEqual(sinteticos.gerar(12, seed=1, batch_size=5), 12)
+        self.assertEqual(sinteticos.contar(), 12)
+        self.assertEqual(Imovel.objects.filter(codigo_externo__startswith=sinteticos.PREFIXO + '1').count(), 3)
+        self.assertTrue(ImovelImage.objects.filter(imovel__codigo_externo__startswith=sinteticos.PREFIXO).exists())
+
+        sinteticos.limpar()
+        self.assertEqual(sinteticos.contar(), 0)
+        self.assertEqual(list(Imovel.objects.values_list('pk', flat=True)), [real.pk])
+        self.assertFalse(ImovelImage.objects.exists())
+
+    def test_mesma_semente_gera_os_mesmos_dados(self):
+        sinteticos.gerar(5, seed=7)
+        primeira = list(Imovel.objects.order_by('codigo_externo').values_list('titulo', 'preco_aluguel'))
+        sinteticos.limpar()
+        sinteticos.gerar(5, seed=7)
+        segunda = list(Imovel.objects.order_by('codigo_externo').values_list('titulo', 'preco_aluguel'))
+        self.assertEqual(primeira, segunda)
+
+
+class BenchmarkSiteTests(SinteticosTestCase):
+    # O comando usa HTTP_HOST=localhost; fora do DEBUG só passa se estiver na lista
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_rodada_pequena_grava_json_e_limpa(self):
+        saida = self.pasta / 'resultado.json'
+        call_command('benchmark_site', '--tamanhos', '5', '--repeticoes', '2', '--cenarios', 'index', 'detalhe',
+                     '--saida', str(saida), stdout=StringIO())
+
+        resultado = json.loads(saida.read_text())
+        self.assertEqual({(r['cenario'], r['cache']) for r in resultado['resultados']},
+                         {('index', 'frio'), ('index', 'quente'), ('detalhe', 'frio'), ('detalhe', 'quente')})
+        self.assertTrue(all(r['linhas'] == 5 for r in resultado['resultados']))
+        self.assertEqual(sinteticos.contar(), 0)
+        self.assertFalse(get_user_model().objects.exists())
@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from core.models import ImovelImage
+from core.variantes import gerar_variantes, remover_variantes, salvar_variantes
+
+from .util import CACHE_TESTES, criar_imovel
+
+
+class GerarVariantesTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.media = pasta.name
+        os.makedirs(os.path.join(self.media, 'imoveis'))
+        Image.new('RGBA', (1200, 800), 'red').save(os.path.join(self.media, 'imoveis', 'foto.png'))
+
+    def test_gera_webp_e_jpeg_sem_ampliar(self):
+        variantes = gerar_variantes(self.media, 'imoveis/foto.png')
+        self.assertEqual(variantes['origem'], 'imoveis/foto.png')
+        self.assertEqual({nome: v['largura'] for nome, v in variantes.items() if nome != 'origem'},
+                         {'card': 480, 'galeria': 960, 'full': 1200})
+        self.assertEqual(variantes['card']['webp'], 'imoveis/foto__card.webp')
+        with Image.open(os.path.join(self.media, variantes['galeria']['jpeg'])) as jpeg:
+            self.assertEqual((jpeg.format, jpeg.size), ('JPEG', (960, 640)))
+
+        remover_variantes(self.media, variantes)
+        self.assertEqual(os.listdir(os.path.join(self.media, 'imoveis')), ['foto.png'])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class SalvarVariantesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.imovel = criar_imovel()
+        # Sem arquivo de verdade: em TestCase o on_commit que agendaria o pool nunca roda
+        self.imagem = ImovelImage.objects.create(imovel=self.imovel, image='imoveis/foto.jpg')
+
+    def variantes_de(self, origem):
+        return {'origem': origem, **{nome: {'largura': 480, 'webp': f'{nome}.webp', 'jpeg': f'{nome}.jpg'}
+                                     for nome in ('card', 'galeria', 'full')}}
+
+    def test_grava_e_avanca_o_updated_at(self):
+        antes = self.imovel.updated_at
+        salvar_variantes(self.imagem.pk, self.variantes_de('imoveis/foto.jpg'))
+        self.imagem.refresh_from_db()
+        self.imovel.refresh_from_db()
+        self.assertTrue(self.imagem.variantes_prontas)
+        self.assertEqual(self.imagem.card_url, '/media/card.jpg')
+        self.assertGreater(self.imovel.updated_at, antes)
+
+    def test_descarta_resultado_de_imagem_trocada(self):
+        ImovelImage.objects.filter(pk=self.imagem.pk).update(image='imoveis/outra.jpg')
+        salvar_variantes(self.imagem.pk, self.variantes_de('imoveis/foto.jpg'))
+        self.imagem.refresh_from_db()
+        self.assertEqual(self.imagem.variantes, {})
+        self.assertEqual(self.imagem.card_url, '/media/imoveis/outra.jpg')
+
+    def test_imagem_apagada_e_ignorada(self):
+        pk = self.imagem.pk
+        self.imagem.delete()
+        salvar_variantes(pk, self.variantes_de('imoveis/foto.jpg'))
+        self.assertFalse(ImovelImage.objects.filter(pk=pk).exists())
@@ -0,0 +1,32 @@
+import importlib.util
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+
+from core.models import Imovel
+
+# Cache em memória: os testes não escrevem no cache em arquivo do projeto
+CACHE_TESTES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# O chatbot (automacao_chat/) não é um pacote: os módulos se importam pelo nome
+CHAT_DIR = Path(settings.BASE_DIR) / 'automacao_chat'
+if str(CHAT_DIR) not in sys.path:
+    sys.path.insert(0, str(CHAT_DIR))
+
+
+def instalado(*modulos):
+    """Para skipUnless: os módulos do chat que importam ollama/vanna/chromadb só rodam com eles."""
+    return all(importlib.util.find_spec(modulo) for modulo in modulos)
+
+
+def criar_imovel(**campos):
+    dados = {
+        'titulo': 'Apartamento no Centro', 'descricao': 'Perto de tudo', 'quartos': 2,
+        'banheiros': 1, 'garagem': 0, 'area': Decimal('60'), 'cidade': 'Juiz de Fora',
+        'bairro': 'Centro', 'rua': 'Rua Halfeld', 'numero': '10', 'preco_aluguel': Decimal('1500'),
+        'preco_iptu': Decimal('50'), 'preco_condominio': Decimal('300'), 'especificacao': 'apartamento',
+    }
+    dados.update(campos)
+    return Imovel.objects.create(**dados)
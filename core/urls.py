@@ -1,9 +1,13 @@
 from django.urls import path
-from . import views
+from . import api, metricas, views
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('busca/', views.busca, name='busca'),
     path('imovel/<int:pk>/', views.imovel_detail, name='imovel_detail'),
+    path('api/imoveis/', api.imoveis_lista, name='api_imoveis'),
+    path('api/imoveis/<int:pk>/', api.imovel_item, name='api_imovel'),
+    path('metrics/', metricas.metrics, name='metrics'),
 ]
 
 from django.conf import settings
@@ -0,0 +1,115 @@
+import atexit
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Largura máxima (px) de cada variante gerada a partir do upload original
+VARIANTES = {
+    'card': 480,
+    'galeria': 960,
+    'full': 1920,
+}
+
+_pool = None
+
+
+def variant_name(nome, variante, extensao):
+    """'imoveis/foto.jpg' -> 'imoveis/foto__card.webp' (fica ao lado do original)."""
+    base, _ = os.path.splitext(nome)
+    return f'{base}__{variante}.{extensao}'
+
+
+def gerar_variantes(media_root, nome, larguras=VARIANTES):
+    """Gera as variantes WebP e JPEG de um arquivo; roda dentro do pool de processos.
+
+    Só depende do Pillow e de caminhos em disco, para poder ser executada num
+    processo filho sem carregar o Django. Devolve o dicionário gravado em
+    ImovelImage.variantes.
+    """
+    with Image.open(os.path.join(media_root, nome)) as original:
+        imagem = ImageOps.exif_transpose(original)
+        if imagem.mode != 'RGB':
+            imagem = imagem.convert('RGB')
+
+        resultado = {'origem': nome}
+        for variante, largura in larguras.items():
+            copia = imagem.copy()
+            # Nunca amplia: fotos menores que a variante ficam no tamanho original
+            copia.thumbnail((largura, largura * 4), Image.Resampling.LANCZOS)
+            webp = variant_name(nome, variante, 'webp')
+            jpeg = variant_name(nome, variante, 'jpg')
+            copia.save(os.path.join(media_root, webp), 'WEBP', quality=80, method=4)
+            copia.save(os.path.join(media_root, jpeg), 'JPEG', quality=82, optimize=True, progressive=True)
+            resultado[variante] = {'largura': copia.width, 'webp': webp, 'jpeg': jpeg}
+    return resultado
+
+
+def remover_variantes(media_root, variantes):
+    for variante in VARIANTES:
+        for extensao in ('webp', 'jpeg'):
+            nome = variantes.get(variante, {}).get(extensao)
+            if nome:
+                try:
+                    os.remove(os.path.join(media_root, nome))
+                except FileNotFoundError:
+                    pass
+
+
+def get_pool(max_workers=None):
+    """Pool compartilhado pelo processo web. Usa 'spawn' para não herdar threads do servidor."""
+    global _pool
+    if _pool is None:
+        from django.conf import settings
+
+        _pool = ProcessPoolExecutor(
+            max_workers=max_workers or settings.IMAGE_VARIANT_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+
+def salvar_variantes(image_pk, variantes):
+    """Grava o resultado do pool e invalida o cache do imóvel (update() não dispara signals)."""
+    from django.utils import timezone
+
+    from .models import Imovel, ImovelImage
+    from .page_cache import bump_imovel
+
+    imagem = ImovelImage.objects.filter(pk=image_pk).only('imovel_id', 'image').first()
+    if imagem is None or imagem.image.name != variantes['origem']:
+        # A imagem foi apagada ou trocada enquanto o pool trabalhava
+        return
+    ImovelImage.objects.filter(pk=image_pk).update(variantes=variantes)
+    Imovel.objects.filter(pk=imagem.imovel_id).update(updated_at=timezone.now())
+    bump_imovel(imagem.imovel_id)
+
+
+def agendar_variantes(imagem):
+    """Envia a geração das variantes para o pool, fora do ciclo da requisição."""
+    from django.conf import settings
+
+    global _pool
+    argumentos = (gerar_variantes, str(settings.MEDIA_ROOT), imagem.image.name)
+    try:
+        futuro = get_pool().submit(*argumentos)
+    except BrokenProcessPool:
+        # Um worker morreu (ex.: falta de memória); recria o pool uma vez
+        _pool = None
+        futuro = get_pool().submit(*argumentos)
+    image_pk = imagem.pk
+
+    def concluir(futuro):
+        try:
+            salvar_variantes(image_pk, futuro.result())
+        except Exception:
+            logger.exception('Falha ao gerar variantes da imagem %s', image_pk)
+
+    futuro.add_done_callback(concluir)
+    return futuro
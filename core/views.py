@@ -1,10 +1,191 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Prefetch, Q
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404
-from .models import Imovel
+from django.template.loader import render_to_string
+from . import page_cache
+from .forms import BuscaForm
+from .models import Imovel, ImovelImage
+
+PAGE_SIZE = 24
+
+# Ordenações aceitas no parâmetro ?ordem= -> campos usados como chave do cursor
+ORDENACOES = {
+    'id': ('id',),
+    'preco': ('preco_aluguel', 'id'),
+    '-preco': ('-preco_aluguel', '-id'),
+    'custo': ('custo_total', 'id'),
+}
+
+# Facetas da busca: nome do filtro no formulário -> coluna agrupada. A contagem
+# segue o lookup do filtro em BuscaForm.LOOKUPS (quartos__gte conta "N ou mais")
+FACETAS = {
+    'bairro': 'bairro',
+    'tipo': 'especificacao',
+    'quartos': 'quartos',
+}
+
+
+def _capa_prefetch():
+    # Uma única imagem (a primeira enviada) por imóvel, carregada numa só query
+    capas = ImovelImage.objects.order_by('id')[:1]
+    return Prefetch('images', queryset=capas, to_attr='capas')
+
+
+def _encode_cursor(imovel, campos):
+    return ','.join(str(getattr(imovel, campo.lstrip('-'))) for campo in campos)
+
+
+def _decode_cursor(cursor, campos):
+    partes = cursor.split(',')
+    if len(partes) != len(campos):
+        return None
+    valores = []
+    try:
+        for campo, parte in zip(campos, partes):
+            if campo.lstrip('-') == 'id':
+                valores.append(int(parte))
+            else:
+                valor = Decimal(parte)
+                # Decimal aceita NaN/sNaN/Infinity, que o banco não sabe comparar
+                if not valor.is_finite():
+                    return None
+                valores.append(valor)
+    except (ValueError, InvalidOperation):
+        return None
+    return valores
+
+
+def _keyset_filter(campos, valores):
+    """Monta o filtro "linha depois do cursor" para a ordenação (a, b): a > x OR (a = x AND b > y)."""
+    filtro = Q()
+    igualdades = {}
+    for campo, valor in zip(campos, valores):
+        nome = campo.lstrip('-')
+        lookup = 'lt' if campo.startswith('-') else 'gt'
+        filtro |= Q(**igualdades, **{f'{nome}__{lookup}': valor})
+        igualdades[nome] = valor
+    return filtro
+
+
+def keyset_page(queryset, ordem, cursor):
+    """Retorna (itens, próximo cursor) de uma página ordenada sem OFFSET."""
+    campos = ORDENACOES.get(ordem, ORDENACOES['id'])
+    queryset = queryset.order_by(*campos)
+    if cursor:
+        valores = _decode_cursor(cursor, campos)
+        if valores is not None:
+            queryset = queryset.filter(_keyset_filter(campos, valores))
+
+    # Busca um item a mais só para saber se existe próxima página
+    itens = list(queryset[:PAGE_SIZE + 1])
+    proximo = None
+    if len(itens) > PAGE_SIZE:
+        itens = itens[:PAGE_SIZE]
+        proximo = _encode_cursor(itens[-1], campos)
+    return itens, proximo
+
 
 def index(request):
-    imoveis = Imovel.objects.all()
-    return render(request, 'core/index.html', {'imoveis': imoveis})
+    ordem = request.GET.get('ordem', 'id')
+    if ordem not in ORDENACOES:
+        ordem = 'id'
+    cursor = request.GET.get('apos')
+
+    def renderizar():
+        imoveis, proximo = keyset_page(
+            Imovel.objects.prefetch_related(_capa_prefetch()),
+            ordem,
+            cursor,
+        )
+        return render_to_string('core/index.html', {
+            'imoveis': page_cache.annotate_versions(imoveis),
+            'ordem': ordem,
+            'proximo_cursor': proximo,
+            'primeira_pagina': not cursor,
+        }, request)
+
+    chave = page_cache.page_key('index', page_cache.listing_version(), {'ordem': ordem, 'apos': cursor})
+    return page_cache.cached_html(chave, renderizar)
+
+def _facet_counts(request, form):
+    """Contagem por bairro/tipo/quartos, cada uma respeitando os demais filtros ativos."""
+    tipos = dict(Imovel.TIPO_IMOVEL_CHOICES)
+    facetas = {}
+    for filtro, coluna in FACETAS.items():
+        linhas = (
+            Imovel.objects.filter(**form.filtros(exceto=filtro))
+            .exclude(**{f'{coluna}__isnull': True})
+            .values(coluna)
+            .annotate(total=Count('id'))
+            .order_by(coluna)
+        )
+        linhas = list(linhas)
+        if BuscaForm.LOOKUPS[filtro].endswith('__gte'):
+            # Cada valor conta também os maiores, como o filtro que o link aplica
+            acumulado = 0
+            for linha in reversed(linhas):
+                acumulado += linha['total']
+                linha['total'] = acumulado
+        atual = request.GET.get(filtro, '')
+        itens = []
+        for linha in linhas:
+            valor = linha[coluna]
+            query = request.GET.copy()
+            query.pop('apos', None)
+            ativo = str(valor) == atual
+            if ativo:
+                query.pop(filtro, None)
+            else:
+                query[filtro] = valor
+            itens.append({
+                'valor': valor,
+                'rotulo': tipos.get(valor, valor) if filtro == 'tipo' else valor,
+                'total': linha['total'],
+                'ativo': ativo,
+                'url': '?' + query.urlencode(),
+            })
+        facetas[filtro] = itens
+    return facetas
+
+
+def busca(request):
+    form = BuscaForm(request.GET)
+    # Campos inválidos ficam fora de cleaned_data e simplesmente não filtram
+    form.is_valid()
+
+    ordem = request.GET.get('ordem', 'custo')
+    if ordem not in ORDENACOES:
+        ordem = 'custo'
+    imoveis, proximo = keyset_page(
+        Imovel.objects.filter(**form.filtros()).prefetch_related(_capa_prefetch()),
+        ordem,
+        request.GET.get('apos'),
+    )
+
+    query = request.GET.copy()
+    query.pop('apos', None)
+    return render(request, 'core/busca.html', {
+        'form': form,
+        'imoveis': page_cache.annotate_versions(imoveis),
+        'facetas': _facet_counts(request, form),
+        'ordem': ordem,
+        'proximo_cursor': proximo,
+        'query_string': query.urlencode(),
+    })
 
 def imovel_detail(request, pk):
-    imovel = get_object_or_404(Imovel, pk=pk)
-    return render(request, 'core/imovel_detail.html', {'imovel': imovel})
+    # A versão vem do banco (imagens e variantes também atualizam updated_at), e um
+    # pk inexistente responde 404 sem criar chave de versão no cache
+    atualizado = Imovel.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if atualizado is None:
+        raise Http404
+
+    def renderizar():
+        imovel = get_object_or_404(Imovel, pk=pk)
+        imagens = list(imovel.images.order_by('id'))
+        return render_to_string('core/imovel_detail.html', {'imovel': imovel, 'imagens': imagens}, request)
+
+    chave = page_cache.page_key('imovel', f'{pk}:{atualizado.timestamp()}')
+    return page_cache.cached_html(chave, renderizar)
@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista para medir também as queries de sessão/autenticação
+    'core.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +52,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Métricas por view em /metrics/ (formato texto do Prometheus). Fração das
+# requisições medidas: 1.0 mede todas, 0 desliga a instrumentação.
+METRICS_SAMPLE_RATE = 1.0
+# Mesma query executada este número de vezes numa requisição = suspeita de N+1
+METRICS_N_PLUS_ONE_THRESHOLD = 10
+
 ROOT_URLCONF = 'imobiliaria_demo.urls'
 
 TEMPLATES = [
@@ -73,14 +81,64 @@ WSGI_APPLICATION = 'imobiliaria_demo.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# PRAGMAs aplicados em cada conexão. WAL deixa o chatbot ler enquanto o admin
+# escreve; os valores são os mesmos usados pelo pool de leitura do chatbot
+# (automacao_chat/conexoes.py).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,           # ms esperando um lock antes de falhar
+    'cache_size': -64000,           # negativo = KiB (~64 MB por conexão)
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Conexões persistentes: evita reabrir o arquivo e reaplicar os PRAGMAs a cada requisição
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            # Escritas pegam o lock logo no BEGIN, sem upgrade de leitura para escrita no meio
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ''.join(f'PRAGMA {nome}={valor};' for nome, valor in SQLITE_PRAGMAS.items()),
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+# Páginas e cards de imóveis (core/page_cache.py). As chaves levam a versão de
+# cada imóvel, trocada nos signals de save/delete, então nada fica desatualizado.
+# A versão precisa ser a mesma para todos os processos (workers do servidor e
+# comandos como importar_imoveis), por isso o padrão é 'file'; 'locmem' guarda em
+# memória por processo e só serve com um único processo e sem escritas via CLI.
+LISTING_CACHE_BACKEND = 'file'
+LISTING_CACHE_TIMEOUT = 60 * 60 * 24
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'imobiliaria-demo',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[LISTING_CACHE_BACKEND],
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -120,3 +178,6 @@ STATIC_URL = 'static/'
 # Media files (User uploaded)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Processos do pool que gera as variantes WebP/JPEG das fotos (core/variantes.py)
+IMAGE_VARIANT_WORKERS = 2